@@ -0,0 +1,107 @@
+"""Memory and throughput of the different ways of holding alerts in memory.
+
+Builds a synthetic nationwide collection and, for each model, reports how fast it can be
+built from the decoded JSON and how much memory it keeps alive per alert once the JSON
+has been thrown away.
+
+    python benchmarks/alert_model.py
+    python benchmarks/alert_model.py --sizes 5000 20000 --with-nwsapy --json results.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+from cli.utils.records import AlertRecord # noqa: E402
+import synthetic # noqa: E402
+
+
+def _feature_dicts(features):
+    return features
+
+
+def _nwsapy(features):
+    # What `api_connector.get_active_alerts` holds on to: one IndividualAlert per alert.
+    from nwsapy.endpoints.alerts import IndividualAlert
+    return [IndividualAlert(feature) for feature in features]
+
+
+def _records_heavy(features):
+    return [AlertRecord.from_feature(feature) for feature in features]
+
+
+def _records_light(features):
+    return [AlertRecord.from_feature(feature, heavy = False) for feature in features]
+
+
+MODELS = {
+    'feature dicts': _feature_dicts,
+    'AlertRecord (heavy)': _records_heavy,
+    'AlertRecord (light)': _records_light,
+}
+
+
+def measure(build, text: str, count: int) -> dict:
+    # Throughput, without tracemalloc slowing things down.
+    features = json.loads(text)['features']
+    start = time.perf_counter()
+    model = build(features)
+    elapsed = time.perf_counter() - start
+    del model, features
+    gc.collect()
+
+    # Memory that the model keeps alive once the decoded JSON is gone.
+    tracemalloc.start()
+    features = json.loads(text)['features']
+    model = build(features)
+    del features
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del model
+
+    return {
+        # Keeping the decoded JSON as-is doesn't build anything.
+        'alerts_per_second': round(count / elapsed) if build is not _feature_dicts else None,
+        'build_ms': round(elapsed * 1000, 2),
+        'bytes_per_alert': round(retained / count),
+    }
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [5000, 10000, 20000])
+    parser.add_argument('--with-nwsapy', action = 'store_true', help = "Also measure nwsapy's IndividualAlert (slow).")
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    models = dict(MODELS)
+    if args.with_nwsapy:
+        models = dict({'nwsapy IndividualAlert': _nwsapy}, **models)
+
+    results = []
+    for size in args.sizes:
+        text = json.dumps(synthetic.collection(size))
+        print(f"\n{size} alerts ({len(text) / 1e6:.1f} MB of JSON)")
+        for name, build in models.items():
+            result = dict(measure(build, text, size), model = name, alerts = size)
+            results.append(result)
+            rate = f"{result['alerts_per_second']:>10,}" if result['alerts_per_second'] else f"{'-':>10}"
+            print(f"  {name:<24} {rate} alerts/s   {result['bytes_per_alert']:>8,} bytes/alert")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Asking for alerts from a Python service: a `richwx` subprocess per query against `AlertsClient`.
+
+Starts the stand-in API, then makes the same queries both ways: running the CLI with
+`--format ndjson` in a new process each time (what a service had to do before), and calling
+a long-lived `AlertsClient` in this one. Both go through the same response cache, with
+`--max-age` so it answers and what's measured is everything around the request.
+
+    python benchmarks/client.py
+    python benchmarks/client.py --runs 20 --json results.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import server # noqa: E402
+import synthetic # noqa: E402
+
+_server = server.start(server.Fixtures())
+_workdir = tempfile.mkdtemp(prefix = 'richwx-client-')
+_config = os.path.join(_workdir, 'config.ini')
+with open(_config, 'w') as f:
+    f.write(f"[UserAgent]\napplicationname = RichWxBenchmark\ncontactinfo = benchmark@example.com\n\n"
+            f"[Cache]\ndirectory = {os.path.join(_workdir, 'cache')}\n")
+os.environ.update(RICHWX_API_URL = server.url(_server), RICHWX_CONFIG = _config)
+
+from richwx import AlertsClient # noqa: E402
+
+IDS = [synthetic.alert_id(i) for i in range(3)]
+
+# name -> (CLI arguments, the same query through the client)
+QUERIES = {
+    'state TX': (['alerts', 'state', 'TX', '--format', 'ndjson', '--max-age', '3600'],
+                 lambda client: client.active_alerts(areas = ['TX'], max_age = 3600).records),
+    'state gulf-coast': (['alerts', 'state', '--region', 'gulf-coast', '--format', 'ndjson', '--max-age', '3600'],
+                         lambda client: client.active_alerts(region = 'gulf-coast', max_age = 3600).records),
+    'id x3': (['alerts', 'id'] + IDS, lambda client: client.alerts_by_id(ids = IDS, max_age = 3600)),
+}
+
+
+def subprocess_ms(args: list) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, 'richwx', 'cli', 'cli.py')] + args, cwd = ROOT, check = True,
+                   stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL, env = dict(os.environ, COLUMNS = '160'))
+    return (time.perf_counter() - start) * 1000
+
+
+def client_ms(client: AlertsClient, query) -> float:
+    start = time.perf_counter()
+    query(client)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--runs', type = int, default = 10, help = 'Runs of each query each way (the median is reported).')
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    client = AlertsClient()
+    results = []
+    try:
+        print(f"\n{'query':<18} {'subprocess':>12} {'client':>12} {'speedup':>9}")
+        for name, (cli_args, query) in QUERIES.items():
+            subprocess_ms(cli_args) # fills the response cache.
+            query(client)
+            spawned = statistics.median(subprocess_ms(cli_args) for _ in range(args.runs))
+            called = statistics.median(client_ms(client, query) for _ in range(args.runs))
+            results.append({'query': name, 'subprocess_ms': round(spawned, 2), 'client_ms': round(called, 2)})
+            print(f"{name:<18} {spawned:>9.1f} ms {called:>9.1f} ms {spawned / max(called, 1e-6):>8.0f}x")
+    finally:
+        _server.shutdown()
+        shutil.rmtree(_workdir, ignore_errors = True)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Loading a saved nationwide snapshot: the JSON one against an exported (packed) one.
+
+Writes a synthetic collection both ways, then in a fresh process for each, opens the file,
+picks out one state's alerts and builds their records (what `richwx alerts all --state TX`
+does before drawing the table), reporting the time taken and how much the peak resident
+memory grew over the imports. Linux only, for the peak RSS.
+
+    python benchmarks/packed.py
+    python benchmarks/packed.py --alerts 5000 20000 --state TX --json results.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+from cli.utils import packed # noqa: E402
+from cli.utils.records import AlertRecord # noqa: E402
+from cli.utils.snapshot import AlertSnapshot # noqa: E402
+import synthetic # noqa: E402
+
+# Run in a child process, so each load starts cold and has its own peak RSS.
+_CHILD = """
+import json, sys, time
+sys.path[:0] = {path!r}
+from cli.utils.packed import PackedSnapshot
+from cli.utils.snapshot import AlertFilter, AlertSnapshot
+
+def rss():
+    # The peak RSS of this process. (ru_maxrss would count the parent's peak from before the exec.)
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmHWM:'))
+
+before = rss()
+start = time.perf_counter()
+filters = AlertFilter(states = [{state!r}])
+if {kind!r} == 'json':
+    snapshot = AlertSnapshot.load({file!r})
+    records = snapshot.query(filters)
+else:
+    snapshot = PackedSnapshot({file!r})
+    records = snapshot.records(snapshot.query(filters))
+rows = [(record.event, record.area_desc, record.expires) for record in records]
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'rss_growth': rss() - before, 'found': len(rows)}}))
+"""
+
+
+def load(kind: str, path: str, state: str) -> dict:
+    code = _CHILD.format(path = sys.path[:2], state = state, kind = kind, file = path)
+    out = subprocess.run([sys.executable, '-c', code], check = True, capture_output = True, text = True).stdout
+    return json.loads(out)
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--alerts', type = int, nargs = '+', default = [20000])
+    parser.add_argument('--state', default = 'TX')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'Loads per format; the fastest is kept.')
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.alerts:
+            records = [AlertRecord.from_feature(feature) for feature in synthetic.collection(size)['features']]
+            files = {'json': os.path.join(directory, 'snapshot.json'), 'packed': os.path.join(directory, 'snapshot.rwx')}
+            AlertSnapshot(records, 0.0).save(files['json'])
+            packed.write(records, files['packed'], 0.0)
+            del records
+
+            print(f"\n{size} alerts, {args.state} only")
+            found = set()
+            for kind, path in files.items():
+                runs = [load(kind, path, args.state) for _ in range(args.repeat)]
+                best = min(runs, key = lambda run: run['ms'])
+                found.add(best['found'])
+                result = dict(best, format = kind, alerts = size, file_bytes = os.path.getsize(path))
+                results.append(result)
+                print(f"  {kind:<8} {result['file_bytes'] / 1e6:>7.1f} MB file   {result['ms']:>9.1f} ms   "
+                      f"{result['rss_growth'] / 1e6:>7.1f} MB peak RSS growth   {result['found']} alerts")
+            if len(found) != 1:
+                print("  !! the formats found different alerts")
+                return 1
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
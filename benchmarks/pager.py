@@ -0,0 +1,85 @@
+"""Time to the first screen of alerts: the whole table (what `alerts state` prints) against `--pager`.
+
+For each size, draws the alert list to an in-memory terminal both ways: building and printing
+the table with every alert in it, and building an `AlertViewer` and drawing its first screen.
+The render cache is cleared before every run, so nothing is reused between them. The whole
+table is only drawn up to `--full-max` alerts; it grows with the list, and it's slow.
+
+    python benchmarks/pager.py
+    python benchmarks/pager.py --alerts 100 1000 10000 100000 --height 50 --json results.json
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+from rich.console import Console # noqa: E402
+
+from cli.utils import render # noqa: E402
+from cli.utils.records import AlertRecord # noqa: E402
+from cli.utils.render_cache import render_cache # noqa: E402
+from cli.utils.viewer import AlertViewer # noqa: E402
+import synthetic # noqa: E402
+
+# Distinct alerts generated; longer lists repeat them.
+_DISTINCT = 10000
+
+
+def _console(args) -> Console:
+    return Console(file = io.StringIO(), width = args.width, height = args.height, force_terminal = True)
+
+
+def best_ms(repeat: int, run) -> float:
+    times = []
+    for _ in range(repeat):
+        render_cache.clear()
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--alerts', type = int, nargs = '+', default = [100, 1000, 10000, 100000])
+    parser.add_argument('--width', type = int, default = 150)
+    parser.add_argument('--height', type = int, default = 50)
+    parser.add_argument('--full-max', type = int, default = 1000, help = 'Largest list to draw as a whole table.')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'Runs of each; the fastest is kept.')
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    distinct = [AlertRecord.from_feature(synthetic.feature(index), heavy = False)
+                for index in range(min(_DISTINCT, max(args.alerts)))]
+
+    results = []
+    print(f"\n{'alerts':>8} {'whole table':>14} {'pager':>10}")
+    for size in args.alerts:
+        records = (distinct * (size // len(distinct) + 1))[:size]
+
+        def whole():
+            render.print_table(_console(args), render.alert_table(records, "Alerts"), "the US")
+
+        def first_screen():
+            console = _console(args)
+            console.print(AlertViewer(console, records, "Alerts").screen())
+
+        full = best_ms(args.repeat, whole) if size <= args.full_max else None
+        paged = best_ms(args.repeat, first_screen)
+        results.append({'alerts': size, 'table_ms': None if full is None else round(full, 2), 'pager_ms': round(paged, 2)})
+        print(f"{size:>8} {'-' if full is None else f'{full:.1f} ms':>14} {paged:>7.1f} ms")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Micro-benchmark for styling and rendering the alert list.
+
+Compares building the "Alert Type" cell the old way (an AlertStyling whose markup is
+concatenated on every row) with the precompiled style registry (`get_alert_style`),
+both on their own and as part of rendering the whole table to an off-screen console. The
+machine-readable `--format` writers, which skip Rich altogether, are timed alongside, and
+so is redrawing the table with its cells in the render cache (what `alerts watch` does when
+the alerts haven't changed), cold and then warm.
+
+    python benchmarks/render.py
+    python benchmarks/render.py --rows 1000 5000 --json results.json
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+from rich.console import Console # noqa: E402
+from rich.table import Table # noqa: E402
+
+from cli.utils.alert_rich_strings import ALERTS, AlertStyling, get_alert_style # noqa: E402
+from cli.utils.output import FORMATS, write_records # noqa: E402
+from cli.utils.records import AlertRecord # noqa: E402
+from cli.utils.render_cache import Cached, RenderCache # noqa: E402
+import synthetic # noqa: E402
+
+
+def legacy_cell(event: str):
+    # What the alert list did before the registry: look up (or make) an AlertStyling and
+    # rebuild its markup from scratch.
+    style = ALERTS[event] if event in ALERTS else AlertStyling('Not Found', 'red', [])
+    style.add_newline_after_emotes()
+    return style.to_string()
+
+
+def markup_cell(event: str):
+    return get_alert_style(event, newline = True).markup
+
+
+def text_cell(event: str):
+    return get_alert_style(event, newline = True).text
+
+
+CELLS = {'legacy markup': legacy_cell, 'registry markup': markup_cell, 'registry text': text_cell}
+
+
+def render(records: list, cell) -> float:
+    console = Console(file = io.StringIO(), width = 160, color_system = 'truecolor', force_terminal = True)
+    start = time.perf_counter()
+    table = Table(show_lines = True)
+    for name in ("Alert Type", "Location", "Issued", "Expires", "Sender"):
+        table.add_column(name, justify = 'center')
+    for record in records:
+        table.add_row(cell(record.event), record.area_desc.replace(';', ','), f"[magenta]{record.sent}",
+                      f"[yellow]{record.expires}", record.sender_name)
+    console.print(table)
+    return time.perf_counter() - start
+
+
+def render_cached(records: list, cache: RenderCache) -> tuple:
+    # The same table, with its cells behind the render cache. Returns the time and the output.
+    out = io.StringIO()
+    console = Console(file = out, width = 160, color_system = 'truecolor', force_terminal = True)
+    start = time.perf_counter()
+    table = Table(show_lines = True)
+    for name in ("Alert Type", "Location", "Issued", "Expires", "Sender"):
+        table.add_column(name, justify = 'center')
+    for record in records:
+        table.add_row(Cached(text_cell(record.event), key = ('event', record.event), cache = cache),
+                      Cached(record.area_desc.replace(';', ','), cache = cache),
+                      Cached(f"[magenta]{record.sent}", cache = cache), Cached(f"[yellow]{record.expires}", cache = cache),
+                      Cached(record.sender_name, cache = cache))
+    console.print(table)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--rows', type = int, nargs = '+', default = [1000, 5000])
+    parser.add_argument('--repeat', type = int, default = 3, help = 'Best of this many runs.')
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        records = [AlertRecord.from_feature(feature, heavy = False) for feature in synthetic.collection(rows)['features']]
+        events = [record.event for record in records]
+        print(f"\n{rows} rows")
+        for name, cell in CELLS.items():
+            cell(events[0]) # warm up (the registry builds the style on first use)
+            cells = min(_time(lambda: [cell(event) for event in events]) for _ in range(args.repeat))
+            table = min(render(records, cell) for _ in range(args.repeat))
+            results.append({'rows': rows, 'cell': name, 'cells_ms': round(cells * 1000, 3),
+                            'render_ms': round(table * 1000, 1)})
+            print(f"  {name:<16} cells {cells * 1e6 / rows:>7.2f} us/row   full render {table * 1000:>9.1f} ms")
+        cache = RenderCache()
+        cold, first = render_cached(records, cache)
+        warm, again = min(render_cached(records, cache) for _ in range(args.repeat))
+        results.append({'rows': rows, 'cell': 'render cache', 'cold_ms': round(cold * 1000, 1),
+                        'render_ms': round(warm * 1000, 1), 'identical': first == again})
+        print(f"  {'render cache':<16} cold {cold * 1000:>9.1f} ms   redraw {warm * 1000:>9.1f} ms"
+              f"{'' if first == again else '   !! the redraw came out different'}")
+        for name in FORMATS:
+            elapsed = min(_time(lambda: write_records(records, name, io.StringIO())) for _ in range(args.repeat))
+            results.append({'rows': rows, 'format': name, 'render_ms': round(elapsed * 1000, 2)})
+            print(f"  --format {name:<7} {elapsed * 1e6 / rows:>7.2f} us/row   full output {elapsed * 1000:>9.1f} ms")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+
+    return 0
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""A local stand-in for the NWS API, for benchmarking without the network.
+
+Serves the endpoints richwx uses:
+
+    /alerts/active?area=XX     the active alerts for one area
+    /alerts/active             every active alert (the nationwide snapshot)
+    /alerts/{id}               a single alert
+
+Responses come from recorded fixtures if there are any (see `--fixtures`), and from
+`synthetic` otherwise. Each area gets `--per-area` alerts and the nationwide collection
+`--nationwide` of them (10,000 by default), generated once and served from memory with an
+ETag, so conditional requests get a 304 like they would from the real API.
+
+Point richwx at it with `RICHWX_API_URL`:
+
+    python benchmarks/server.py --port 8765
+    RICHWX_API_URL=http://127.0.0.1:8765 python richwx/cli/cli.py alerts state TX
+
+Fixture files are named `active.json`, `active-XX.json` (per area) and `alert-<id>.json`,
+exactly as the API returned them.
+
+To see how richwx copes with a struggling API, `--slow-rate 0.05 --slow-seconds 10` holds
+5% of responses back for 10 seconds, and `--error-rate 0.2` answers 20% with a 503.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import synthetic # noqa: E402
+
+DEFAULT_PER_AREA = 200
+DEFAULT_NATIONWIDE = 10000
+
+
+class Fixtures:
+    """Builds (or loads) each response body the first time it's asked for, then keeps it.
+
+    Args:
+        directory (str, optional): Where recorded fixtures live. Anything not found there is synthetic.
+        per_area (int, optional): Number of synthetic alerts per area.
+        nationwide (int, optional): Number of synthetic alerts in the nationwide collection.
+        max_age (int, optional): The `Cache-Control: max-age` sent with every response.
+        slow_rate (float, optional): The fraction of responses held back for `slow_seconds`.
+        slow_seconds (float, optional): How long the slow ones take.
+        error_rate (float, optional): The fraction of requests answered with a 503.
+    """
+
+    def __init__(self, directory: str = None, per_area: int = DEFAULT_PER_AREA, nationwide: int = DEFAULT_NATIONWIDE,
+                 max_age: int = 0, slow_rate: float = 0.0, slow_seconds: float = 0.0, error_rate: float = 0.0):
+        self.directory = directory
+        self.per_area = per_area
+        self.nationwide = nationwide
+        self.max_age = max_age
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.error_rate = error_rate
+        self._random = random.Random(0)
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def _recorded(self, name: str):
+        if self.directory is None:
+            return None
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _build(self, key: tuple) -> bytes:
+        kind, value = key
+        if kind == 'active':
+            recorded = self._recorded('active.json')
+            return recorded or json.dumps(synthetic.collection(self.nationwide, seed = 1)).encode()
+        if kind == 'area':
+            recorded = self._recorded(f'active-{value}.json')
+            seed = 100 + synthetic.STATES.index(value) if value in synthetic.STATES else 99
+            return recorded or json.dumps(synthetic.collection(self.per_area, seed = seed, state = value)).encode()
+
+        recorded = self._recorded(f'alert-{value}.json')
+        if recorded:
+            return recorded
+        try:
+            index = int(value.rsplit('.', 3)[-3], 16)
+        except (IndexError, ValueError):
+            return None
+        return json.dumps(synthetic.feature(index)).encode()
+
+    def body(self, key: tuple):
+        """The body for ('active', None), ('area', 'TX') or ('alert', id), with its ETag."""
+        with self._lock:
+            if key not in self._bodies:
+                body = self._build(key)
+                self._bodies[key] = (body, f'"{hashlib.md5(body).hexdigest()}"' if body else None)
+            return self._bodies[key]
+
+
+def _route(path: str):
+    parts = urlsplit(path)
+    if parts.path.rstrip('/') == '/alerts/active':
+        area = parse_qs(parts.query).get('area')
+        return ('area', area[0].upper()) if area else ('active', None)
+    if parts.path.startswith('/alerts/'):
+        return ('alert', parts.path[len('/alerts/'):])
+    return None
+
+
+def make_handler(fixtures: Fixtures):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # keep-alive, like the real API.
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, headers: dict = None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with fixtures._lock:
+                slow, error = fixtures._random.random() < fixtures.slow_rate, fixtures._random.random() < fixtures.error_rate
+            if slow:
+                time.sleep(fixtures.slow_seconds)
+            if error:
+                self._send(503, b'Service Unavailable', {'Content-Type': 'text/plain'})
+                return
+
+            key = _route(self.path)
+            body, etag = fixtures.body(key) if key is not None else (None, None)
+            if body is None:
+                error = {'correlationId': '0', 'title': 'Not Found', 'status': 404, 'detail': f'{self.path} not found'}
+                self._send(404, json.dumps(error).encode(), {'Content-Type': 'application/problem+json'})
+                return
+
+            headers = {'ETag': etag, 'Cache-Control': f'public, max-age={fixtures.max_age}',
+                       'Content-Type': 'application/geo+json'}
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, b'', headers)
+                return
+            self._send(200, body, headers)
+
+    return Handler
+
+
+def start(fixtures: Fixtures = None, port: int = 0) -> ThreadingHTTPServer:
+    """Starts the server on a background thread. Its URL is `url(server)`."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(fixtures or Fixtures()))
+    server.daemon_threads = True
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server
+
+
+def url(server: ThreadingHTTPServer) -> str:
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--port', type = int, default = 8765)
+    parser.add_argument('--fixtures', help = 'Directory of recorded responses to serve instead of synthetic ones.')
+    parser.add_argument('--per-area', type = int, default = DEFAULT_PER_AREA)
+    parser.add_argument('--nationwide', type = int, default = DEFAULT_NATIONWIDE)
+    parser.add_argument('--max-age', type = int, default = 0, help = 'The Cache-Control max-age to send.')
+    parser.add_argument('--warm', action = 'store_true', help = 'Build the nationwide collection before serving.')
+    parser.add_argument('--slow-rate', type = float, default = 0.0, help = 'Fraction of responses to hold back.')
+    parser.add_argument('--slow-seconds', type = float, default = 10.0, help = 'How long to hold them back for.')
+    parser.add_argument('--error-rate', type = float, default = 0.0, help = 'Fraction of requests to answer with a 503.')
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures(args.fixtures, args.per_area, args.nationwide, args.max_age, args.slow_rate,
+                        args.slow_seconds, args.error_rate)
+    if args.warm:
+        fixtures.body(('active', None))
+    server = start(fixtures, args.port)
+    print(f"Serving the stand-in API on {url(server)} (Ctrl+C to stop)", flush = True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
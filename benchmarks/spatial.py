@@ -0,0 +1,92 @@
+"""Throughput of point lookups against the polygons of a nationwide snapshot.
+
+Builds the spatial index over a synthetic collection of alerts (about 40% of which have a
+polygon, like the real thing) and looks up batches of random points across the CONUS,
+reporting points per second. A plain Python loop over every polygon is timed on a sample
+of the points for comparison, and used to check the index's answers.
+
+    python benchmarks/spatial.py
+    python benchmarks/spatial.py --alerts 10000 --points 1000 100000 --json results.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+from cli.utils.records import AlertRecord # noqa: E402
+from cli.utils.spatial import SpatialIndex # noqa: E402
+import synthetic # noqa: E402
+
+
+def naive_lookup(records: list, lat: float, lon: float) -> list:
+    # Every polygon, every point, no index.
+    found = []
+    for position, record in enumerate(records):
+        for ring in record.polygons:
+            inside = False
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+                if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+            if inside:
+                found.append(position)
+                break
+    return found
+
+
+def random_points(count: int, seed: int = 1) -> tuple:
+    rng = random.Random(seed)
+    return [rng.uniform(25, 49) for _ in range(count)], [rng.uniform(-124, -67) for _ in range(count)]
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--alerts', type = int, default = 10000)
+    parser.add_argument('--points', type = int, nargs = '+', default = [1000, 10000, 100000])
+    parser.add_argument('--naive-sample', type = int, default = 200,
+                        help = 'Number of points to time (and check) the plain Python loop on.')
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    records = [AlertRecord.from_feature(feature) for feature in synthetic.collection(args.alerts)['features']]
+
+    start = time.perf_counter()
+    index = SpatialIndex(records)
+    build = time.perf_counter() - start
+    print(f"{args.alerts} alerts, {len(index)} polygons: index built in {build * 1000:.1f} ms ({len(index.grid)} grid cells)")
+
+    lats, lons = random_points(args.naive_sample)
+    start = time.perf_counter()
+    expected = [naive_lookup(records, lat, lon) for lat, lon in zip(lats, lons)]
+    naive_rate = args.naive_sample / (time.perf_counter() - start)
+    if index.lookup(lats, lons) != expected:
+        print("  the index disagrees with the plain Python loop!")
+        return 1
+    print(f"  {'plain Python loop':<20} {naive_rate:>12,.0f} points/s")
+
+    results = [{'method': 'naive', 'points': args.naive_sample, 'points_per_second': round(naive_rate)}]
+    for count in args.points:
+        lats, lons = random_points(count)
+        start = time.perf_counter()
+        found = index.lookup(lats, lons)
+        elapsed = time.perf_counter() - start
+        hits = sum(1 for matches in found if matches)
+        results.append({'method': 'index', 'points': count, 'points_per_second': round(count / elapsed),
+                        'ms': round(elapsed * 1000, 2), 'points_with_alerts': hits})
+        print(f"  {f'index, {count} points':<20} {count / elapsed:>12,.0f} points/s   ({hits} in an alert)")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'alerts': args.alerts, 'polygons': len(index),
+                       'build_ms': round(build * 1000, 2), 'results': results}, f, indent = 2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
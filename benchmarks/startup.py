@@ -0,0 +1,145 @@
+"""Startup time benchmark for the richwx CLI.
+
+Runs a handful of cheap commands in fresh interpreters and reports the wall-clock time
+along with a `-X importtime` breakdown of the slowest imports. Each command is run
+"cold" (no bytecode cache, so every module is compiled) and "warm" (bytecode cache
+already populated).
+
+Run it from the root of the repo:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --json results.json
+    python benchmarks/startup.py --max-warm-ms 150   # exits 1 if a command gets slower
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+CLI = os.path.join(ROOT, 'richwx', 'cli', 'cli.py')
+
+COMMANDS = {
+    'help': ['--help'],
+    'auth check': ['auth', 'check'],
+    'alerts help': ['alerts', '--help'],
+}
+
+
+def _run(args: list, env: dict, importtime: bool = False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += [CLI] + args
+
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd = ROOT, env = env, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE,
+                          text = True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"`{' '.join(args)}` exited with {proc.returncode}:\n{proc.stderr}")
+    return elapsed, proc.stderr
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Parses `-X importtime` output into {module: (self us, cumulative us, depth)}.
+
+    The depth is how deeply nested the import was, 0 being imported directly by the script.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def top_level_imports(modules: dict, n: int = 10) -> list:
+    """The top level packages that took the longest to import, by cumulative time."""
+    packages = {}
+    for name, (_, cumulative, depth) in modules.items():
+        if depth != 0:
+            continue
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + cumulative
+    return sorted(packages.items(), key = lambda item: item[1], reverse = True)[:n]
+
+
+def bench(name: str, args: list, runs: int) -> dict:
+    env = dict(os.environ)
+    cold_times = []
+    for _ in range(runs):
+        # A fresh, empty bytecode cache every run so that every module gets compiled.
+        prefix = tempfile.mkdtemp(prefix = 'richwx-pycache-')
+        try:
+            cold_times.append(_run(args, dict(env, PYTHONPYCACHEPREFIX = prefix))[0])
+        finally:
+            shutil.rmtree(prefix, ignore_errors = True)
+
+    prefix = tempfile.mkdtemp(prefix = 'richwx-pycache-')
+    try:
+        warm_env = dict(env, PYTHONPYCACHEPREFIX = prefix)
+        _run(args, warm_env) # populate the bytecode cache.
+        warm_times = [_run(args, warm_env)[0] for _ in range(runs)]
+        _, stderr = _run(args, warm_env, importtime = True)
+    finally:
+        shutil.rmtree(prefix, ignore_errors = True)
+
+    modules = parse_importtime(stderr)
+    return {
+        'command': name,
+        'args': args,
+        'cold_ms': round(statistics.median(cold_times) * 1000, 2),
+        'warm_ms': round(statistics.median(warm_times) * 1000, 2),
+        'warm_min_ms': round(min(warm_times) * 1000, 2),
+        'import_ms': round(sum(self_us for self_us, _, _ in modules.values()) / 1000, 2),
+        'top_imports_ms': [(package, round(us / 1000, 2)) for package, us in top_level_imports(modules)],
+    }
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--runs', type = int, default = 5, help = 'Runs per command (median is reported).')
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    parser.add_argument('--max-warm-ms', type = float, help = 'Fail if any command is slower than this warm.')
+    parser.add_argument('commands', nargs = '*', metavar = 'command',
+                        help = f"Which commands to run ({', '.join(COMMANDS)}). Defaults to all of them.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.commands if name not in COMMANDS]
+    if unknown:
+        parser.error(f"unknown command(s): {', '.join(unknown)}")
+
+    results = [bench(name, COMMANDS[name], args.runs) for name in (args.commands or COMMANDS)]
+
+    for result in results:
+        print(f"{result['command']:<12} cold {result['cold_ms']:>8.1f} ms   warm {result['warm_ms']:>8.1f} ms   "
+              f"imports {result['import_ms']:>7.1f} ms")
+        for package, ms in result['top_imports_ms']:
+            print(f"    {package:<24} {ms:>8.1f} ms")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+
+    if args.max_warm_ms is not None:
+        slow = [r['command'] for r in results if r['warm_ms'] > args.max_warm_ms]
+        if slow:
+            print(f"\nSlower than {args.max_warm_ms} ms: {', '.join(slow)}", file = sys.stderr)
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""End-to-end benchmark suite, run against the local stand-in API (no network needed).
+
+Each scenario runs the real CLI in a fresh process (`python richwx/cli/cli.py ...`) with
+`RICHWX_API_URL` pointed at `benchmarks/server.py`, a throwaway config and cache, and
+`--timings-json`. For every scenario it records the wall time, the per-phase timings the
+CLI reports (import, http, decode, rows, render, ...) and the peak memory of the process.
+
+Results are written as JSON and can be compared against a stored baseline; the run fails
+if any scenario got slower than the threshold allows.
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py --runs 5 --json results.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --threshold 1.25
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+
+Baselines are only meaningful on the machine they were recorded on. Record one before
+making a change, and compare after.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+import server # noqa: E402
+import synthetic # noqa: E402
+
+# name -> CLI arguments. Scenarios ending in `-cached` run with the cache from the run
+# before them; everything else starts from an empty cache.
+SCENARIOS = {
+    'startup-help': ['--help'],
+    'state-tx': ['alerts', 'state', 'TX'],
+    'state-tx-cached': ['alerts', 'state', 'TX'],
+    'state-tx-stream': ['alerts', 'state', 'TX', '--stream'],
+    'state-tx-ndjson': ['alerts', 'state', 'TX', '--format', 'ndjson'],
+    'state-gulf-coast': ['alerts', 'state', '--region', 'gulf-coast'],
+    'all-10k-csv': ['alerts', 'all', '--refresh', '--format', 'csv'],
+    'all-10k-filtered': ['alerts', 'all', '--refresh', '--state', 'TX', '--severity', 'Extreme'],
+    'query-10k-cached': ['alerts', 'query', '--event', 'Tornado Warning', '--format', 'ndjson'],
+    'summary-10k-cached': ['alerts', 'summary'],
+    'id-single': ['alerts', 'id', synthetic.alert_id(7)],
+    'id-batch-25': ['alerts', 'id'] + [synthetic.alert_id(i) for i in range(25)],
+}
+
+# How much slower than the baseline a scenario may get before the run fails.
+DEFAULT_THRESHOLD = 1.2
+
+
+def start_server(args) -> tuple:
+    """Starts `server.py` in its own process and waits until it's serving.
+
+    It runs separately so that this process stays small: on Linux a child's peak memory
+    starts out at its parent's, which would hide the CLI's own.
+    """
+    command = [sys.executable, os.path.join(HERE, 'server.py'), '--port', '0', '--per-area', str(args.per_area),
+               '--nationwide', str(args.nationwide), '--warm']
+    if args.fixtures:
+        command += ['--fixtures', args.fixtures]
+    process = subprocess.Popen(command, stdout = subprocess.PIPE, text = True)
+    line = process.stdout.readline() # "Serving the stand-in API on http://127.0.0.1:PORT ..."
+    if not line:
+        raise RuntimeError("The benchmark server didn't start.")
+    return process, line.split(' on ', 1)[1].split()[0]
+
+
+def run_once(args: list, env: dict) -> dict:
+    """Runs the CLI once. Returns its wall time, reported phases and peak memory."""
+    command = [sys.executable, os.path.join('richwx', 'cli', 'cli.py'), '--timings-json'] + args
+    stderr = tempfile.TemporaryFile()
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd = ROOT, env = env, stdout = subprocess.DEVNULL, stderr = stderr)
+    # wait4 gives the resource usage of this one process (getrusage would lump every child together).
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    process.returncode = returncode
+
+    stderr.seek(0)
+    lines = stderr.read().decode(errors = 'replace').strip().splitlines()
+    if returncode != 0:
+        raise RuntimeError(f"`{' '.join(args)}` exited with {returncode}:\n" + '\n'.join(lines[-10:]))
+
+    # --timings-json writes one JSON line to stderr when the command finishes.
+    report = {}
+    for line in reversed(lines):
+        if line.startswith('{"total_ms"'):
+            report = json.loads(line)
+            break
+
+    return {
+        'wall_ms': wall * 1000,
+        'phases_ms': report.get('phases_ms', {}),
+        'counters': report.get('counters', {}),
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        'peak_rss_kb': usage.ru_maxrss // (1024 if sys.platform == 'darwin' else 1),
+    }
+
+
+def run_scenario(name: str, args: list, runs: int, env: dict, cache_dir: str) -> dict:
+    samples = []
+    for _ in range(runs):
+        if not name.endswith('-cached'):
+            shutil.rmtree(cache_dir, ignore_errors = True)
+        samples.append(run_once(args, env))
+
+    phases = sorted({phase for sample in samples for phase in sample['phases_ms']})
+    return {
+        'args': args,
+        'runs': runs,
+        'wall_ms': round(statistics.median(sample['wall_ms'] for sample in samples), 2),
+        'wall_ms_min': round(min(sample['wall_ms'] for sample in samples), 2),
+        'phases_ms': {phase: round(statistics.median(sample['phases_ms'].get(phase, 0.0) for sample in samples), 2)
+                      for phase in phases},
+        'http_bytes': samples[-1]['counters'].get('http_bytes', 0),
+        'peak_rss_kb': max(sample['peak_rss_kb'] for sample in samples),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Prints each scenario against the baseline. Returns the names of the ones that regressed."""
+    regressed = []
+    print(f"\n{'scenario':<20} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for name, result in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            print(f"{name:<20} {'-':>10} {result['wall_ms']:>10.1f}")
+            continue
+        ratio = result['wall_ms'] / before['wall_ms'] if before['wall_ms'] else float('inf')
+        flag = '  << slower' if ratio > threshold else ''
+        print(f"{name:<20} {before['wall_ms']:>10.1f} {result['wall_ms']:>10.1f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--runs', type = int, default = 3, help = 'Runs per scenario (the median is reported).')
+    parser.add_argument('--scenarios', nargs = '+', choices = list(SCENARIOS), metavar = 'NAME',
+                        help = f"Only run these. One or more of: {', '.join(SCENARIOS)}.")
+    parser.add_argument('--fixtures', help = 'Directory of recorded responses for the server (see server.py).')
+    parser.add_argument('--per-area', type = int, default = server.DEFAULT_PER_AREA)
+    parser.add_argument('--nationwide', type = int, default = server.DEFAULT_NATIONWIDE)
+    parser.add_argument('--json', dest = 'json_path', help = 'Write the results to this file.')
+    parser.add_argument('--baseline', help = 'Compare against the results in this file.')
+    parser.add_argument('--save-baseline', help = 'Write the results to this file, to compare against later.')
+    parser.add_argument('--threshold', type = float, default = DEFAULT_THRESHOLD,
+                        help = 'Fail if a scenario takes more than this times its baseline.')
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    api, api_url = start_server(args)
+
+    workdir = tempfile.mkdtemp(prefix = 'richwx-bench-')
+    cache_dir = os.path.join(workdir, 'cache')
+    config = os.path.join(workdir, 'config.ini')
+    with open(config, 'w') as f:
+        f.write(f"[UserAgent]\napplicationname = RichWxBenchmark\ncontactinfo = benchmark@example.com\n\n"
+                f"[Cache]\ndirectory = {cache_dir}\n")
+    env = dict(os.environ, RICHWX_API_URL = api_url, RICHWX_CONFIG = config, COLUMNS = '160')
+
+    results = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'per_area': args.per_area,
+        'nationwide': args.nationwide,
+        'scenarios': {},
+    }
+    try:
+        print(f"{'scenario':<20} {'wall ms':>10} {'import':>8} {'http':>8} {'decode':>8} {'snapshot':>8} {'rows':>8} {'render':>8} {'peak MB':>8}")
+        for name in names:
+            result = run_scenario(name, SCENARIOS[name], args.runs, env, cache_dir)
+            results['scenarios'][name] = result
+            phases = result['phases_ms']
+            print(f"{name:<20} {result['wall_ms']:>10.1f}" + ''.join(f" {phases.get(phase, 0.0):>8.1f}" for phase in
+                  ('import', 'http', 'decode', 'snapshot', 'rows', 'render')) + f" {result['peak_rss_kb'] / 1024:>8.1f}")
+    finally:
+        api.terminate()
+        api.wait()
+        shutil.rmtree(workdir, ignore_errors = True)
+
+    for path in (args.json_path, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent = 2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(results, json.load(f), args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} scenario(s) slower than {args.threshold}x the baseline: {', '.join(regressed)}")
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
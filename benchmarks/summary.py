@@ -0,0 +1,82 @@
+"""Summarising a nationwide collection (`richwx alerts summary`), from records and from an exported file.
+
+Builds a synthetic collection of each size, then times the three parts of a summary: counting
+it from `AlertRecord`s (what the command does with the JSON snapshot), counting it straight
+from the columns of an exported (packed) snapshot, and drawing the result. Checks that both
+ways of counting agree.
+
+    python benchmarks/summary.py
+    python benchmarks/summary.py --alerts 1000 10000 50000 --json results.json
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+from rich.console import Console # noqa: E402
+
+from cli.utils import packed, render # noqa: E402
+from cli.utils.records import AlertRecord # noqa: E402
+from cli.utils.summary import AlertSummary # noqa: E402
+import synthetic # noqa: E402
+
+
+def best_ms(repeat: int, run) -> tuple:
+    # The fastest of `repeat` runs, and what the last one returned.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+def _key(summary: AlertSummary) -> tuple:
+    groups = [(group.event, group.severity, group.count, group.states, group.earliest, group.latest)
+              for group in summary.groups]
+    return summary.total, summary.by_state, summary.by_event, summary.by_severity, summary.by_urgency, groups
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--alerts', type = int, nargs = '+', default = [1000, 10000])
+    parser.add_argument('--repeat', type = int, default = 5, help = 'Runs of each part; the fastest is kept.')
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"\n{'alerts':>8} {'records':>10} {'packed':>10} {'render':>10} {'groups':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.alerts:
+            records = [AlertRecord.from_feature(feature) for feature in synthetic.collection(size)['features']]
+            path = os.path.join(directory, 'snapshot.rwx')
+            packed.write(records, path, 0.0)
+
+            from_records, summary = best_ms(args.repeat, lambda: AlertSummary.from_records(records))
+            with packed.PackedSnapshot(path) as snapshot:
+                from_packed, other = best_ms(args.repeat, lambda: AlertSummary.from_packed(snapshot))
+            if _key(summary) != _key(other):
+                print("  !! the records and the packed file summarise differently")
+                return 1
+
+            drawn, _ = best_ms(args.repeat, lambda: render.print_summary(Console(file = io.StringIO(), width = 150),
+                                                                         summary, "the US"))
+            results.append({'alerts': size, 'records_ms': round(from_records, 2), 'packed_ms': round(from_packed, 2),
+                            'render_ms': round(drawn, 2), 'groups': len(summary.groups)})
+            print(f"{size:>8} {from_records:>7.1f} ms {from_packed:>7.1f} ms {drawn:>7.1f} ms {len(summary.groups):>7}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
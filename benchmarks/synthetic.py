@@ -0,0 +1,122 @@
+"""Synthetic `/alerts/active` data for the benchmarks.
+
+The alerts are shaped like the real thing (same properties, similar sizes for the
+description, polygons, geocodes and parameters) and are generated from a fixed seed, so
+every run sees exactly the same data.
+"""
+import random
+
+STATES = ['AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY',
+          'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND',
+          'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY']
+
+EVENTS = ['Flood Warning', 'Flood Watch', 'Flash Flood Warning', 'Wind Advisory', 'Red Flag Warning',
+          'Winter Storm Warning', 'Winter Weather Advisory', 'Special Weather Statement', 'Tornado Warning',
+          'Tornado Watch', 'Severe Thunderstorm Warning', 'Severe Thunderstorm Watch', 'Small Craft Advisory',
+          'Heat Advisory', 'Dense Fog Advisory', 'Rip Current Statement', 'Beach Hazards Statement',
+          'Fire Weather Watch', 'Air Quality Alert', 'Coastal Flood Advisory']
+
+SEVERITIES = ['Extreme', 'Severe', 'Moderate', 'Minor', 'Unknown']
+URGENCIES = ['Immediate', 'Expected', 'Future', 'Past', 'Unknown']
+MESSAGE_TYPES = ['Alert', 'Alert', 'Alert', 'Update', 'Cancel']
+
+ID_PREFIX = 'urn:oid:2.49.0.1.840.0.'
+BASE_URL = 'https://api.weather.gov'
+
+_WORDS = ('rain', 'river', 'flooding', 'expected', 'gusts', 'up', 'to', 'mph', 'county', 'travel', 'could',
+          'be', 'very', 'difficult', 'minor', 'moderate', 'stage', 'feet', 'the', 'of', 'and', 'until')
+
+
+def alert_id(index: int) -> str:
+    return f"{ID_PREFIX}{index:040x}.001.1"
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _polygon(rng: random.Random, lon: float, lat: float, points: int) -> list:
+    ring = []
+    for i in range(points):
+        ring.append([round(lon + rng.uniform(-0.5, 0.5), 4), round(lat + rng.uniform(-0.5, 0.5), 4)])
+    ring.append(ring[0])
+    return [ring]
+
+
+def feature(index: int, rng: random.Random = None, state: str = None) -> dict:
+    """Makes one alert feature. The same index always gives back the same alert."""
+    rng = rng or random.Random(index)
+    state = state or rng.choice(STATES)
+    event = rng.choice(EVENTS)
+    zones = [f"{state}Z{rng.randint(1, 300):03d}" for _ in range(rng.randint(1, 8))]
+    counties = [f"{state}C{rng.randint(1, 250):03d}" for _ in range(rng.randint(1, 4))]
+    has_polygon = rng.random() < 0.4
+    lon, lat = rng.uniform(-124, -67), rng.uniform(25, 49)
+    id = alert_id(index)
+    day = 1 + index % 27
+
+    return {
+        'id': f"{BASE_URL}/alerts/{id}",
+        'type': 'Feature',
+        'geometry': {'type': 'Polygon', 'coordinates': _polygon(rng, lon, lat, rng.randint(4, 30))} if has_polygon else None,
+        'properties': {
+            '@id': f"{BASE_URL}/alerts/{id}",
+            '@type': 'wx:Alert',
+            'id': id,
+            'areaDesc': '; '.join(f"County {zone[-3:]}, {state}" for zone in zones),
+            'geocode': {'SAME': [f"0{rng.randint(10000, 56999)}" for _ in counties], 'UGC': zones + counties},
+            'affectedZones': [f"{BASE_URL}/zones/forecast/{zone}" for zone in zones],
+            'references': [{'@id': f"{BASE_URL}/alerts/{alert_id(index + 1000000 + i)}", 'identifier': alert_id(index + 1000000 + i),
+                            'sender': 'w-nws.webmaster@noaa.gov', 'sent': f"2024-05-{day:02d}T06:00:00-05:00"}
+                           for i in range(rng.randint(0, 3))],
+            'sent': f"2024-05-{day:02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00-05:00",
+            'effective': f"2024-05-{day:02d}T12:00:00-05:00",
+            'onset': f"2024-05-{day:02d}T12:00:00-05:00",
+            'expires': f"2024-05-{day + 1:02d}T{rng.randint(0, 23):02d}:00:00-05:00",
+            'ends': f"2024-05-{day + 1:02d}T18:00:00-05:00" if rng.random() < 0.5 else None,
+            'status': 'Actual',
+            'messageType': rng.choice(MESSAGE_TYPES),
+            'category': 'Met',
+            'severity': rng.choice(SEVERITIES),
+            'certainty': rng.choice(['Observed', 'Likely', 'Possible']),
+            'urgency': rng.choice(URGENCIES),
+            'event': event,
+            'sender': 'w-nws.webmaster@noaa.gov',
+            'senderName': f"NWS Office {rng.randint(1, 120)} {state}",
+            'headline': f"{event} issued May {day} by NWS",
+            'description': _text(rng, rng.randint(60, 400)),
+            'instruction': _text(rng, rng.randint(10, 80)) if rng.random() < 0.7 else None,
+            'response': 'Monitor',
+            'parameters': {'AWIPSidentifier': ['FLWXXX'], 'WMOidentifier': ['WGUS84 KXXX 011200'],
+                           'NWSheadline': [f"{event.upper()} IN EFFECT"], 'BLOCKCHANNEL': ['EAS', 'NWEM', 'CMAS'],
+                           'VTEC': [f"/O.NEW.KXXX.FL.W.{index % 10000:04d}.240501T1200Z-240502T1800Z/"]},
+        },
+    }
+
+
+def collection(count: int, seed: int = 0, state: str = None) -> dict:
+    """Makes a FeatureCollection with `count` alerts, as `/alerts/active` would return."""
+    rng = random.Random(seed)
+    return {
+        '@context': ['https://geojson.org/geojson-ld/geojson-context.jsonld', {'@version': '1.1'}],
+        'type': 'FeatureCollection',
+        'features': [feature(seed * 10000000 + i, rng, state) for i in range(count)],
+        'title': 'Current watches, warnings, and advisories',
+        'updated': '2024-05-01T12:00:00+00:00',
+    }
+
+
+def zones() -> list:
+    """Makes a zone dump (the JSON `richwx zones build` reads) with every UGC code `feature`
+    can give an alert: the forecast and fire zones Z001-Z300 and the counties C001-C250 of
+    every state."""
+    dump = []
+    for number, state in enumerate(STATES):
+        lat, lon = 25 + number % 6 * 4, -124 + number // 6 * 6
+        for kind, letter, count in (('forecast', 'Z', 300), ('fire', 'Z', 300), ('county', 'C', 250)):
+            for i in range(1, count + 1):
+                south, west = lat + i % 20 * 0.2, lon + i // 20 * 0.3
+                dump.append({'code': f"{state}{letter}{i:03d}", 'kind': kind, 'name': f"{kind.title()} {i:03d}, {state}",
+                             'state': state, 'lat': south + 0.1, 'lon': west + 0.15,
+                             'bbox': [south, west, south + 0.2, west + 0.3]})
+    return dump
@@ -0,0 +1,120 @@
+"""Request latency when the API has a slow tail, with and without hedging.
+
+Starts the stand-in API with a fraction of its responses held back (`--slow-rate` of them,
+for `--slow-seconds`), makes the same run of per-area requests through `nws` with hedging
+off and then on, and reports the latency percentiles of each. Then takes the API down
+altogether and shows the circuit breaker opening and cached responses being served stale.
+
+    python benchmarks/tail_latency.py
+    python benchmarks/tail_latency.py --requests 400 --slow-rate 0.05 --slow-seconds 10 --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+import server # noqa: E402
+import synthetic # noqa: E402
+
+_fixtures = server.Fixtures(per_area = 50)
+_server = server.start(_fixtures)
+os.environ['RICHWX_API_URL'] = server.url(_server)
+
+from nwsapy import api_connector # noqa: E402
+
+from cli.utils import nws # noqa: E402
+from cli.utils.cache import ResponseCache # noqa: E402
+from cli.utils.resilience import CircuitBreaker, LatencyTracker # noqa: E402
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(count: int, hedge: bool) -> dict:
+    nws.configure(hedge = hedge)
+    nws.latencies = LatencyTracker()
+    nws.breaker = CircuitBreaker()
+    areas = synthetic.STATES
+    latencies = []
+    failures = 0
+    for index in range(count):
+        start = time.perf_counter()
+        try:
+            nws.get_active_alerts(area = areas[index % len(areas)])
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return {
+        'hedge': hedge,
+        'requests': count,
+        'failures': failures,
+        **{f'p{p}_ms': round(percentile(latencies, p) * 1000, 1) for p in (50, 90, 99)},
+        'max_ms': round(max(latencies) * 1000, 1),
+    }
+
+
+def outage(cache_dir: str) -> dict:
+    # Fill the cache, take the API down, and see what the next requests get.
+    nws.breaker = CircuitBreaker(threshold = 3, cooldown = 30)
+    cache = ResponseCache(cache_dir)
+    fixtures = _fixtures
+    fixtures.slow_rate = 0.0
+    areas = synthetic.STATES[:10]
+    for area in areas:
+        nws.get_active_alerts(cache = cache, max_age = 0, area = area)
+
+    fixtures.error_rate = 1.0
+    nws.stale.drain()
+    timings = []
+    for area in areas:
+        start = time.perf_counter()
+        nws.get_active_alerts(cache = cache, max_age = 0, area = area)
+        timings.append(round((time.perf_counter() - start) * 1000, 1))
+    fixtures.error_rate = 0.0
+    return {'served_stale': len(nws.stale.drain()), 'breaker_open': nws.breaker.is_open, 'latencies_ms': timings}
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--requests', type = int, default = 200)
+    parser.add_argument('--slow-rate', type = float, default = 0.05)
+    parser.add_argument('--slow-seconds', type = float, default = 10.0)
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    api_connector.set_user_agent('RichWxBenchmark', 'benchmark@example.com')
+    fixtures = _fixtures
+    fixtures.slow_rate, fixtures.slow_seconds = args.slow_rate, args.slow_seconds
+
+    print(f"\n{args.requests} requests, {args.slow_rate:.0%} of them held back {args.slow_seconds:g}s")
+    results = []
+    for hedge in (False, True):
+        fixtures._random.seed(0) # the same slow requests each time.
+        result = run(args.requests, hedge)
+        results.append(result)
+        print(f"  hedging {'on ' if hedge else 'off'}   p50 {result['p50_ms']:>8.1f} ms   p90 {result['p90_ms']:>8.1f} ms"
+              f"   p99 {result['p99_ms']:>8.1f} ms   max {result['max_ms']:>8.1f} ms   {result['failures']} failed")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        down = outage(cache_dir)
+    print(f"\nAPI down: {down['served_stale']} responses served stale from the cache, breaker "
+          f"{'open' if down['breaker_open'] else 'closed'}, latencies (ms) {down['latencies_ms']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results, 'outage': down}, f, indent = 2)
+
+    _server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Resolving the zones of a nationwide collection from the zone index (`cli.utils.zones`).
+
+Writes the synthetic zone dump (every zone the synthetic alerts name) as JSON, builds an
+index from it the way `richwx zones build` does, then times opening the index and resolving
+every UGC code of every alert to its `Zone`: once from a freshly opened index, and again
+with the zones it already decoded. Checks that every code was found.
+
+    python benchmarks/zones.py
+    python benchmarks/zones.py --alerts 1000 10000 50000 --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'richwx'))
+sys.path.insert(0, HERE)
+
+from cli.utils import zones # noqa: E402
+from cli.utils.records import AlertRecord # noqa: E402
+import synthetic # noqa: E402
+
+
+def _ms(run) -> tuple:
+    start = time.perf_counter()
+    result = run()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--alerts', type = int, nargs = '+', default = [1000, 10000])
+    parser.add_argument('--json', dest = 'json_path', help = 'Also write the results to this file.')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        source, path = os.path.join(directory, 'zones.json'), os.path.join(directory, 'zones.rwz')
+        with open(source, 'w') as f:
+            json.dump(synthetic.zones(), f)
+        built, count = _ms(lambda: zones.write(zones.read_source(source), path, 'synthetic'))
+        print(f"\nBuilt {count} zones ({os.path.getsize(path) / 1024:.0f} KiB) in {built:.0f} ms")
+
+        results = []
+        print(f"\n{'alerts':>8} {'zones':>8} {'open':>9} {'cold':>12} {'warm':>12}")
+        for size in args.alerts:
+            records = [AlertRecord.from_feature(feature) for feature in synthetic.collection(size)['features']]
+            codes = sum(len(record.ugc) for record in records)
+
+            opened, index = _ms(lambda: zones.ZoneIndex(path))
+            with index:
+                cold, resolved = _ms(lambda: [index.resolve(record) for record in records])
+                warm, _ = _ms(lambda: [index.resolve(record) for record in records])
+            found = sum(len(zones_) for zones_ in resolved)
+            if found != codes:
+                print(f"  !! found {found} of {codes} zones")
+                return 1
+
+            cold_us, warm_us = cold * 1000 / size, warm * 1000 / size
+            results.append({'alerts': size, 'zones': codes, 'open_ms': round(opened, 3),
+                            'cold_us_per_alert': round(cold_us, 2), 'warm_us_per_alert': round(warm_us, 2)})
+            print(f"{size:>8} {codes:>8} {opened:>6.2f} ms {cold_us:>6.1f} µs/alert {warm_us:>6.1f} µs/alert")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
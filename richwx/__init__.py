@@ -0,0 +1,52 @@
+"""RichWx: NWS alerts in the terminal, and in Python.
+
+    from richwx import AlertsClient
+
+    client = AlertsClient(contact = 'ops@example.com')
+    for record in client.active_alerts(areas = ['TX', 'LA']):
+        print(record.event, record.area_desc, record.expires)
+
+See `cli.utils.client` for the client and `render` for drawing the alerts with Rich.
+Everything is imported on first use, so `import richwx` itself costs next to nothing.
+
+`import richwx` leaves `sys.path` alone. The modules import each other as `cli.utils...`,
+so the first name you get from it (i.e. `richwx.AlertsClient`) adds this directory to
+`sys.path`, which also makes a top level `cli` package importable from then on.
+"""
+import importlib
+import os
+import sys
+
+# The modules import each other as `cli.utils...`, from this directory. `richwx` the
+# command does the same.
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# What `from richwx import ...` can get, and where it lives.
+_EXPORTS = {
+    'AlertsClient': 'cli.utils.client',
+    'AlertsResult': 'cli.utils.client',
+    'AreaError': 'cli.utils.client',
+    'AlertFilter': 'cli.utils.snapshot',
+    'AlertRecord': 'cli.utils.records',
+    'AlertSummary': 'cli.utils.summary',
+    'ZoneIndex': 'cli.utils.zones',
+    'render': 'cli.utils.render',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'richwx' has no attribute {name!r}")
+    if _HERE not in sys.path:
+        sys.path.insert(0, _HERE)
+    module = importlib.import_module(module)
+    value = module if module.__name__.endswith('.' + name) else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
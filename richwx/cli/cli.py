@@ -1,25 +1,82 @@
+import time
+_STARTED = time.perf_counter() # for `--timings`, as close to the start as it gets.
+
 import click
-from rich.console import Console
 import os
 import sys
 sys.path.insert(0, os.path.join(os.path.abspath("."), 'richwx')) # guarentees that the path of this is added. Please work.
 
-from cli.utils.handlers import UserAgentHandler
+from cli.utils import daemon
+from cli.utils.lazy import LazyGroup, LazyObj
+from cli.utils.timings import timings as phases
+
+
+def _console():
+    from rich.console import Console
+    return Console()
+
+
+def _user_agent():
+    from cli.utils.handlers import UserAgentHandler
+    return UserAgentHandler()
+
+
+def _client():
+    from cli.utils.client import AlertsClient
+    # Problems that don't stop a command (i.e. the history couldn't be written) go to stderr.
+    return AlertsClient(on_warning = lambda message: click.echo(f"richwx: {message}", err = True))
+
+
+class RichWxGroup(LazyGroup):
+    """Hands `alerts` and `auth` over to `richwx serve` when it's running, before anything
+    (the command itself included) is imported. Otherwise they run right here."""
+
+    def invoke(self, ctx):
+        args = [*ctx.protected_args, *ctx.args]
+        # --timings and --profile are about this process, so those always run here.
+        forward = daemon.forwards(args) and not any(ctx.params.values())
+        if forward:
+            code = daemon.forward(args)
+            if code is not None:
+                ctx.exit(code)
+        return super().invoke(ctx)
 
-from cli.commands.alerts import alerts
-from cli.commands.intro import intro
-from cli.commands.useragent import user_agent_group
 
 # This is the common entry point, and is called when you type richwx into the console.
-@click.group()
+# Commands are only imported once they're invoked, and the console/user agent are only
+# built once a command asks for them. Keeps `richwx --help` and `richwx auth check` snappy.
+@click.group(cls = RichWxGroup)
+@click.option("--timings", is_flag = True,
+              help = "Print how long each phase took (import, config, HTTP, decoding, rendering, ...) to stderr.")
+@click.option("--timings-json", is_flag = True, help = "Same as --timings, but as one JSON line (for collecting them).")
+@click.option("--profile", "profile_path", type = click.Path(dir_okay = False, writable = True),
+              help = "Profile the command with cProfile and write the stats (for pstats or snakeviz) to this file.")
 @click.pass_context
-def cli(ctx):
+def cli(ctx, timings, timings_json, profile_path):
     """A fun little CLI tool that utilizes the National Weather Service API to display
     weather data in the terminal."""
+
+    if timings or timings_json:
+        phases.enable(_STARTED)
+        # click resolves (and so imports) the command before getting here, so this covers it too.
+        phases.add('import', time.perf_counter() - _STARTED)
+        ctx.call_on_close(lambda: phases.write('json' if timings_json else 'text'))
+
+    if profile_path is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def write_profile():
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        ctx.call_on_close(write_profile)
         
-    ctx.obj = {'console' : Console(),
-                'user_agent' : UserAgentHandler(),
-              }
+    if ctx.obj is None: # `richwx serve` hands in its own.
+        ctx.obj = LazyObj({'console' : _console,
+                           'user_agent' : _user_agent,
+                           'client' : _client,
+                          })
 
 # Used for debugging purposes.
 @cli.command('path', hidden = True)
@@ -32,10 +89,12 @@ def path(obj):
         else:
             console.print(f"[white]\t{path}")
 
-# Add the commands here.
-cli.add_command(intro)
-cli.add_command(alerts)
-cli.add_command(user_agent_group)
+# Add the commands here: name, where to import it from, and the short help for `richwx --help`.
+cli.add_lazy_command('intro', 'cli.commands.intro:intro', 'Provides an introduction to ensure that the CLI works.')
+cli.add_lazy_command('alerts', 'cli.commands.alerts:alerts', 'Functionality for displaying NWS alerts.')
+cli.add_lazy_command('auth', 'cli.commands.useragent:user_agent_group', 'Sets metadata for NWS API maintainers.')
+cli.add_lazy_command('zones', 'cli.commands.zones:zones_group', 'Looks up NWS zones by their UGC code, without the API.')
+cli.add_lazy_command('serve', 'cli.commands.serve:serve', 'Keeps richwx loaded in the background to make commands faster.')
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
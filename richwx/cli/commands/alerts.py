@@ -1,156 +1,1153 @@
 import click
-from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
 
+from rich.live import Live
 from rich.progress import Progress
 from rich.table import Table
 
-from nwsapy import api_connector
-from nwsapy.services.validation import valid_areas
-from nwsapy.core.mapping import full_state_to_two_letter_abbreviation as fsta
-from nwsapy.core.errors import DataValidationError
-
-from cli.utils.alert_rich_strings import get_alert_object
+from cli.utils.alert_rich_strings import get_alert_style
+from cli.utils import nws, render
+from cli.utils.client import AlertsClient, AreaError
+from cli.utils.config import store
+from cli.utils.fetcher import REGIONS, expand_region, merge_alerts
+from cli.utils.changes import CANCELLED, ENDED, NEW, UPDATED, ChangeTracker
+from cli.utils.output import FORMATS, write_changes, write_records
+from cli.utils.records import format_id
+from cli.utils.scheduler import PollScheduler
+from cli.utils.snapshot import AlertFilter, AlertSnapshot
+from cli.utils.timings import timings
 
 
 @click.group('alerts')
-def alerts():
+@click.pass_context
+def alerts(ctx):
     """Functionality for displaying NWS alerts."""
-    pass
+    nws.stale.drain() # anything left from the last command under `richwx serve`.
+    ctx.call_on_close(_report_stale)
+
+
+def _report_stale() -> None:
+    """Says so if any alerts shown came from the cache because the API couldn't be reached."""
+    served = nws.stale.drain()
+    if not served:
+        return
+    age, reason = max(served.values())
+    age = f"{age:.0f} seconds" if age < 120 else f"{age / 60:.0f} minutes" if age < 7200 else f"{age / 3600:.0f} hours"
+    _warn(f"couldn't reach the API ({reason}), so these alerts are from the cache and may be out of date "
+          f"(up to {age} old).")
+
+
+def cache_options(f):
+    """Adds the `--no-cache` and `--max-age` options to a command."""
+    f = click.option("--max-age", type = float, default = None,
+                     help = "Reuse cached responses up to this many seconds old, whatever the API says.")(f)
+    f = click.option("--no-cache", is_flag = True, help = "Always go to the API and don't store the response.")(f)
+    return f
+
+
+def filter_options(f):
+    """Adds the options for filtering alerts by zone, event, severity, urgency and expiry."""
+    f = click.option("--expires-within", type = float, metavar = "HOURS",
+                     help = "Only alerts that expire within this many hours.")(f)
+    f = click.option("--urgency", multiple = True, help = "Only alerts with this urgency (i.e. Immediate). Can be repeated.")(f)
+    f = click.option("--severity", multiple = True, help = "Only alerts with this severity (i.e. Severe). Can be repeated.")(f)
+    f = click.option("--event", multiple = True, help = 'Only this kind of alert (i.e. "Flood Warning"). Can be repeated.')(f)
+    f = click.option("--zone", multiple = True, help = "Only alerts for this UGC zone or county (i.e. TXZ103). Can be repeated.")(f)
+    return f
+
+
+def format_option(f):
+    """Adds `--format`, for output that scripts can read instead of a table."""
+    return click.option("--format", "output_format", type = click.Choice(FORMATS, case_sensitive = False),
+                        help = "Write the alerts to stdout in this format instead of showing a table. Includes the full ID.")(f)
+
+
+def from_snapshot_option(f):
+    return click.option("--from-snapshot", type = click.Path(exists = True, dir_okay = False),
+                        help = "Show the alerts saved in this file by `richwx alerts export` instead, without going to the API.")(f)
+
+
+def pager_option(f):
+    return click.option("--pager", "--interactive", "pager", is_flag = True,
+                        help = "Page through the alerts (scroll, search with /, Enter for an alert's details) instead of printing them all.")(f)
+
+
+def _write_formatted(records, output_format: str) -> int:
+    with timings.phase('render'):
+        return write_records(records, output_format.lower(), click.get_text_stream('stdout'))
+
+
+def _warn(message: str) -> None:
+    # With --format, stdout is for the alerts only.
+    click.echo(f"richwx: {message}", err = True)
+
+
+def _filters(zone = (), event = (), severity = (), urgency = (), expires_within = None, states = ()) -> AlertFilter:
+    now = datetime.now(timezone.utc)
+    return AlertFilter(states = states, zones = zone, events = event, severities = severity, urgencies = urgency,
+                       expires_after = now if expires_within is not None else None,
+                       expires_before = now + timedelta(hours = expires_within) if expires_within is not None else None)
+
+
+def _client(obj) -> AlertsClient:
+    """The `AlertsClient` the command goes through (the same one for every command under `richwx serve`)."""
+    return obj['client']
+
+
+def _validate_area(client: AlertsClient, area: str) -> str:
+    """Validates a single area and returns its 2 letter abbreviation.
+
+    Raises:
+        click.BadParameter: If the area can't be abbreviated or isn't a valid area.
+    """
+    try:
+        return client.normalize_area(area)
+    except AreaError as err:
+        raise click.BadParameter(str(err))
+
+
+def _stream_alerts(console, progress, client: AlertsClient, areas: list, label: str, show_id: bool, workers: int,
+                   no_cache: bool, max_age, filters: AlertFilter = None) -> tuple:
+    """Prints each alert as soon as it's decoded, instead of building one big table.
+
+    Returns:
+        tuple: The number of alerts printed, the seconds until the first one was printed
+            (None if there weren't any), and the areas that failed.
+    """
+    area_tasks = {area: progress.add_task(f"  {area}: waiting...", total = 1) for area in areas}
+    failed = []
+    
+    def area_done(area, count, error):
+        if error is not None:
+            failed.append(area)
+            progress.update(area_tasks[area], completed = 1, description = f"  [red]{area}: failed ({error})")
+        else:
+            progress.update(area_tasks[area], completed = 1, description = f"  {area}: {count} alerts")
+    
+    console.print(f"\nAlerts for {label}, requested: {str(datetime.utcnow())} UTC\n", justify = 'center', style = "italic")
+    render.stream_row(console, render.column_names(show_id), show_id, header = True)
+    
+    start = time.perf_counter()
+    first_row = None
+    count = 0
+    stream = client.stream_active_alerts(areas, filters = filters, use_cache = not no_cache, max_age = max_age,
+                                         workers = workers, on_complete = area_done)
+    for element in stream:
+        with timings.phase('rows'):
+            cells = render.alert_cells(element, show_id)
+        render.stream_row(console, cells, show_id)
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        count += 1
+    
+    return count, first_row, failed
 
 
 @alerts.command('state')
-@click.argument('state', nargs = 1)
+@click.argument('states', nargs = -1)
+@click.option("--region", type = click.Choice(sorted(REGIONS.keys()), case_sensitive = False),
+              help = "A named group of states to fetch (i.e. gulf-coast).")
+@click.option("--workers", type = int, default = lambda: store.snapshot().getint('Fetch', 'workers'),
+              help = "Maximum number of states to fetch at the same time. Defaults to `workers` under [Fetch] in the config, or 4.")
 @click.option("--show-id", is_flag = True)
+@click.option("--stream", is_flag = True,
+              help = "Print each alert as soon as it arrives instead of waiting for all of them. Uses less memory for large areas.")
+@filter_options
+@click.option("--changes-only", is_flag = True,
+              help = "Only show what changed since the last time (the same as `richwx alerts diff`).")
+@pager_option
+@from_snapshot_option
+@format_option
+@cache_options
 @click.pass_obj
-def get_alerts(obj, state, show_id):
-    """Displays a list of NWS alerts based upon the 2 letter state abbreviation (i.e. FL)"""
+def get_alerts(obj, states, region, workers, show_id, stream, zone, event, severity, urgency, expires_within, changes_only,
+               pager, from_snapshot, output_format, no_cache, max_age):
+    """Displays a list of NWS alerts based upon one or more 2 letter state abbreviations (i.e. FL AL MS)"""
 
     console = obj['console']
-    
+    client = _client(obj)
+
+    areas = list(states)
+    if region is not None:
+        areas += expand_region(region)
+
+    if len(areas) == 0:
+        # Fall back to the `default_areas` in the [Alerts] section of the config, if there are any.
+        areas = client.config.getlist('Alerts', 'default_areas')
+
+    if len(areas) == 0:
+        console.print(f"\n=> [red bold]Attention:[/] provide at least one state or a --region.\n")
+        return
+
+    if pager and stream:
+        console.print(f"\n=> [red bold]Attention:[/] --stream and --pager can't be used together.\n")
+        return
+
+    filters = _filters(zone, event, severity, urgency, expires_within)
+
+    if from_snapshot is not None:
+        validated = _validate_states(client, console, areas)
+        if validated is not None:
+            validated = list(dict.fromkeys(validated))
+            _show_packed(obj, from_snapshot, filters.for_states(validated), ", ".join(validated), show_id, output_format,
+                         pager)
+        return
+
+    if changes_only:
+        _show_changes(obj, areas, workers, filters, (zone, event, severity, urgency, expires_within), show_id,
+                      output_format, no_cache, max_age)
+        return
+
+    if output_format is not None:
+        _write_state_alerts(obj, areas, workers, filters, output_format, no_cache, max_age)
+        return
+
     n_steps = 4
     steps_taken = 0
+    snapshot = None
 
-    with Progress() as progress:
+    with Progress(console = console) as progress:
         
         # Add a new task bar.
         task = progress.add_task('Validating input...', total = n_steps)
-        if len(state) != 2:
-            
+        
+        validated = []
+        for area in areas:
             try:
-                # full name to state abbreviation.
-                state = fsta(state)
-            except DataValidationError:
-                console.print(f"\n=> [red bold]Attention:[/] {state} can not be abbreviated. Check spelling or provide a 2 letter abbreviation (i.e. FL, MA).\n")
-                progress.update(task, advance = steps_taken, description = f'Unsuccessful data validation. See error above.')
+                with timings.phase('validation'):
+                    area = _validate_area(client, area)
+            except click.BadParameter as err:
+                console.print(f"\n=> [red bold]Attention:[/] {err.message}\n")
+                progress.update(task, advance = steps_taken, description = f"Unsuccessful data validation. See error above.")
                 return
-        
-        state = state.upper()
-        if state not in valid_areas():
-            console.print(f"\n=> [red bold]Attention:[/] {state} is not a valid state.\n")
-            progress.update(task, advance = steps_taken, description = f"Unsuccessful data validation. See error above.")
-            return
+
+            if area not in validated: # i.e. `TX --region gulf-coast`
+                validated.append(area)
+        areas = validated
+        label = ", ".join(areas)
+        title = f"Alerts for {label}, requested: {str(datetime.utcnow())} UTC"
         
         steps_taken += 1
         
         # validation happened, checking user agent.
         progress.update(task, advance = steps_taken, description = 'Checking User Agent...')
         user_agent = obj['user_agent']
-        api_connector.set_user_agent(user_agent.app_name, user_agent.contact)
-        
-        steps_taken += 1
         
-        # User agent OK and set. Fetch the data.
-        progress.update(task, advance = steps_taken, description = f"Getting alerts for {state}...")
-        data = api_connector.get_active_alerts(area = state).to_dict()
         steps_taken += 1
+
+        # A filtered list can be answered from a fresh nationwide snapshot without any requests.
+        if filters and not stream and not no_cache:
+            snapshot = client.saved_snapshot()
         
-        progress.update(task, advance = steps_taken, description = f"Creating table...")
-        table = Table(title=f"Alerts for {state}, requested: {str(datetime.utcnow())} UTC", show_lines= True)
+        if snapshot is not None:
+            records = snapshot.query(filters.for_states(areas))
+            failed = []
+            steps_taken += 1
+            progress.update(task, advance = steps_taken, description = f"Creating table...")
+            table = None if pager else render.alert_table(records, title, show_id) # the pager lays out its own.
+            progress.update(task, completed = n_steps, description = f"Completed process!")
+        elif stream:
+            # Rows are printed above the progress bars as they arrive.
+            progress.update(task, advance = steps_taken, description = f"Getting alerts for {label}...")
+            count, first_row, failed = _stream_alerts(console, progress, client, areas, label, show_id, workers,
+                                                      no_cache, max_age, filters)
+            progress.update(task, completed = n_steps, description = f"Completed process!")
+        else:
+            # User agent OK and set. Fetch the data, one progress bar per area.
+            progress.update(task, advance = steps_taken, description = f"Getting alerts for {label}...")
+            area_tasks = {area: progress.add_task(f"  {area}: waiting...", total = 1) for area in areas}
+            
+            def area_done(area, alerts, error):
+                if error is not None:
+                    progress.update(area_tasks[area], completed = 1, description = f"  [red]{area}: failed ({error})")
+                else:
+                    progress.update(area_tasks[area], completed = 1, description = f"  {area}: {len(alerts)} alerts")
+            
+            result = client.active_alerts(areas, filters = filters, use_cache = not no_cache, max_age = max_age,
+                                          use_snapshot = False, workers = workers, on_complete = area_done)
+            records, failed = result.records, list(result.failed)
+            steps_taken += 1
+            
+            progress.update(task, advance = steps_taken, description = f"Creating table...")
+            table = None if pager else render.alert_table(records, title, show_id)
+            steps_taken += 1
+            
+            # update the progress bars.
+            progress.update(task, advance = steps_taken, description = f"Completed process!")
+    
+    if len(failed) != 0:
+        console.print(f"\n=> [red bold]Attention:[/] could not get alerts for {', '.join(failed)}. They are not included {'above' if stream else 'below'}.")
+    
+    if stream:
+        console.print(f"\n=> There are [underline green]{count}[/] alerts for {label}.")
+        if first_row is not None:
+            console.print(f"=> First alert shown after [cyan]{first_row:.3f}[/] seconds.")
+        console.print()
+    else:
+        if pager:
+            _page_alerts(obj, records, title, label, show_id)
+        else:
+            render.print_table(console, table, label)
+        if snapshot is not None:
+            console.print(f"=> Answered from the nationwide snapshot taken {snapshot.age:.0f} seconds ago.\n")
+    
+    # Let the user know at the bottom that their contact information has not been set.
+    if not user_agent.contact_is_set:
+        console.print(user_agent.error_message)
+
+
+def _write_state_alerts(obj, areas: list, workers: int, filters: AlertFilter, output_format: str, no_cache: bool,
+                        max_age: float) -> None:
+    """`alerts state --format ...`: writes each alert to stdout as soon as it's decoded."""
+    client = _client(obj)
+    try:
+        areas = client.normalize_areas(areas)
+    except AreaError as err:
+        _warn(str(err))
+        raise click.exceptions.Exit(2)
+
+    snapshot = client.saved_snapshot() if filters and not no_cache else None
+    if snapshot is not None:
+        _write_formatted(snapshot.query(filters.for_states(areas)), output_format)
+        return
+
+    failed = []
+    def area_done(area, count, error):
+        if error is not None:
+            failed.append(area)
+            _warn(f"could not get alerts for {area} ({error}).")
+
+    records = client.stream_active_alerts(areas, filters = filters, use_cache = not no_cache, max_age = max_age,
+                                          workers = workers, on_complete = area_done)
+    _write_formatted(records, output_format)
+    if failed:
+        raise click.exceptions.Exit(1)
+
+
+class _WatchView:
+    """The table `alerts watch` redraws. Each alert's cells are built the first time it's seen
+    and reused until it goes away, so a redraw only builds rows for the alerts that are new."""
+
+    def __init__(self, scheduler: PollScheduler, filters: AlertFilter, show_id: bool, label: str):
+        self.scheduler = scheduler
+        self.filters = filters
+        self.show_id = show_id
+        self.label = label
+        self._cells = None # alert ID -> cells, None until the first poll comes back.
+        self.new = 0
+        self.gone = 0
+
+    def update(self) -> None:
+        with timings.phase('rows'):
+            records = merge_alerts({area: state.records for area, state in self.scheduler.areas.items()})
+            cells = {}
+            previous = self._cells or {}
+            for element in records:
+                if self.filters and not self.filters.matches(element):
+                    continue
+                cells[element.id] = previous.get(element.id) or render.alert_cells(element, self.show_id)
+
+            if self._cells is not None:
+                self.new = len(cells.keys() - previous.keys())
+                self.gone = len(previous.keys() - cells.keys())
+            self._cells = cells
+
+    def _status(self) -> str:
+        lines = []
+        for state in self.scheduler.areas.values():
+            if state.error is not None:
+                lines.append(f"[red]{state.area}: failed ({state.error}), retrying in {state.wait:.0f}s[/]")
+            elif state.records is not None:
+                lines.append(f"{state.area}: {len(state.records)} alerts, checked every {state.wait:.0f}s")
+        return "\n".join(lines)
+
+    def render(self) -> Table:
+        now = datetime.utcnow().strftime('%H:%M:%S')
+        if self._cells is None:
+            title = f"Alerts for {self.label}, waiting for the first poll..."
+        else:
+            title = f"Alerts for {self.label}, updated {now} UTC: [green]{len(self._cells)}[/] alerts"
+            if self.new or self.gone:
+                title += f" ({self.new} new, {self.gone} gone)"
+
+        with timings.phase('rows'):
+            table = render.empty_alert_table(title, self.show_id, caption = self._status() + "\n(Ctrl+C to stop)")
+            for cells in (self._cells or {}).values():
+                table.add_row(*cells)
+        return table
+
+
+def _watch_intervals(console, client: AlertsClient, areas, interval: float):
+    """Validates the areas (`TX` or `TX:30` for its own interval). Returns area -> seconds, or None if one was bad."""
+    intervals = {}
+    for area in areas:
+        area, _, seconds = area.partition(':')
+        try:
+            with timings.phase('validation'):
+                area = _validate_area(client, area)
+            seconds = float(seconds) if seconds else interval
+        except click.BadParameter as err:
+            console.print(f"\n=> [red bold]Attention:[/] {err.message}\n")
+            return None
+        except ValueError:
+            console.print(f"\n=> [red bold]Attention:[/] {seconds} is not a number of seconds for {area}.\n")
+            return None
+        intervals[area] = max(seconds, MIN_WATCH_INTERVAL)
+    return intervals
+
+
+# Nobody needs alerts faster than this, and the API would rather not be asked.
+MIN_WATCH_INTERVAL = 10
+
+
+@alerts.command('watch')
+@click.argument('states', nargs = -1)
+@click.option("--region", type = click.Choice(sorted(REGIONS.keys()), case_sensitive = False),
+              help = "A named group of states to watch (i.e. gulf-coast).")
+@click.option("--interval", type = float, default = 60, show_default = True,
+              help = "Seconds between polls of each state. Give a state its own with `TX:30`.")
+@click.option("--workers", type = int, default = lambda: store.snapshot().getint('Fetch', 'workers'),
+              help = "Maximum number of states to poll at the same time. Defaults to `workers` under [Fetch] in the config, or 4.")
+@click.option("--show-id", is_flag = True)
+@click.option("--changes-only", is_flag = True, help = "Print a line for each alert that's new, updated, cancelled or ended instead of the list.")
+@filter_options
+@click.pass_obj
+def watch_alerts(obj, states, region, interval, workers, show_id, changes_only, zone, event, severity, urgency,
+                 expires_within):
+    """Keeps a live list of the alerts for one or more states, updated in place as they change.
+
+    Each state is polled on its own interval (or less often, if the API says its answer
+    won't change before then), and only asks whether anything changed since the last poll.
+    When nothing did, nothing is downloaded or redrawn.
+    """
+    console = obj['console']
+    client = _client(obj)
+
+    areas = list(states) + (expand_region(region) if region is not None else [])
+    if len(areas) == 0:
+        areas = client.config.getlist('Alerts', 'default_areas')
+    if len(areas) == 0:
+        console.print(f"\n=> [red bold]Attention:[/] provide at least one state or a --region.\n")
+        return
+
+    intervals = _watch_intervals(console, client, areas, interval)
+    if intervals is None:
+        return
+
+    client.prepare() # the scheduler polls through `nws` itself.
+
+    filters = _filters(zone, event, severity, urgency, expires_within)
+    scheduler = PollScheduler(intervals, heavy = client.keep_heavy(filters))
+    if changes_only:
+        _watch_changes(console, client, scheduler, filters, show_id, workers)
+        return
+
+    view = _WatchView(scheduler, filters, show_id, ", ".join(intervals))
+
+    def on_change(areas):
+        client.record(element for area in areas for element in scheduler.areas[area].records or [])
+        view.update()
+        with timings.phase('render'):
+            live.update(view.render(), refresh = True)
+
+    try:
+        with Live(view.render(), console = console, auto_refresh = False) as live:
+            scheduler.run(on_change, threading.Event(), max_workers = workers)
+    except KeyboardInterrupt:
+        pass
+
+    _print_watch_summary(console, scheduler)
+
+
+def _print_watch_summary(console, scheduler: PollScheduler) -> None:
+    polls = sum(state.polls for state in scheduler.areas.values())
+    unchanged = sum(state.unchanged for state in scheduler.areas.values())
+    console.print(f"\n=> Stopped watching after {polls} polls ({unchanged} of them unchanged).\n")
+
+
+CHANGE_STYLES = {NEW: 'green', UPDATED: 'yellow', CANCELLED: 'red', ENDED: 'dim'}
+
+
+def _change_label(change) -> str:
+    style = CHANGE_STYLES[change.kind]
+    return f"[{style}]{change.kind.upper()}[/]"
+
+
+def _change_line(change, show_id: bool) -> str:
+    """One change as a line of markup, for `alerts watch --changes-only`."""
+    line = f"[dim]{datetime.utcnow().strftime('%H:%M:%S')}[/] {_change_label(change)} "
+    if change.record is not None:
+        line += f"{get_alert_style(change.event).markup} [dim]until[/] [yellow]{change.record.expires}[/]"
+    else:
+        line += change.event or "Unknown"
+    line += f" [dim]-[/] {(change.area_desc or '').replace(';', ',')}"
+    if show_id:
+        line += f" [dim]({format_id(change.id)})[/]"
+    return line
+
+
+def _watch_changes(console, client: AlertsClient, scheduler: PollScheduler, filters: AlertFilter, show_id: bool,
+                   workers: int) -> None:
+    """`alerts watch --changes-only`: prints what changed in each state as it's polled.
+
+    Only the states whose alerts changed are compared, and only the alerts that changed are
+    printed, so the work per poll follows the changes rather than the number of alerts.
+    """
+    trackers = {area: ChangeTracker() for area in scheduler.areas}
+    console.print(f"\n=> Watching {', '.join(scheduler.areas)} for changes (Ctrl+C to stop).\n")
+
+    def on_change(areas):
+        client.record(element for area in areas for element in scheduler.areas[area].records or [])
+        printed = set() # an alert in more than one state only needs saying once.
+        for area in areas:
+            state = scheduler.areas[area]
+            if state.error is not None:
+                console.print(f"[red]{area}: failed ({state.error}), retrying in {state.wait:.0f}s[/]")
+                continue
+
+            tracker = trackers[area]
+            started = tracker.started
+            with timings.phase('rows'):
+                changes = tracker.update(element for element in state.records if not filters or filters.matches(element))
+            if not started:
+                console.print(f"[dim]{datetime.utcnow().strftime('%H:%M:%S')}[/] {area}: {len(tracker)} active alerts.")
+                continue
+
+            with timings.phase('render'):
+                for change in changes:
+                    if change.event_id not in printed:
+                        printed.add(change.event_id)
+                        console.print(_change_line(change, show_id))
+
+    try:
+        scheduler.run(on_change, threading.Event(), max_workers = workers)
+    except KeyboardInterrupt:
+        pass
+    _print_watch_summary(console, scheduler)
+
+
+def _changes_path(client: AlertsClient, areas: list, filter_args: tuple) -> str:
+    # One saved state for each set of states and filters, so `diff TX` and `diff LA` don't mix.
+    key = json.dumps([sorted(areas), [list(arg) if isinstance(arg, tuple) else arg for arg in filter_args]])
+    name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(client.cache_dir, 'changes', f'{name}.json')
+
+
+def _change_table(changes: list, title: str, show_id: bool) -> Table:
+    with timings.phase('rows'):
+        table = Table(title = title, show_lines = True)
+        table.add_column("Change", justify = 'center')
         if show_id:
             table.add_column("Alert ID", justify = 'center', min_width = 46)
-        table.add_column("Alert Type", justify="center")
+        table.add_column("Alert Type", justify = 'center')
         table.add_column("Location", justify = 'center', max_width = 80)
-        table.add_column("Issued", justify="center")
         table.add_column("Expires", justify = 'center')
-        table.add_column("Sender", justify = 'center')
-                
-        def format_id(id):
-            return id.replace('urn:oid:2.49.0.1.840.0.', '')
-        
-        # populate the table.
-        for key_number in data.keys():
-            counties = data[key_number]['areaDesc'].replace(';', ',')
-            element = data[key_number]
-            
-            start_time = f"[magenta]{str(element['sent'])}".replace(" ", "\n")
-            end_time = f"[yellow]{str(element['expires'])}".replace(" ", "\n")
-            sender = element['sender_name']
-            
-            style = get_alert_object(element['event']) # returns an AlertStyle object.
-            style.add_newline_after_emotes()
 
+        for change in changes:
+            record = change.record
+            cells = [_change_label(change)]
             if show_id:
-                table.add_row(format_id(element['id']), style.to_string(), counties, start_time, end_time, sender)
-            else:
-                table.add_row(style.to_string(), counties, start_time, end_time, sender)
-                
-        steps_taken += 1
-        
-        # update the progress bars.
-        progress.update(task, advance = steps_taken, description = f"Completed process!")
-    
-    # need 2 additional print statements here because the bar inteferes with it.
-    if table.row_count == 0:
-        console.print(f"\n=> There are [underline green]0[/] alerts for {state}.\n")
-    else:
-        console.print()
+                cells.append(format_id(change.id))
+            cells.append(get_alert_style(change.event, newline = True).text if record is not None else f"[dim]{change.event}")
+            cells.append((change.area_desc or '').replace(';', ','))
+            cells.append(f"[yellow]{str(record.expires)}".replace(" ", "\n") if record is not None else "")
+            table.add_row(*cells)
+    return table
+
+
+def _show_changes(obj, areas: list, workers: int, filters: AlertFilter, filter_args: tuple, show_id: bool,
+                  output_format: str, no_cache: bool, max_age: float, reset: bool = False) -> None:
+    """`alerts diff` (and `alerts state --changes-only`): shows what changed since the last run."""
+    console = obj['console']
+    client = _client(obj)
+    try:
+        areas = client.normalize_areas(areas)
+    except AreaError as err:
+        if output_format is not None:
+            _warn(str(err))
+            raise click.exceptions.Exit(2)
+        console.print(f"\n=> [red bold]Attention:[/] {err}\n")
+        return
+
+    user_agent = obj['user_agent']
+    result = client.active_alerts(areas, filters = filters, use_cache = not no_cache, max_age = max_age,
+                                  use_snapshot = False, workers = workers)
+    label = ", ".join(areas)
+    if result.failed:
+        # Comparing without them would report every alert in them as ended.
+        message = f"could not get alerts for {', '.join(result.failed)}, so nothing was compared."
+        if output_format is not None:
+            _warn(message)
+            raise click.exceptions.Exit(1)
+        console.print(f"\n=> [red bold]Attention:[/] {message}\n")
+        return
+
+    path = _changes_path(client, areas, filter_args)
+    tracker = ChangeTracker() if reset else ChangeTracker.load(path)
+    started = tracker.started
+    with timings.phase('rows'):
+        changes = tracker.update(result.records)
+    with timings.phase('snapshot'):
+        tracker.save(path)
+
+    if output_format is not None:
+        with timings.phase('render'):
+            write_changes(changes, output_format.lower(), click.get_text_stream('stdout'))
+        return
+
+    if not started:
+        console.print(f"\n=> First look at {label}: all {len(tracker)} alerts count as new. "
+                      f"Next time, only what changed since now will show.")
+    if not changes:
+        console.print(f"\n=> Nothing changed for {label} since the last time.\n")
+        return
+
+    table = _change_table(changes, f"Changes for {label}, requested: {str(datetime.utcnow())} UTC", show_id)
+    console.print()
+    with timings.phase('render'):
         console.print(table)
-        console.print(f"\n=> There are [underline green]{table.row_count}[/] alerts for {state}.\n")
-    
-    # Let the user know at the bottom that their contact information has not been set.
+    counts = {kind: sum(1 for change in changes if change.kind == kind) for kind in CHANGE_STYLES}
+    console.print("\n=> " + ", ".join(f"[{CHANGE_STYLES[kind]}]{count} {kind}[/]" for kind, count in counts.items()) + "\n")
+
     if not user_agent.contact_is_set:
         console.print(user_agent.error_message)
 
 
+@alerts.command('diff')
+@click.argument('states', nargs = -1)
+@click.option("--region", type = click.Choice(sorted(REGIONS.keys()), case_sensitive = False),
+              help = "A named group of states (i.e. gulf-coast).")
+@click.option("--workers", type = int, default = lambda: store.snapshot().getint('Fetch', 'workers'),
+              help = "Maximum number of states to fetch at the same time. Defaults to `workers` under [Fetch] in the config, or 4.")
+@click.option("--show-id", is_flag = True)
+@click.option("--reset", is_flag = True, help = "Forget the last run and start over (everything shows as new).")
+@filter_options
+@format_option
+@cache_options
+@click.pass_obj
+def diff_alerts(obj, states, region, workers, show_id, reset, zone, event, severity, urgency, expires_within, output_format,
+                no_cache, max_age):
+    """Shows the alerts that are new, updated, cancelled or ended since the last time it was run.
+
+    Updates and cancellations are matched to the alert they replace through its references,
+    so an alert that was updated three times shows up as one updated alert. Each set of
+    states and filters is remembered separately.
+    """
+    areas = list(states) + (expand_region(region) if region is not None else [])
+    if len(areas) == 0:
+        areas = _client(obj).config.getlist('Alerts', 'default_areas')
+    if len(areas) == 0:
+        obj['console'].print(f"\n=> [red bold]Attention:[/] provide at least one state or a --region.\n")
+        return
+
+    _show_changes(obj, areas, workers, _filters(zone, event, severity, urgency, expires_within),
+                  (zone, event, severity, urgency, expires_within), show_id, output_format, no_cache, max_age, reset)
+
+
+def _show_snapshot(obj, snapshot: AlertSnapshot, filters: AlertFilter, label: str, show_id: bool,
+                   pager: bool = False) -> None:
+    """Prints the alerts in a snapshot that match the filters (or pages through them)."""
+    console = obj['console']
+    taken = snapshot.fetched_at_utc().strftime('%Y-%m-%d %H:%M:%S')
+    title = f"Alerts for {label}, snapshot taken: {taken} UTC"
+    if pager:
+        _page_alerts(obj, snapshot.query(filters), title, label, show_id)
+    else:
+        render.print_table(console, render.alert_table(snapshot.query(filters), title, show_id), label)
+    console.print(f"=> {len(snapshot)} active alerts nationwide, snapshot taken {snapshot.age:.0f} seconds ago.\n")
+
+
+def _page_alerts(obj, records: list, title: str, label: str, show_id: bool) -> None:
+    """`--pager`: pages through the alerts, drawing only the rows on the screen."""
+    from cli.utils.viewer import AlertViewer
+
+    console = obj['console']
+    if not console.is_terminal: # i.e. piped into a file; there's nothing to page through.
+        render.print_table(console, render.alert_table(records, title, show_id), label)
+        return
+
+    client = _client(obj)
+
+    def detail(record):
+        if not record.has_details: # a list from the API leaves the details out.
+            record = client.alerts_by_id([record.id])[record.id]
+            if isinstance(record, Exception):
+                raise record
+        return render.detail_table(record, client.zones(record))
+
+    AlertViewer(console, records, title, show_id, detail).run()
+    console.print(f"\n=> There are [underline green]{len(records)}[/] alerts for {label}.\n")
+
+
+def _validate_states(client: AlertsClient, console, states) -> list:
+    try:
+        with timings.phase('validation'):
+            return [_validate_area(client, area) for area in states]
+    except click.BadParameter as err:
+        console.print(f"\n=> [red bold]Attention:[/] {err.message}\n")
+        return None
+
+
+def _get_snapshot(obj, refresh: bool, offline: bool, no_cache: bool, max_age: float):
+    """Gets the nationwide snapshot for a command, fetching a new one if the saved one is stale.
+
+    With `offline`, the saved snapshot is used however old it is, and None is returned
+    (after telling the user) if there isn't one.
+    """
+    console = obj['console']
+    client = _client(obj)
+
+    if offline:
+        snapshot = client.snapshot(offline = True)
+        if snapshot is None:
+            console.print(f"\n=> [red bold]Attention:[/] there's no saved snapshot to use offline. Run `richwx alerts all` first.\n")
+        return snapshot
+
+    snapshot = None if refresh else client.saved_snapshot()
+    if snapshot is None:
+        with console.status('Getting every active alert...'):
+            snapshot = client.fetch_snapshot(use_cache = not no_cache, max_age = max_age)
+    return snapshot
+
+
+def snapshot_options(f):
+    """Adds `--refresh` and `--offline` to a command that works from the nationwide snapshot."""
+    f = click.option("--offline", is_flag = True,
+                     help = "Use the saved snapshot however old it is, and never go to the API.")(f)
+    f = click.option("--refresh", is_flag = True, help = "Fetch a new snapshot even if the saved one is still fresh.")(f)
+    return f
+
+
+@alerts.command('all')
+@click.option("--state", "states", multiple = True, help = "Only alerts for this state (i.e. TX). Can be repeated.")
+@filter_options
+@snapshot_options
+@click.option("--show-id", is_flag = True)
+@pager_option
+@from_snapshot_option
+@format_option
+@cache_options
+@click.pass_obj
+def all_alerts(obj, states, zone, event, severity, urgency, expires_within, refresh, offline, show_id, pager,
+               from_snapshot, output_format, no_cache, max_age):
+    """Displays every active alert in the US, from one nationwide request.
+
+    The alerts are saved as a snapshot that's reused (by this, `alerts query` and the filters
+    on `alerts state`) until it's older than `max_age` under [Snapshot] in the config.
+    """
+    console = obj['console']
+
+    states = _validate_states(_client(obj), console, states)
+    if states is None:
+        return
+
+    filters = _filters(zone, event, severity, urgency, expires_within, states = states)
+    if from_snapshot is not None:
+        _show_packed(obj, from_snapshot, filters, ", ".join(states) or "the US", show_id, output_format, pager)
+        return
+
+    snapshot = _get_snapshot(obj, refresh, offline, no_cache, max_age)
+    if snapshot is None:
+        return
+
+    if output_format is not None:
+        _write_formatted(snapshot.query(filters), output_format)
+        return
+    _show_snapshot(obj, snapshot, filters, ", ".join(states) or "the US", show_id, pager)
+
+    if not obj['user_agent'].contact_is_set:
+        console.print(obj['user_agent'].error_message)
+
+
+@alerts.command('summary')
+@click.option("--state", "states", multiple = True, help = "Only alerts for this state (i.e. TX). Can be repeated.")
+@filter_options
+@snapshot_options
+@from_snapshot_option
+@cache_options
+@click.pass_obj
+def summary_alerts(obj, states, zone, event, severity, urgency, expires_within, refresh, offline, from_snapshot,
+                   no_cache, max_age):
+    """Summarises the active alerts in the US instead of listing them.
+
+    Shows one row per kind of alert and severity (how many there are, the states they're
+    in and when the first and last of them expire), then the counts by severity, urgency and
+    state. The alerts come from the nationwide snapshot (see `alerts all`), so the filters
+    are the same.
+    """
+    from cli.utils.summary import AlertSummary
+
+    console = obj['console']
+    states = _validate_states(_client(obj), console, states)
+    if states is None:
+        return
+
+    filters = _filters(zone, event, severity, urgency, expires_within, states = states)
+    label = ", ".join(states) or "the US"
+    if from_snapshot is not None:
+        from cli.utils.packed import PackedSnapshot
+        try:
+            with PackedSnapshot(from_snapshot) as snapshot:
+                summary = AlertSummary.from_packed(snapshot, snapshot.query(filters))
+                taken = snapshot.fetched_at
+        except (OSError, ValueError) as err:
+            console.print(f"\n=> [red bold]Attention:[/] {err}\n")
+            return
+    else:
+        snapshot = _get_snapshot(obj, refresh, offline, no_cache, max_age)
+        if snapshot is None:
+            return
+        summary, taken = AlertSummary.from_records(snapshot.query(filters)), snapshot.fetched_at
+
+    taken = datetime.fromtimestamp(taken, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    render.print_summary(console, summary, label, f"Summary of the alerts for {label}, snapshot taken: {taken} UTC")
+
+    if not obj['user_agent'].contact_is_set:
+        console.print(obj['user_agent'].error_message)
+
+
+class TimeType(click.ParamType):
+    """A moment in time: `now`, how long ago (i.e. `6h`, `30m`, `2d`), or an ISO 8601 date and
+    time (i.e. `2024-05-18T18:00`, UTC unless it says otherwise). Converted to a unix time."""
+
+    name = 'time'
+    UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, float):
+            return value
+        text = value.strip()
+        if text.lower() == 'now':
+            return time.time()
+
+        unit = self.UNITS.get(text[-1:].lower())
+        if unit is not None:
+            try:
+                return time.time() - abs(float(text[:-1])) * unit
+            except ValueError:
+                pass
+
+        try:
+            moment = datetime.fromisoformat(text[:-1] + '+00:00' if text.endswith(('Z', 'z')) else text)
+        except ValueError:
+            self.fail(f"{value} isn't a time. Use `now`, how long ago (i.e. 6h, 2d) or a date (i.e. 2024-05-18T18:00).",
+                      param, ctx)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo = timezone.utc)
+        return moment.timestamp()
+
+
+def _query_history(obj, states, zone, event, severity, urgency, expires_within, since, until, show_id,
+                   output_format) -> None:
+    """`alerts query --at/--since/--until`: answers from the history database."""
+    console = obj['console']
+    path = _client(obj).history_path
+    if not os.path.exists(path):
+        console.print(f"\n=> [red bold]Attention:[/] there's no alert history yet. Turn it on with `enabled = yes` "
+                      f"under [History] in the config, and it fills up as you fetch alerts.\n")
+        return
+
+    from cli.utils.history import AlertStore
+    with timings.phase('history'), AlertStore(path) as history:
+        records = history.query(since = since, until = until, states = states, zones = [z.upper() for z in zone],
+                                events = event, severities = severity, urgencies = urgency)
+    # The indexes did the work; this only checks --expires-within.
+    filters = _filters(expires_within = expires_within)
+    records = [element for element in records if not filters or filters.matches(element)]
+
+    if output_format is not None:
+        _write_formatted(records, output_format)
+        return
+
+    def moment(value):
+        return datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%d %H:%M') + ' UTC'
+    if since == until:
+        when = f"at {moment(since)}"
+    else:
+        when = f"from {moment(since) if since is not None else 'the start'} to {moment(until) if until is not None else 'now'}"
+    label = ", ".join(states) or "the US"
+    table = render.alert_table(records, f"Alerts for {label} in effect {when}", show_id)
+    render.print_table(console, table, f"{label} {when}")
+
+
+@alerts.command('query')
+@click.option("--state", "states", multiple = True, help = "Only alerts for this state (i.e. TX). Can be repeated.")
+@filter_options
+@click.option("--at", "at", type = TimeType(), help = "Alerts that were in effect at this time, from the history.")
+@click.option("--since", type = TimeType(), help = "Alerts in effect at any point since this time, from the history.")
+@click.option("--until", type = TimeType(), help = "Alerts in effect at any point until this time, from the history.")
+@click.option("--show-id", is_flag = True)
+@from_snapshot_option
+@format_option
+@click.pass_obj
+def query_alerts(obj, states, zone, event, severity, urgency, expires_within, at, since, until, show_id, from_snapshot,
+                 output_format):
+    """Filters the saved nationwide snapshot, however old it is, without going to the API.
+
+    A snapshot is only fetched if there isn't one yet (see `alerts all`). With --at, --since
+    or --until, it answers from the alert history instead (see [History] in the config),
+    i.e. `--at 2024-05-18T18:00 --zone TXZ119`.
+    """
+    console = obj['console']
+
+    states = _validate_states(_client(obj), console, states)
+    if states is None:
+        return
+
+    if from_snapshot is not None:
+        _show_packed(obj, from_snapshot, _filters(zone, event, severity, urgency, expires_within, states = states),
+                     ", ".join(states) or "the US", show_id, output_format)
+        return
+
+    if at is not None or since is not None or until is not None:
+        if at is not None:
+            since = until = at
+        _query_history(obj, states, zone, event, severity, urgency, expires_within, since, until, show_id, output_format)
+        return
+
+    client = _client(obj)
+    snapshot = client.saved_snapshot(max_age = float('inf'))
+    if snapshot is None:
+        with console.status('No snapshot saved yet, getting every active alert...'):
+            snapshot = client.fetch_snapshot()
+
+    filters = _filters(zone, event, severity, urgency, expires_within, states = states)
+    if output_format is not None:
+        _write_formatted(snapshot.query(filters), output_format)
+        return
+    _show_snapshot(obj, snapshot, filters, ", ".join(states) or "the US", show_id)
+
+
+def _show_packed(obj, path: str, filters: AlertFilter, label: str, show_id: bool, output_format: str,
+                 pager: bool = False) -> None:
+    """`--from-snapshot`: shows the alerts in an exported file that match the filters (or pages through them)."""
+    from cli.utils.packed import PackedSnapshot
+
+    console = obj['console']
+    try:
+        with PackedSnapshot(path) as snapshot:
+            # The pager shows each alert's details from the file too, instead of asking the API.
+            paged = pager and output_format is None
+            records = snapshot.records(snapshot.query(filters), heavy = paged)
+            total, fetched_at = len(snapshot), snapshot.fetched_at
+    except (OSError, ValueError) as err:
+        if output_format is not None:
+            _warn(str(err))
+            raise click.exceptions.Exit(1)
+        console.print(f"\n=> [red bold]Attention:[/] {err}\n")
+        return
+
+    if output_format is not None:
+        _write_formatted(records, output_format)
+        return
+
+    taken = datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    title = f"Alerts for {label}, snapshot taken: {taken} UTC"
+    if paged:
+        _page_alerts(obj, records, title, label, show_id)
+    else:
+        render.print_table(console, render.alert_table(records, title, show_id), label)
+    console.print(f"=> From {path}, which holds {total} alerts.\n")
+
+
+@alerts.command('export')
+@click.argument('path', type = click.Path(dir_okay = False, writable = True))
+@click.option("--state", "states", multiple = True, help = "Only alerts for this state (i.e. TX). Can be repeated.")
+@filter_options
+@snapshot_options
+@cache_options
+@click.pass_obj
+def export_alerts(obj, path, states, zone, event, severity, urgency, expires_within, refresh, offline, no_cache, max_age):
+    """Saves the active alerts (all of them, or those matching the filters) to a compact file.
+
+    Any of the alert commands can show it again later with `--from-snapshot PATH`, on any
+    machine and without the network, i.e. to look back at an incident or to reproduce how
+    a list was drawn. The alerts come from the nationwide snapshot (see `alerts all`).
+    """
+    from cli.utils.packed import write as write_packed
+
+    console = obj['console']
+    states = _validate_states(_client(obj), console, states)
+    if states is None:
+        return
+
+    snapshot = _get_snapshot(obj, refresh, offline, no_cache, max_age)
+    if snapshot is None:
+        return
+
+    records = snapshot.query(_filters(zone, event, severity, urgency, expires_within, states = states))
+    count = write_packed(records, path, snapshot.fetched_at)
+    size = os.path.getsize(path) / (1024 * 1024)
+    console.print(f"\n=> Saved [underline green]{count}[/] alerts to {path} ({size:.1f} MB). "
+                  f"Show them with `richwx alerts all --from-snapshot {path}`.\n")
+
+
+def _read_points(f) -> list:
+    """Reads `lat, lon[, name]` lines (commas or whitespace) from a file.
+
+    Blank lines, `#` comments and a header line are skipped.
+
+    Raises:
+        click.BadParameter: If a line doesn't start with two numbers.
+    """
+    points = []
+    for number, line in enumerate(f, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        fields = [field.strip() for field in line.replace(',', ' ', 2).split(None, 2)]
+        try:
+            lat, lon = float(fields[0]), float(fields[1])
+        except (IndexError, ValueError):
+            if not points and number == 1: # i.e. `lat,lon,name`
+                continue
+            raise click.BadParameter(f"line {number} should be `lat, lon[, name]`, got {line!r}.", param_hint = "--file")
+        name = fields[2] if len(fields) > 2 else f"{lat}, {lon}"
+        points.append((lat, lon, name))
+    return points
+
+
+@alerts.command('point', context_settings = {'ignore_unknown_options': True}) # so negative longitudes aren't taken for options.
+@click.argument('lat', type = float, required = False)
+@click.argument('lon', type = float, required = False)
+@click.option("--file", "points_file", type = click.File('r'),
+              help = "Check every point in this file instead (one `lat, lon[, name]` per line, - for stdin).")
+@snapshot_options
+@click.option("--show-id", is_flag = True)
+@cache_options
+@click.pass_obj
+def point_alerts(obj, lat, lon, points_file, refresh, offline, show_id, no_cache, max_age):
+    """Displays the alerts whose polygons contain a point (i.e. 29.76 -95.37), or every point in a file.
+
+    Only storm-based alerts (the ones with a polygon) are matched. Uses the nationwide snapshot.
+    """
+    console = obj['console']
+
+    if points_file is not None:
+        try:
+            points = _read_points(points_file)
+        except click.BadParameter as err:
+            console.print(f"\n=> [red bold]Attention:[/] {err.format_message()}\n")
+            return
+    elif lat is not None and lon is not None:
+        points = [(lat, lon, f"{lat}, {lon}")]
+    else:
+        console.print(f"\n=> [red bold]Attention:[/] provide a latitude and longitude, or a --file of points.\n")
+        return
+
+    snapshot = _get_snapshot(obj, refresh, offline, no_cache, max_age)
+    if snapshot is None:
+        return
+
+    start = time.perf_counter()
+    found = snapshot.at_points([point[0] for point in points], [point[1] for point in points])
+    elapsed = time.perf_counter() - start
+
+    if points_file is None:
+        table = render.alert_table(found[0], f"Alerts at {points[0][2]}", show_id)
+        render.print_table(console, table, points[0][2])
+    else:
+        table = Table(title = f"Alerts at {len(points)} points", show_lines = True)
+        table.add_column("Point", justify = 'center')
+        table.add_column("Lat", justify = 'center')
+        table.add_column("Lon", justify = 'center')
+        table.add_column("Alerts", justify = 'center')
+        for (lat, lon, name), records in zip(points, found):
+            if records:
+                alerts = "\n".join(format_id(record.id) if show_id else get_alert_style(record.event).event_with_emotes
+                                   for record in records)
+                table.add_row(name, str(lat), str(lon), alerts)
+
+        if table.row_count:
+            console.print()
+            console.print(table)
+        console.print(f"\n=> [underline green]{table.row_count}[/] of {len(points)} points are in at least one alert's polygon.")
+        console.print(f"=> Checked in [cyan]{elapsed:.3f}[/] seconds ({len(points) / max(elapsed, 1e-9):,.0f} points/s).\n")
+
+    console.print(f"=> {len(snapshot.spatial)} alert polygons nationwide, snapshot taken {snapshot.age:.0f} seconds ago.\n")
+
+
+@alerts.command('bbox', context_settings = {'ignore_unknown_options': True})
+@click.argument('south', type = float)
+@click.argument('west', type = float)
+@click.argument('north', type = float)
+@click.argument('east', type = float)
+@snapshot_options
+@click.option("--show-id", is_flag = True)
+@cache_options
+@click.pass_obj
+def bbox_alerts(obj, south, west, north, east, refresh, offline, show_id, no_cache, max_age):
+    """Displays the alerts whose polygons overlap a bounding box (i.e. 29 -96 31 -94).
+
+    Only storm-based alerts (the ones with a polygon) are matched. Uses the nationwide snapshot.
+    """
+    console = obj['console']
+
+    if south > north or west > east:
+        console.print(f"\n=> [red bold]Attention:[/] the box should be given as SOUTH WEST NORTH EAST.\n")
+        return
+
+    snapshot = _get_snapshot(obj, refresh, offline, no_cache, max_age)
+    if snapshot is None:
+        return
+
+    label = f"{south}, {west} to {north}, {east}"
+    render.print_table(console, render.alert_table(snapshot.in_bbox(south, west, north, east), f"Alerts in {label}", show_id),
+                       label)
+    console.print(f"=> {len(snapshot.spatial)} alert polygons nationwide, snapshot taken {snapshot.age:.0f} seconds ago.\n")
+
+
+def _read_ids(f) -> list:
+    # One or more IDs per line, separated by whitespace or commas. `#` starts a comment.
+    ids = []
+    for line in f:
+        ids += line.split('#', 1)[0].replace(',', ' ').split()
+    return ids
+
+
 @alerts.command('id')
-@click.argument('id', nargs = 1)
+@click.argument('ids', nargs = -1)
+@click.option("--file", "ids_file", type = click.File('r'),
+              help = "Read the IDs from this file (whitespace or comma separated, - for stdin). `richwx alerts id -` does the same.")
+@click.option("--workers", type = int, default = lambda: store.snapshot().getint('Fetch', 'workers'),
+              help = "Maximum number of alerts to fetch at the same time. Defaults to `workers` under [Fetch] in the config, or 4.")
+@cache_options
 @click.pass_obj
-def alert_id(obj, id):
-    """Displays an alert information by its ID."""
+def alert_id(obj, ids, ids_file, workers, no_cache, max_age):
+    """Displays an alert information by its ID. Takes any number of IDs, shown in the order they're given.
 
-    id = f'urn:oid:2.49.0.1.840.0.{id}'
+    Alerts that a list (`state`, `all`, `watch`, `diff`) already fetched are shown from the
+    cache until they expire, without asking the API again (unless you pass `--no-cache`).
+    The zones each alert covers are named from the zone index (see `richwx zones`).
+    """
 
     console = obj['console']
-    
+
+    ids = list(ids)
+    if ids == ['-']:
+        ids = _read_ids(click.get_text_stream('stdin'))
+    if ids_file is not None:
+        ids += _read_ids(ids_file)
+
+    if len(ids) == 0:
+        console.print(f"\n=> [red bold]Attention:[/] provide at least one alert ID (or --file).\n")
+        return
+
     user_agent = obj['user_agent']
     if not user_agent.contact_is_set:
         console.print(user_agent.error_message)
-    api_connector.set_user_agent(user_agent.app_name, user_agent.contact)
-    data = api_connector.get_alert_by_id(id).to_dict()[1]
-    
-    style = get_alert_object(data['event'])
-    
-    style_table = None
-    if data['severity'] == 'Extreme':
-        # Bolds the entire table.
-        from rich.style import Style
-        style_table = Style(bold = True)
-    
-    table = Table(show_lines=True, title = style.event_with_emotes, padding = (0, 0), style = style.color, width = 130, border_style = style_table)
-    table.add_column("Information")
-    table.add_column("Details")
-    
-    table.add_row("Headline", data['headline'])
-    table.add_row("Details", data['description'])
-    table.add_row("Location", data['areaDesc'])
-    table.add_row("Instruction", data['instruction'] if data['instruction'] is not None else "N/A") # sometimes this is null.
-    table.add_row("Sender", data['senderName'])
-    table.add_row("Severity", data['severity'])
-    table.add_row("Full ID", id)
-    
-    console.print()
-    console.print(table)
-    console.print()
+
+    # Alerts a list command already fetched come from the detail cache, without asking again.
+    client = _client(obj)
+    with console.status(f"Getting {len(ids)} alerts...") if len(ids) > 1 else nullcontext():
+        results = client.alerts_by_id(ids, use_cache = not no_cache, max_age = max_age, workers = workers)
+    render.print_details(console, results, client.zones)
         
     # ['@id', '@type', 'id', 'areaDesc', 'geocode', 'affectedZones', 'references', 'sent', 'effective', 'onset', 'expires', 
     # 'ends', 'status', 'messageType', 'category', 'severity', 'certainty', 'urgency', 'event', 'sender', 'senderName', 
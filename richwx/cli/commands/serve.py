@@ -0,0 +1,51 @@
+import click
+
+from cli.utils import daemon
+
+
+def _warm_up():
+    """Does the work every command would otherwise repeat: imports, the connection pool, the
+    alert styles and the saved snapshot."""
+    from cli.commands import alerts, useragent # noqa: F401
+    from cli.utils import nws
+    from cli.utils.alert_rich_strings import ALERTS, get_alert_style
+    from cli.utils.client import AlertsClient
+
+    nws.session()
+    for alert in ALERTS:
+        get_alert_style(alert, newline = True)
+    client = AlertsClient()
+    client.saved_snapshot(max_age = float('inf')) # loaded once, and kept for every client.
+    client.zone_index()
+
+
+@click.command('serve')
+@click.option('--socket', 'socket_path', type = click.Path(dir_okay = False), default = None,
+              help = f"Where to listen. Defaults to $RICHWX_SOCKET, or {daemon.SOCKET_PATH}.")
+@click.option('--stop', is_flag = True, help = "Stop the running server instead.")
+@click.pass_context
+def serve(ctx, socket_path, stop):
+    """Keeps richwx loaded in the background to make commands faster.
+
+    While it's running, `richwx alerts ...` and `richwx auth ...` are handed to it instead of
+    starting from scratch: the imports, the connection to the API, the alert styles and the
+    nationwide snapshot are already there. Output (colors, width) still matches the terminal
+    the command was typed in. Stop it with Ctrl+C or `richwx serve --stop`.
+    """
+    path = socket_path or daemon.SOCKET_PATH
+    if stop:
+        if daemon.stop(path):
+            click.echo(f"\n=> Stopped the server on {path}\n")
+        else:
+            click.echo(f"\n=> No server is running on {path}\n")
+        return
+
+    if daemon.is_running(path):
+        click.echo(f"\n=> A server is already running on {path}\n", err = True)
+        raise click.exceptions.Exit(1)
+
+    _warm_up()
+    try:
+        daemon.serve(ctx.find_root().command, path, on_ready = lambda: click.echo(f"=> Serving on {path} (Ctrl+C to stop)"))
+    except KeyboardInterrupt:
+        pass
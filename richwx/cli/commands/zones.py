@@ -0,0 +1,103 @@
+import datetime
+import os
+
+import click
+
+from cli.utils.zones import KINDS
+
+
+@click.group(name = "zones")
+def zones_group():
+    """Looks up NWS zones (forecast, fire, county and marine) by their UGC code, locally.
+
+    The zones come from an index you build first with `richwx zones build`, from the NWS's
+    zone shapefiles (https://www.weather.gov/gis/). Looking them up (and naming the zones in
+    `richwx alerts id`) then never asks the API."""
+    pass
+
+
+@zones_group.command('build')
+@click.argument('sources', nargs = -1, required = True, type = click.Path(exists = True, dir_okay = False))
+@click.option('--kind', type = click.Choice(KINDS), default = None,
+              help = "The kind of zone in the sources. Worked out from each file if not given.")
+@click.option('--output', 'output_path', type = click.Path(dir_okay = False, writable = True), default = None,
+              help = "Where to write the index. Defaults to zones.rwz in the cache directory, where richwx reads it from.")
+@click.option('--label', default = None, help = "What the zones came from, kept in the index. Defaults to the first source's name.")
+@click.pass_obj
+def build_zones(obj, sources, kind, output_path, label):
+    """Builds the zone index from shapefiles (.shp, .dbf or the .zip they come in) or JSON
+    dumps of `/zones`. Give it every file at once: the index is rebuilt from scratch.
+    """
+    from cli.utils import zones
+
+    console = obj['console']
+    client = obj['client']
+
+    found = []
+    for source in sources:
+        try:
+            read = zones.read_source(source, kind)
+        except (OSError, ValueError, KeyError, IndexError) as err:
+            console.print(f"\n=> [red bold]Attention:[/] could not read {source} ({err}).\n")
+            return
+        console.print(f"=> {len(read)} zones from {source}")
+        found += read
+
+    path = output_path or client.zones_path
+    label = label if label is not None else os.path.splitext(os.path.basename(sources[0]))[0]
+    try:
+        count = zones.write(found, path, label)
+    except ValueError as err:
+        console.print(f"\n=> [red bold]Attention:[/] nothing was written to {path}: {err}\n")
+        return
+    console.print(f"\n=> Wrote [green]{count}[/] zones to {path}\n")
+
+
+@zones_group.command('lookup')
+@click.argument('codes', nargs = -1, required = True)
+@click.pass_obj
+def lookup_zones(obj, codes):
+    """Shows the zones with these UGC codes (i.e. TXZ103 TXC085 GMZ250)."""
+    from rich.table import Table
+
+    console = obj['console']
+    index = obj['client'].zone_index()
+    if index is None:
+        console.print(f"\n=> [red bold]Attention:[/] there's no zone index. Build one with [reverse]richwx zones build[/].\n")
+        return
+
+    table = Table(show_lines = True)
+    for name in ("Code", "Kind", "Name", "State", "Centroid", "Bounding Box (S, W, N, E)"):
+        table.add_column(name, justify = 'center')
+
+    missing = []
+    for code in codes:
+        found = index.lookup(code)
+        if not found:
+            missing.append(code)
+        for zone in found:
+            centroid = f"{zone.lat:.3f}, {zone.lon:.3f}" if zone.lat is not None else "N/A"
+            bbox = ", ".join(f"{value:.3f}" for value in zone.bbox) if zone.bbox is not None else "N/A"
+            table.add_row(zone.code, zone.kind, zone.name, zone.state or "N/A", centroid, bbox)
+
+    console.print()
+    if table.row_count:
+        console.print(table)
+    if missing:
+        console.print(f"=> [red bold]Attention:[/] not in the zone index: {', '.join(missing)}")
+    console.print()
+
+
+@zones_group.command('info')
+@click.pass_obj
+def zone_info(obj):
+    """Shows which zone index is used, what it was built from and what's in it."""
+    console = obj['console']
+    index = obj['client'].zone_index()
+    if index is None:
+        console.print(f"\n=> There's [blue]no zone index[/]. Build one with [reverse]richwx zones build[/].\n")
+        return
+
+    built = datetime.datetime.fromtimestamp(index.built_at).strftime('%Y-%m-%d %H:%M')
+    kinds = ", ".join(f"{kind} [green]{count}[/]" for kind, count in index.kinds().items())
+    console.print(f"\n=> {index.path}\n=> Built {built} from {index.label or 'N/A'}\n=> [green]{len(index)}[/] zones: {kinds}\n")
@@ -1,7 +1,12 @@
 
+import copy
+
 def get_alert_object(alert: str):
     """Gets the AlertStyling object at the specified alert.
 
+    The object is a copy, so it can be changed (i.e. `add_bold()`) without affecting
+    every other alert of the same kind. For rendering, use `get_alert_style` instead.
+
     Args:
         alert (str): The alert that's kicked back from the API.
 
@@ -11,9 +16,43 @@ def get_alert_object(alert: str):
     if alert not in ALERTS.keys():
         # return an alertstyling object to keep consistent.
         # TODO: how should this be handled in the future? only devs should see this.
-        return AlertStyling('Not Found', 'red', [])
+        return copy.copy(NOT_FOUND)
     
-    return ALERTS[alert]
+    return copy.copy(ALERTS[alert])
+
+
+# Precompiled styles, keyed by (alert, newline, bold, italics, underline). Filled in as
+# they're asked for, so each one is only ever built once per process.
+_RENDERED = {}
+
+def get_alert_style(alert: str, newline: bool = False, bold: bool = False, italics: bool = False,
+                    underline: bool = False):
+    """Gets the precompiled, read-only style for the specified alert and render variant.
+
+    Alerts that aren't in `ALERTS` all share the same "Not Found" style.
+
+    Args:
+        alert (str): The alert that's kicked back from the API.
+        newline (bool, optional): Put the emotes on their own line. Defaults to False.
+        bold (bool, optional): Bold the event name. Defaults to False.
+        italics (bool, optional): Italicize the event name. Defaults to False.
+        underline (bool, optional): Underline the event name. Defaults to False.
+
+    Returns:
+        RenderedStyle: The style, with its markup and rich `Style`/`Text` already built.
+    """
+    key = (alert, newline, bold, italics, underline)
+    rendered = _RENDERED.get(key)
+    if rendered is None:
+        styling = ALERTS.get(alert, NOT_FOUND)
+        if styling is NOT_FOUND:
+            # Unknown alerts share one entry per variant, and their names are never stored:
+            # under `richwx serve` or `alerts watch`, each new one would otherwise stay for good.
+            key = (styling.event,) + key[1:]
+            rendered = _RENDERED.get(key)
+        if rendered is None:
+            rendered = _RENDERED[key] = RenderedStyle(styling, newline, bold, italics, underline)
+    return rendered
 
 class AlertStyling:
     """Class to style alerts, allows for modularity."""
@@ -31,18 +70,20 @@ class AlertStyling:
         
         self.event_with_emotes = " ".join(emojis) + " " + event
     
-    def to_string(self):
-    
-        string = ''
-        
-        # i.e. [blue bold italics underline]
+    def opening_style_tag(self):
+        # i.e. [blue bold italic underline]
         opening_style_tag = f'[{self.color}'
         if self.is_bolded: opening_style_tag += ' bold'
-        if self.is_italics: opening_style_tag += ' italics'
+        if self.is_italics: opening_style_tag += ' italic'
         if self.is_underlined: opening_style_tag += ' underline'
         opening_style_tag += ']'
+        return opening_style_tag
+    
+    def to_string(self):
+    
+        string = ''
         
-        string += f"{opening_style_tag}{self.event}[/]"
+        string += f"{self.opening_style_tag()}{self.event}[/]"
         
         # if there's no emotes, there's no need for a newline.
         if all([self.newline, len(self.emojis) != 0]): 
@@ -71,6 +112,59 @@ class AlertStyling:
     def add_newline_after_emotes(self):
         self.newline = True
 
+class RenderedStyle:
+    """A read-only, precompiled rendering of an AlertStyling for one render variant.
+
+    Everything a table cell needs (the markup string, the parsed rich `Style` and the `Text`
+    with emojis already swapped in) is built once, when the style is first asked for.
+    The `text` is shared between every row that uses it, so don't modify it in place.
+    """
+
+    __slots__ = ('event', 'color', 'emojis', 'event_with_emotes', 'markup', 'style', 'text')
+
+    def __init__(self, styling: 'AlertStyling', newline: bool = False, bold: bool = False, italics: bool = False,
+                 underline: bool = False):
+        from rich.errors import StyleSyntaxError
+        from rich.style import Style
+        from rich.text import Text
+
+        variant = copy.copy(styling)
+        variant.newline = newline
+        variant.is_bolded = bold
+        variant.is_italics = italics
+        variant.is_underlined = underline
+
+        try:
+            style = Style.parse(variant.opening_style_tag()[1:-1])
+        except StyleSyntaxError: # a typo'd color in ALERTS shouldn't take the whole table down.
+            style = Style.null()
+
+        markup = variant.to_string()
+        values = {
+            'event': styling.event,
+            'color': styling.color,
+            'emojis': tuple(styling.emojis),
+            'event_with_emotes': styling.event_with_emotes,
+            'markup': markup,
+            'style': style,
+            'text': Text.from_markup(markup),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RenderedStyle is read-only.")
+
+    def __repr__(self):
+        return self.markup
+
+    def __str__(self):
+        return self.markup
+
+    def __rich__(self):
+        return self.text
+
+
 # TODO: Finish this out. Lots of manual work. Huge timesink.
 # Need to compare standard colors (https://rich.readthedocs.io/en/stable/appendix/colors.html#appendix-colors)
 #   with NWS colors (https://www.weather.gov/help-map), and determine closest one.
@@ -79,7 +173,7 @@ class AlertStyling:
 ALERTS = {'911 Telephone Outage': AlertStyling("911 Telephone Outage", "grey78", [":telephone_receiver:", ":man_police_officer:"]), 
     'Administrative Message': AlertStyling("Administrative Message", "grey78", [":pen:"]), 
     'Air Quality Alert': AlertStyling("Air Quality Alert", "grey50", [":mask:"]), 
-    'Air Stagnation Advisory': AlertStyling("Air Stagnation Advisory", "gre50", [":mask:"]), 
+    'Air Stagnation Advisory': AlertStyling("Air Stagnation Advisory", "grey50", [":mask:"]), 
     'Arroyo and Small Stream Flood Advisory': AlertStyling("Arroyo and Small Stream Flood Advisory", "medium_spring_green", [":water_wave:"]), 
     'Ashfall Advisory': AlertStyling("Ashfall Advisory", "grey39", [":volcano:"]), 
     'Ashfall Warning': AlertStyling("Ashfall Warning", "grey66", [":volcano:", ":exclamation_mark:"]), 
@@ -200,4 +294,7 @@ ALERTS = {'911 Telephone Outage': AlertStyling("911 Telephone Outage", "grey78",
     'Winter Weather Advisory': AlertStyling("Winter Weather Advisory", "slate_blue1", [":snowflake:"]), 
     'Winter Storm Watch': AlertStyling("Winter Storm Watch", "steel_blue", [":snowflake:", ":eyes:"]),
     'Winter Storm Warning': AlertStyling("Winter Storm Warning", "hot_pink", [":cold_face:", ":snowflake:", ":exclamation_mark:"])
-}
\ No newline at end of file
+}
+
+# What unknown alerts get styled as.
+NOT_FOUND = AlertStyling('Not Found', 'red', [])
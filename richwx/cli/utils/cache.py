@@ -0,0 +1,329 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import click
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_CACHE_DIR = os.path.join(click.get_app_dir('richwx'), 'cache', 'http')
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 2000
+
+# How long the tally of what's in the cache is trusted before the directory is listed again
+# (other processes write to it too, i.e. while `richwx serve` keeps one cache for good).
+RESCAN_AFTER = 60
+
+# Eviction makes this much room under the limits, so a full cache isn't listed on every write.
+EVICT_TO = 0.9
+
+# Headers that a 304 is allowed to update on the stored response.
+_REVALIDATION_HEADERS = ('Cache-Control', 'Expires', 'Date', 'Age', 'ETag', 'Last-Modified')
+
+
+def _parse_cache_control(value: str) -> dict:
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def _http_date(value: str):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers: dict, now: float = None) -> float:
+    """Works out how long (in seconds) a response may be reused without revalidating.
+
+    `Cache-Control: max-age` wins over `Expires`, and `no-cache`/`no-store` mean it can't be
+    reused at all. Time the response already spent in an upstream cache (`Age`) is taken off.
+
+    Args:
+        headers (dict): The response headers.
+        now (float, optional): The current unix time. Defaults to time.time().
+
+    Returns:
+        float: The lifetime in seconds, 0 if the response must be revalidated before reuse.
+    """
+    now = time.time() if now is None else now
+    directives = _parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in directives or 'no-cache' in directives:
+        return 0
+
+    try:
+        age = float(headers.get('Age') or 0)
+    except ValueError:
+        age = 0
+
+    if directives.get('max-age') is not None:
+        try:
+            return max(0.0, float(directives['max-age']) - age)
+        except ValueError:
+            return 0
+
+    expires = _http_date(headers.get('Expires'))
+    if expires is not None:
+        date = _http_date(headers.get('Date')) or now
+        return max(0.0, expires - date)
+
+    return 0
+
+
+def validators(headers: dict) -> dict:
+    """The conditional request headers (`If-None-Match`/`If-Modified-Since`) that ask whether
+    the response with these headers has changed."""
+    conditional = {}
+    if headers.get('ETag'):
+        conditional['If-None-Match'] = headers['ETag']
+    if headers.get('Last-Modified'):
+        conditional['If-Modified-Since'] = headers['Last-Modified']
+    return conditional
+
+
+class CacheEntry:
+    """A single stored response.
+
+    On disk, an entry is one line of JSON metadata (URL, headers, when it was stored)
+    followed by the raw response body. That lets the body be streamed straight from the
+    file without loading it into memory first.
+    """
+
+    def __init__(self, url: str, headers: dict, stored_at: float, path: str = None, offset: int = 0):
+        self.url = url
+        self.headers = CaseInsensitiveDict(headers)
+        self.stored_at = stored_at
+        self.path = path
+        self.offset = offset
+
+    def is_fresh(self, max_age: float = None, now: float = None) -> bool:
+        """Checks whether the entry can be used without going to the network.
+
+        Args:
+            max_age (float, optional): Overrides the lifetime given by the server's headers.
+        """
+        now = time.time() if now is None else now
+        lifetime = freshness_lifetime(self.headers, self.stored_at) if max_age is None else max_age
+        return now - self.stored_at < lifetime
+
+    def validators(self) -> dict:
+        """The conditional request headers to revalidate this entry with."""
+        return validators(self.headers)
+
+    def open(self):
+        """Opens the body for reading, as bytes."""
+        f = open(self.path, 'rb')
+        f.seek(self.offset)
+        return f
+
+    def iter_body(self, chunk_size: int = 64 * 1024):
+        """Yields the body in chunks of bytes."""
+        with self.open() as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def json(self):
+        with self.open() as f:
+            return json.load(f)
+
+    def metadata(self) -> dict:
+        return {'url': self.url, 'headers': dict(self.headers), 'stored_at': self.stored_at}
+
+
+class CacheWriter:
+    """Writes a response body into the cache as it is downloaded.
+
+    Nothing is visible to readers until `commit` is called. If it never is (i.e. the
+    download failed halfway), the partial file is thrown away.
+    """
+
+    def __init__(self, cache: 'ResponseCache', url: str, headers: dict):
+        self.cache = cache
+        self.entry = CacheEntry(url, headers, time.time())
+        os.makedirs(cache.directory, exist_ok = True)
+        fd, self.tmp = tempfile.mkstemp(dir = cache.directory, suffix = '.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        self.file.write(json.dumps(self.entry.metadata()).encode('utf-8') + b'\n')
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+
+    def commit(self) -> CacheEntry:
+        self.file.close()
+        path = self.cache._path(self.entry.url)
+        os.replace(self.tmp, path)
+        if self.cache._stored(path):
+            self.cache.evict()
+        return self.cache.get(self.entry.url)
+
+    def abort(self) -> None:
+        self.file.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+class ResponseCache:
+    """On-disk cache of API responses, one file per URL.
+
+    Entries are evicted least recently used first once the cache holds more than
+    `max_bytes` or `max_entries`. The access time is tracked through each file's mtime,
+    so a hit costs a single `os.utime` call on top of the read.
+
+    The size of each entry is tallied as it's written, so a write only lists the directory
+    when the cache is over its limits (or the tally is older than `RESCAN_AFTER` seconds),
+    not every time.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._sizes = None # path -> size of every entry, as of `_scanned_at`.
+        self._total = 0
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str) -> str:
+        # The URL already holds the endpoint and every query parameter.
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, self.key(url) + '.cache')
+
+    def get(self, url: str):
+        """Gets the stored entry for the URL, or None if there isn't one. The body isn't read."""
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                line = f.readline()
+            d = json.loads(line)
+        except (OSError, ValueError):
+            return None
+
+        if d.get('url') != url: # hash collision or a stale format. Treat as a miss.
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CacheEntry(d['url'], d['headers'], d['stored_at'], path, len(line))
+
+    def writer(self, url: str, headers: dict) -> CacheWriter:
+        """Starts storing a response whose body will be written in chunks."""
+        return CacheWriter(self, url, headers)
+
+    def put(self, url: str, headers: dict, body) -> CacheEntry:
+        """Stores a whole response and evicts old entries if the cache grew too big."""
+        writer = self.writer(url, headers)
+        try:
+            writer.write(body.encode('utf-8') if isinstance(body, str) else body)
+            return writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def refresh(self, entry: CacheEntry, headers: dict) -> CacheEntry:
+        """Updates an entry after the server answered a revalidation with 304 Not Modified."""
+        merged = CaseInsensitiveDict(entry.headers)
+        for name in _REVALIDATION_HEADERS:
+            if headers.get(name) is not None:
+                merged[name] = headers[name]
+
+        writer = self.writer(entry.url, merged)
+        try:
+            for chunk in entry.iter_body():
+                writer.write(chunk)
+            return writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def _scan(self) -> list:
+        # (mtime, size, path) of every entry on disk.
+        try:
+            files = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if name.endswith('.cache')]
+        except OSError:
+            return []
+
+        stats = []
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats.append((stat.st_mtime, stat.st_size, path))
+        return stats
+
+    def _tally(self, stats) -> None:
+        self._sizes = {path: size for _, size, path in stats}
+        self._total = sum(self._sizes.values())
+        self._scanned_at = time.monotonic()
+
+    def _over(self) -> bool:
+        return self._total > self.max_bytes or len(self._sizes) > self.max_entries
+
+    def _stored(self, path: str) -> bool:
+        """Counts an entry that was just written to `path` (over whatever was there) and
+        says whether the cache is now over its limits."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        with self._lock:
+            if self._sizes is None or time.monotonic() - self._scanned_at > RESCAN_AFTER:
+                self._tally(self._scan())
+            else:
+                self._total += size - self._sizes.get(path, 0)
+                self._sizes[path] = size
+            return self._over()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries once the cache is over its limits, until
+        it's `EVICT_TO` of the way to them."""
+        with self._lock:
+            stats = self._scan()
+            total = sum(size for _, size, _ in stats)
+            count = len(stats)
+            removed = set()
+            over = total > self.max_bytes or count > self.max_entries
+            for _, size, path in sorted(stats) if over else ():
+                if total <= self.max_bytes * EVICT_TO and count <= self.max_entries * EVICT_TO:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed.add(path)
+                total -= size
+                count -= 1
+            self._tally([stat for stat in stats if stat[2] not in removed])
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.cache'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
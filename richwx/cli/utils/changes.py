@@ -0,0 +1,204 @@
+"""Works out what changed in a set of alerts since the last time it was looked at.
+
+An alert isn't a single message: the NWS sends an `Alert`, then `Update`s and finally
+(maybe) a `Cancel`, each with a new ID and `references` to the messages before it. Here
+every message is traced back through those references to the first one, and the chain is
+tracked as one event. For each event the tracker keeps a small fingerprint (the ID of its
+latest message, a hash of the fields the alert list shows, its event name and area), so
+comparing a new set of alerts against the last one is a dictionary lookup per alert and
+only what changed comes out the other end.
+
+The tracker's state is plain JSON, so commands can save it between runs.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+# What a change can be.
+NEW = 'new'
+UPDATED = 'updated'
+CANCELLED = 'cancelled'
+ENDED = 'ended' # no longer active (expired, or replaced without an update pointing back at it).
+
+KINDS = (NEW, UPDATED, CANCELLED, ENDED)
+
+STATE_VERSION = 1
+
+
+def _sent_at(record) -> float:
+    # When a message was sent, to order a chain by. Messages that don't say come first.
+    sent = record.sent
+    return sent.timestamp() if sent is not None else float('-inf')
+
+
+def fingerprint(record) -> str:
+    """A short hash of the fields the alert list shows."""
+    fields = (record.event, record.area_desc, record._sent, record._expires, record.sender_name, record.severity,
+              record.urgency, record.certainty, record.status, record.message_type)
+    text = '\x1f'.join('' if field is None else field for field in fields)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size = 8).hexdigest()
+
+
+class Change:
+    """One thing that changed.
+
+    Args:
+        kind (str): One of `KINDS`.
+        event_id (str): The ID of the first message in the chain, which identifies the event.
+        record (AlertRecord): The latest message. None for `ENDED`.
+        previous_id (str): The ID of the message this one replaced, if it's an update or cancellation.
+        event (str): The event name (i.e. Tornado Warning), kept for when there's no record.
+        area_desc (str): The area description, kept for when there's no record.
+    """
+
+    __slots__ = ('kind', 'event_id', 'record', 'previous_id', 'event', 'area_desc')
+
+    def __init__(self, kind: str, event_id: str, record = None, previous_id: str = None, event: str = None,
+                 area_desc: str = None):
+        self.kind = kind
+        self.event_id = event_id
+        self.record = record
+        self.previous_id = previous_id
+        self.event = record.event if record is not None else event
+        self.area_desc = record.area_desc if record is not None else area_desc
+
+    @property
+    def id(self) -> str:
+        """The ID of the latest message (or of the last one seen, for an event that ended)."""
+        return self.record.id if self.record is not None else self.previous_id
+
+    def __repr__(self):
+        return f"Change({self.kind!r}, {self.id!r}, {self.event!r})"
+
+
+class ChangeTracker:
+    """Remembers the events in a set of alerts and reports what changed from one set to the next.
+
+    Args:
+        state (dict, optional): The state from `state()`, to carry on from. Starts empty otherwise.
+    """
+
+    def __init__(self, state: dict = None):
+        state = state or {}
+        # event ID -> [latest message ID, fingerprint, event, area, cancelled]
+        self.events = state.get('events', {})
+        # message ID -> event ID, for the messages that were active last time.
+        self.roots = state.get('roots', {})
+        # False until the tracker has seen a set of alerts (everything in the first one is new).
+        self.started = bool(state)
+
+    def __len__(self):
+        return len(self.events)
+
+    def _resolve(self, records: list) -> dict:
+        """Maps the ID of each message to the ID of its event.
+
+        A message belongs to the event of the first message it references that was seen
+        last time, or that's in this set too (an update can arrive in the same set as the
+        message it replaces). A message that doesn't reference any of those starts an event.
+        """
+        by_id = {record.id: record for record in records}
+        resolved = {}
+
+        def find(id):
+            chain = []
+            while True:
+                if id in resolved:
+                    root = resolved[id]
+                    break
+                if id in self.roots:
+                    root = self.roots[id]
+                    break
+                chain.append(id)
+                references = [ref for ref in by_id[id].reference_ids if ref not in chain]
+                parent = next((ref for ref in references if ref in self.roots or ref in resolved), None)
+                if parent is None:
+                    parent = next((ref for ref in references if ref in by_id), None)
+                if parent is None:
+                    root = id
+                    break
+                id = parent
+            for id in chain:
+                resolved[id] = root
+            return root
+
+        return {record.id: find(record.id) for record in records}
+
+    def update(self, records) -> list:
+        """Compares `records` (every alert that's active now) with the last set and remembers them.
+
+        On the first set every alert is new, cancelled ones included: nothing they cancel has
+        been seen.
+
+        Returns:
+            list: The `Change`s, in the order the alerts were given, with the events that
+                ended at the end.
+        """
+        records = list(records)
+        roots = self._resolve(records)
+
+        # Each event is its latest message. Lists of several areas are put end to end, so
+        # that isn't necessarily the first one of its chain in `records`.
+        latest = {}
+        for record in records:
+            root = roots[record.id]
+            current = latest.get(root)
+            if current is None or _sent_at(record) > _sent_at(current):
+                latest[root] = record
+
+        changes = []
+        events = {}
+        for root, record in latest.items():
+            cancelled = record.message_type == 'Cancel'
+            digest = fingerprint(record)
+            known = self.events.get(root)
+            events[root] = [record.id, digest, record.event, record.area_desc, cancelled]
+
+            if known is not None and known[0] == record.id and known[1] == digest:
+                continue
+            if cancelled and self.started:
+                if known is None or not known[4]:
+                    changes.append(Change(CANCELLED, root, record, known[0] if known else None))
+            elif known is None:
+                changes.append(Change(NEW, root, record))
+            else:
+                changes.append(Change(UPDATED, root, record, known[0]))
+
+        for root, known in self.events.items():
+            if root not in events and not known[4]: # nobody needs telling a cancelled alert went away.
+                changes.append(Change(ENDED, root, previous_id = known[0], event = known[2], area_desc = known[3]))
+
+        self.events = events
+        self.roots = roots
+        self.started = True
+        return changes
+
+    def state(self) -> dict:
+        return {'version': STATE_VERSION, 'events': self.events, 'roots': self.roots}
+
+    def save(self, path: str) -> None:
+        """Writes the state to `path` atomically."""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok = True)
+        fd, tmp = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.state(), f, separators = (',', ':'))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'ChangeTracker':
+        """Loads the state saved at `path`. An empty tracker if there isn't one (or it can't be read)."""
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if state.get('version') != STATE_VERSION:
+            return cls()
+        return cls(state)
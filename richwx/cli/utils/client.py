@@ -0,0 +1,472 @@
+"""The alerts, for Python programs: what `richwx alerts` does, without click or a subprocess.
+
+    from rich.console import Console
+    from richwx import AlertsClient, render
+
+    client = AlertsClient(contact = 'ops@example.com')
+    result = client.active_alerts(areas = ['TX', 'Louisiana'])
+    for record in result:
+        print(record.event, record.expires)
+    render.print_alerts(Console(), result.records, "TX, LA")
+
+    details = client.alerts_by_id(ids = [record.id for record in result.records[:5]])
+
+An `AlertsClient` holds what each command would otherwise set up from scratch: the config,
+the response cache, the validated areas, the saved nationwide snapshot and the keep-alive
+session to the API (which is shared by the whole process, see `nws.session`). Made once
+and kept, a call only costs its requests (or none, when the cache can answer), which is
+what a service asking for alerts every few seconds wants. It's safe to use from several
+threads at once.
+
+The records are `AlertRecord`s; `render` draws them the way the commands do.
+"""
+import os
+import sqlite3
+import threading
+import warnings
+
+from nwsapy import api_connector
+from nwsapy.core.errors import DataValidationError
+from nwsapy.core.mapping import full_state_to_two_letter_abbreviation as fsta
+from nwsapy.services.validation import valid_areas
+
+from cli.utils import nws
+from cli.utils.cache import ResponseCache
+from cli.utils.config import ConfigStore, store as default_store
+from cli.utils.fetcher import (DEFAULT_MAX_WORKERS, expand_region, fetch_active_alerts, fetch_alerts_by_id, merge_alerts,
+                               rate_limiter, stream_alerts)
+from cli.utils.records import DETAIL_FIELDS, full_id
+from cli.utils.snapshot import AlertFilter, AlertSnapshot, fetch_snapshot
+from cli.utils.timings import timings
+
+# Fetched alerts are handed to the detail cache and history this many at a time as they stream past.
+RECORD_BATCH = 500
+
+
+class AreaError(ValueError):
+    """Raised for an area that isn't a state (or territory, or marine area) the API knows."""
+
+
+class AlertsResult:
+    """The alerts for a set of areas, as `AlertsClient.active_alerts` returns them.
+
+    Iterating over it (and `len`) goes over `records`.
+
+    Attributes:
+        areas (list): The areas that were asked for, as 2 letter abbreviations.
+        records (list): The `AlertRecord`s, de-duplicated by ID and filtered.
+        failed (dict): Maps each area that couldn't be fetched to the exception. Its alerts
+            aren't in `records`.
+        snapshot (AlertSnapshot): The nationwide snapshot the alerts were picked from, if
+            they were (see `AlertsClient.active_alerts`), or None.
+    """
+
+    __slots__ = ('areas', 'records', 'failed', 'snapshot')
+
+    def __init__(self, areas: list, records: list, failed: dict = None, snapshot: AlertSnapshot = None):
+        self.areas = areas
+        self.records = records
+        self.failed = failed or {}
+        self.snapshot = snapshot
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return f"AlertsResult({', '.join(self.areas)}: {len(self.records)} alerts, {len(self.failed)} failed)"
+
+
+# path -> ((mtime, size), snapshot). Shared by every client in the process, so under
+# `richwx serve` the file is only read again once another process replaces it.
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def _load_snapshot(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    loaded = _loaded.get(path)
+    if loaded is not None and loaded[0] == stamp:
+        return loaded[1]
+
+    snapshot = AlertSnapshot.load(path)
+    if snapshot is not None:
+        with _loaded_lock:
+            _loaded[path] = (stamp, snapshot)
+    return snapshot
+
+
+class AlertsClient:
+    """Gets active alerts from the NWS API, through richwx's caches.
+
+    Args:
+        app_name (str, optional): The application name in the User-Agent sent to the API.
+            Defaults to the one in the config (see `richwx auth`).
+        contact (str, optional): How the API maintainers can reach you (an email or a
+            website). Defaults to the one in the config.
+        config (ConfigStore, optional): Where the settings come from. Defaults to richwx's
+            config file. It's only read again when it changes.
+        workers (int, optional): Requests in flight at once for a batch. Defaults to
+            `workers` under [Fetch] in the config.
+        on_warning (callable, optional): Called with a message when something goes wrong
+            that doesn't stop a call, i.e. the history couldn't be written. Defaults to
+            `warnings.warn`.
+    """
+
+    def __init__(self, app_name: str = None, contact: str = None, config: ConfigStore = None, workers: int = None,
+                 on_warning = None):
+        self.store = config or default_store
+        self._app_name = app_name
+        self._contact = contact
+        self._workers = workers
+        self.on_warning = on_warning
+        self._areas = None
+        self._cache = None
+        self._cache_settings = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"AlertsClient({self.app_name!r}, {self.contact!r})"
+
+    # Settings.
+
+    @property
+    def config(self):
+        """The current settings (a `ConfigSnapshot`)."""
+        return self.store.snapshot()
+
+    @property
+    def app_name(self) -> str:
+        return self._app_name or self.config.get('UserAgent', 'applicationname')
+
+    @property
+    def contact(self) -> str:
+        return self._contact or self.config.get('UserAgent', 'contactinfo')
+
+    @property
+    def workers(self) -> int:
+        return self._workers or self.config.getint('Fetch', 'workers', DEFAULT_MAX_WORKERS)
+
+    @property
+    def cache_dir(self) -> str:
+        return self.config.get('Cache', 'directory')
+
+    @property
+    def session(self):
+        """The keep-alive `requests.Session` every request goes through."""
+        return nws.session()
+
+    def prepare(self) -> None:
+        """Sets the User-Agent and the request policy (deadline, hedging, where the circuit
+        breaker keeps its state) from the settings. Every call that goes to the API does
+        this first; call it yourself before using `nws` or a `PollScheduler` directly."""
+        config = self.config
+        api_connector.set_user_agent(self.app_name, self.contact)
+        nws.configure(deadline = config.getfloat('Fetch', 'deadline'), hedge = config.getboolean('Fetch', 'hedge', True),
+                      breaker_path = os.path.join(config.get('Cache', 'directory'), 'breaker.json'))
+
+    def response_cache(self, use_cache: bool = True):
+        """The on-disk response cache, or None if `use_cache` is False. Kept until its settings change."""
+        if not use_cache:
+            return None
+
+        config = self.config
+        settings = (os.path.join(config.get('Cache', 'directory'), 'http'), config.getint('Cache', 'max_bytes'),
+                    config.getint('Cache', 'max_entries'))
+        with self._lock:
+            if self._cache_settings != settings:
+                self._cache = ResponseCache(directory = settings[0], max_bytes = settings[1], max_entries = settings[2])
+                self._cache_settings = settings
+            return self._cache
+
+    def _warn(self, message: str) -> None:
+        if self.on_warning is not None:
+            self.on_warning(message)
+        else:
+            warnings.warn(message, RuntimeWarning, stacklevel = 3)
+
+    # Areas.
+
+    def normalize_area(self, area: str) -> str:
+        """Validates an area (`TX`, `tx` or `Texas`) and returns its 2 letter abbreviation.
+
+        Raises:
+            AreaError: If the area can't be abbreviated or isn't a valid area.
+        """
+        if len(area) != 2:
+            try:
+                # full name to state abbreviation.
+                area = fsta(area)
+            except DataValidationError:
+                raise AreaError(f"{area} can not be abbreviated. Check spelling or provide a 2 letter abbreviation (i.e. FL, MA).")
+
+        area = area.upper()
+        if self._areas is None:
+            self._areas = frozenset(valid_areas())
+        if area not in self._areas:
+            raise AreaError(f"{area} is not a valid state.")
+
+        return area
+
+    def normalize_areas(self, areas = (), region: str = None) -> list:
+        """Validates a list of areas (plus a named region, i.e. gulf-coast) and returns their
+        2 letter abbreviations, de-duplicated and in order. With neither, the `default_areas`
+        under [Alerts] in the config are used.
+
+        Raises:
+            AreaError: If an area isn't valid, or there are none.
+            KeyError: If the region isn't one of `fetcher.REGIONS`.
+        """
+        areas = list(areas) + (expand_region(region) if region is not None else [])
+        if not areas:
+            areas = self.config.getlist('Alerts', 'default_areas')
+        if not areas:
+            raise AreaError("provide at least one state or a region.")
+        with timings.phase('validation'):
+            return list(dict.fromkeys(self.normalize_area(area) for area in areas))
+
+    # The detail cache and the history.
+
+    @property
+    def details_enabled(self) -> bool:
+        return self.config.getboolean('Cache', 'details')
+
+    @property
+    def details_path(self) -> str:
+        return os.path.join(self.cache_dir, 'details.db')
+
+    @property
+    def history_enabled(self) -> bool:
+        return self.config.getboolean('History', 'enabled')
+
+    @property
+    def history_path(self) -> str:
+        return self.config.get('History', 'path') or os.path.join(self.cache_dir, 'history.db')
+
+    def keep_heavy(self, filters: AlertFilter = None):
+        """Which heavy fields fetched alerts need: all of them (True) for the filters or the
+        history, only `DETAIL_FIELDS` for the detail cache, or none (False)."""
+        if (filters is not None and filters.needs_heavy) or self.history_enabled:
+            return True
+        return DETAIL_FIELDS if self.details_enabled else False
+
+    def record(self, records) -> None:
+        """Hands alerts that were just fetched to the detail cache and the history (whichever are turned on)."""
+        records = list(records)
+        if self.details_enabled:
+            from cli.utils.details import DetailCache
+            try:
+                with timings.phase('cache'), DetailCache(self.details_path) as details:
+                    details.put(records)
+            except sqlite3.Error:
+                pass # it's only a cache; `alerts_by_id` will go to the API instead.
+
+        if self.history_enabled:
+            from cli.utils.history import AlertStore # only costs anything when it's turned on.
+            try:
+                with timings.phase('history'), AlertStore(self.history_path) as history:
+                    history.sync(records)
+            except sqlite3.Error as err:
+                self._warn(f"could not add the alerts to the history ({err}).")
+
+    def _recorded(self, records):
+        # Passes the records through, handing them to `record` in batches.
+        if not self.details_enabled and not self.history_enabled:
+            yield from records
+            return
+
+        batch = []
+        try:
+            for record in records:
+                batch.append(record)
+                if len(batch) >= RECORD_BATCH:
+                    self.record(batch)
+                    batch = []
+                yield record
+        finally:
+            self.record(batch)
+
+    def cached_details(self, ids: list) -> dict:
+        """The alerts (by full ID) in the detail cache that haven't expired."""
+        if not self.details_enabled:
+            return {}
+
+        from cli.utils.details import DetailCache
+        try:
+            with timings.phase('cache'), DetailCache(self.details_path) as details:
+                found = details.get(ids)
+        except sqlite3.Error:
+            return {}
+        timings.count('cache_hits', len(found))
+        return found
+
+    # Alerts.
+
+    def active_alerts(self, areas = (), region: str = None, filters: AlertFilter = None, use_cache: bool = True,
+                      max_age: float = None, use_snapshot: bool = True, workers: int = None,
+                      on_complete = None) -> AlertsResult:
+        """Gets the active alerts for one or more areas, fetched concurrently.
+
+        A filtered request is answered from the saved nationwide snapshot instead, without
+        any requests, while it's fresh (see `snapshot`).
+
+        Args:
+            areas (iterable, optional): The areas, i.e. `['TX', 'Louisiana']`. See `normalize_areas`.
+            region (str, optional): A named group of areas to add (i.e. gulf-coast).
+            filters (AlertFilter, optional): Only the alerts that match.
+            use_cache (bool, optional): Go through the response cache. Defaults to True.
+            max_age (float, optional): Reuse cached responses up to this many seconds old,
+                whatever the API says.
+            use_snapshot (bool, optional): Allow answering from the snapshot. Defaults to True.
+            workers (int, optional): Overrides `workers` for this call.
+            on_complete (callable, optional): Called as `on_complete(area, alerts, error)` as
+                each area finishes.
+
+        Raises:
+            AreaError: If an area isn't valid.
+
+        Returns:
+            AlertsResult: The alerts, and the areas that couldn't be fetched.
+        """
+        areas = self.normalize_areas(areas, region)
+        self.prepare()
+
+        if filters and use_snapshot and use_cache:
+            snapshot = self.saved_snapshot()
+            if snapshot is not None:
+                return AlertsResult(areas, snapshot.query(filters.for_states(areas)), snapshot = snapshot)
+
+        failed = {}
+        def area_done(area, alerts, error):
+            if error is not None:
+                failed[area] = error
+            if on_complete is not None:
+                on_complete(area, alerts, error)
+
+        results = fetch_active_alerts(areas, max_workers = workers or self.workers, on_complete = area_done,
+                                      cache = self.response_cache(use_cache), max_age = max_age,
+                                      heavy = self.keep_heavy(filters))
+        records = merge_alerts(results)
+        self.record(records)
+        if filters:
+            records = [element for element in records if filters.matches(element)]
+        return AlertsResult(areas, records, failed)
+
+    def stream_active_alerts(self, areas = (), region: str = None, filters: AlertFilter = None, use_cache: bool = True,
+                             max_age: float = None, workers: int = None, on_complete = None):
+        """Like `active_alerts`, but yields each alert as soon as it's decoded, and never holds
+        them all at once. `on_complete` gets the number of alerts for the area instead of the
+        alerts. The areas are checked straight away, before the first alert is asked for.
+
+        Raises:
+            AreaError: If an area isn't valid.
+
+        Returns:
+            iterator: The `AlertRecord`s, de-duplicated by ID and filtered.
+        """
+        areas = self.normalize_areas(areas, region)
+        self.prepare()
+        stream = stream_alerts(areas, max_workers = workers or self.workers, on_complete = on_complete,
+                               cache = self.response_cache(use_cache), max_age = max_age, heavy = self.keep_heavy(filters))
+        records = self._recorded(element for area, element in stream)
+        return (element for element in records if not filters or filters.matches(element))
+
+    def alerts_by_id(self, ids, use_cache: bool = True, max_age: float = None, workers: int = None,
+                     on_complete = None) -> dict:
+        """Gets alerts, with all of their details, by ID.
+
+        The IDs can be full (`urn:oid:...`), as the alert list shows them, or the alerts'
+        URLs. Alerts a list already fetched come from the detail cache until they expire
+        (unless `use_cache` is False); only the others are requested, concurrently.
+
+        Returns:
+            dict: Maps each full ID (de-duplicated, in order) to its `AlertRecord`, or to the
+                exception if it couldn't be fetched.
+        """
+        ids = list(dict.fromkeys(full_id(id) for id in ids))
+        known = self.cached_details(ids) if use_cache else {}
+        missing = [id for id in ids if id not in known]
+
+        fetched = {}
+        if missing:
+            self.prepare()
+            fetched = fetch_alerts_by_id(missing, max_workers = workers or self.workers, on_complete = on_complete,
+                                         cache = self.response_cache(use_cache), max_age = max_age)
+            self.record(data for data in fetched.values() if not isinstance(data, Exception))
+        return {id: known[id] if id in known else fetched[id] for id in ids}
+
+    # The nationwide snapshot.
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.cache_dir, 'snapshot.json')
+
+    def saved_snapshot(self, max_age: float = None):
+        """The nationwide snapshot on disk, if there is one no older than `max_age` seconds.
+
+        `max_age` defaults to `max_age` under [Snapshot] in the config. Pass `float('inf')` to
+        take it whatever its age.
+        """
+        if max_age is None:
+            max_age = self.config.getint('Snapshot', 'max_age', 300)
+
+        snapshot = _load_snapshot(self.snapshot_path)
+        if snapshot is None or not snapshot.is_fresh(max_age):
+            return None
+        return snapshot
+
+    def fetch_snapshot(self, use_cache: bool = True, max_age: float = None) -> AlertSnapshot:
+        """Fetches a new nationwide snapshot (every active alert, one request) and saves it
+        for the next call, or command. See `active_alerts` for `use_cache` and `max_age`."""
+        self.prepare()
+        snapshot = fetch_snapshot(cache = self.response_cache(use_cache), max_age = max_age, limiter = rate_limiter)
+        self.record(snapshot.records)
+        path = self.snapshot_path
+        snapshot.save(path)
+        stat = os.stat(path)
+        with _loaded_lock:
+            _loaded[path] = ((stat.st_mtime_ns, stat.st_size), snapshot)
+        return snapshot
+
+    def snapshot(self, refresh: bool = False, offline: bool = False, use_cache: bool = True,
+                 max_age: float = None):
+        """The nationwide snapshot: the saved one while it's fresh, a new one otherwise.
+
+        Args:
+            refresh (bool, optional): Fetch a new one even if the saved one is fresh.
+            offline (bool, optional): Take the saved one however old it is, and never go to
+                the API. Returns None if there isn't one.
+            use_cache, max_age: For the request, see `active_alerts`.
+        """
+        if offline:
+            return self.saved_snapshot(max_age = float('inf'))
+
+        snapshot = None if refresh else self.saved_snapshot()
+        if snapshot is None:
+            snapshot = self.fetch_snapshot(use_cache, max_age)
+        return snapshot
+
+    # The zone index.
+
+    @property
+    def zones_path(self) -> str:
+        """Where `richwx zones build` writes the zone index, and where it's read from."""
+        return os.path.join(self.cache_dir, 'zones.rwz')
+
+    def zone_index(self):
+        """The zone index at `zones_path` (see `cli.utils.zones`), or None until
+        `richwx zones build` has made one."""
+        from cli.utils.zones import open_index
+        return open_index(self.zones_path)
+
+    def zones(self, record) -> list:
+        """The `Zone`s an alert (with its heavy fields) covers, from the zone index; no
+        requests. Empty if there's no index."""
+        index = self.zone_index()
+        return index.resolve(record) if index is not None else []
@@ -0,0 +1,231 @@
+import os
+import tempfile
+import threading
+from configparser import ConfigParser, Error as ConfigError
+from types import MappingProxyType
+
+import click
+
+from cli.utils.timings import timings
+
+APP_DIR = click.get_app_dir('richwx')
+
+# Set RICHWX_CONFIG to point richwx at a different file (i.e. for testing).
+CONFIG_PATH = os.environ.get('RICHWX_CONFIG', os.path.join(APP_DIR, 'config.ini'))
+
+# The file richwx used before there was a config file. It lived in whatever directory the
+# command was run from; if one is found there while there's no config file yet, it's
+# written to the config file, which is all that's read from then on.
+LEGACY_USER_AGENT_FILE = 'useragent.ini'
+
+# Every setting richwx knows about and its default. Anything missing from the file falls
+# back to these, so the file only needs to hold what the user actually changed.
+DEFAULTS = {
+    'UserAgent': {
+        'applicationname': 'RichWxTerminal',
+        'contactinfo': 'NoneSet',
+    },
+    'Cache': {
+        'directory': os.path.join(APP_DIR, 'cache'),
+        'max_bytes': str(50 * 1024 * 1024),
+        'max_entries': '2000',
+        # Keep what `richwx alerts id` shows for every alert a list command fetched, until it
+        # expires. Lists then keep that text for each alert (but not its zones or geometry).
+        'details': 'yes',
+    },
+    'Fetch': {
+        'workers': '4',
+        # Seconds a request to the API may take, retries included, before giving up (or
+        # showing cached alerts instead).
+        'deadline': '20',
+        # Send a second copy of a request that's taking longer than usual.
+        'hedge': 'yes',
+    },
+    'Alerts': {
+        'default_areas': '',
+    },
+    'Snapshot': {
+        # How long (in seconds) a nationwide snapshot is reused before it's fetched again.
+        'max_age': '300',
+    },
+    'History': {
+        # Keep every alert fetched in a local database (see `richwx alerts query --at`).
+        'enabled': 'no',
+        # Defaults to history.db in the cache directory.
+        'path': '',
+    },
+}
+
+
+class ConfigSnapshot:
+    """An immutable view of the configuration, as it was when the file was read.
+
+    Args:
+        sections (dict): Maps each section to a dictionary of its values.
+        stamp (tuple, optional): Modification time and size of the file this was read from.
+    """
+
+    __slots__ = ('_sections', 'stamp')
+
+    def __init__(self, sections: dict, stamp: tuple = None):
+        merged = {}
+        for section in set(DEFAULTS) | set(sections):
+            values = dict(DEFAULTS.get(section, {}))
+            values.update(sections.get(section, {}))
+            merged[section] = MappingProxyType(values)
+
+        object.__setattr__(self, '_sections', MappingProxyType(merged))
+        object.__setattr__(self, 'stamp', stamp)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only. Use ConfigStore.update to change a setting.")
+
+    def __getitem__(self, section: str):
+        return self._sections[section]
+
+    def __contains__(self, section: str) -> bool:
+        return section in self._sections
+
+    def sections(self) -> list:
+        return list(self._sections)
+
+    def get(self, section: str, key: str, fallback: str = None) -> str:
+        return self._sections.get(section, {}).get(key, fallback)
+
+    def getint(self, section: str, key: str, fallback: int = None) -> int:
+        value = self.get(section, key)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return fallback
+
+    def getfloat(self, section: str, key: str, fallback: float = None) -> float:
+        value = self.get(section, key)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return fallback
+
+    def getboolean(self, section: str, key: str, fallback: bool = False) -> bool:
+        value = (self.get(section, key) or '').strip().lower()
+        if value in ('1', 'yes', 'true', 'on'):
+            return True
+        if value in ('0', 'no', 'false', 'off'):
+            return False
+        return fallback
+
+    def getlist(self, section: str, key: str) -> list:
+        """Gets a comma and/or whitespace separated value as a list."""
+        value = self.get(section, key) or ''
+        return [item for item in value.replace(',', ' ').split() if item]
+
+
+class ConfigStore:
+    """Reads and writes the richwx configuration file.
+
+    The file is parsed once into a `ConfigSnapshot`, which is handed out until the file's
+    modification time (or size) changes. Reading a setting therefore costs a `stat`, not a parse.
+    Writes go to a temporary file that is then swapped in, so a reader (or a crash halfway
+    through) never sees a half written file.
+
+    Args:
+        path (str, optional): Where the configuration file lives. Defaults to CONFIG_PATH.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _stamp(self):
+        # The size is in here too, in case the file changed twice within the filesystem's
+        # mtime resolution.
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read(self, stamp) -> ConfigSnapshot:
+        with timings.phase('config'):
+            if stamp is None and os.path.isfile(LEGACY_USER_AGENT_FILE):
+                stamp = self._migrate()
+            return self._parse(stamp)
+
+    def _parse(self, stamp) -> ConfigSnapshot:
+        parser = ConfigParser(interpolation = None)
+        if stamp is not None:
+            parser.read(self.path)
+        return ConfigSnapshot({section: dict(parser[section]) for section in parser.sections()}, stamp)
+
+    def _migrate(self):
+        """Writes what's in `LEGACY_USER_AGENT_FILE` to the config file, and gets its stamp.
+        If the config file can't be written, the defaults are used and it's tried again next time."""
+        parser = ConfigParser(interpolation = None)
+        try:
+            parser.read(LEGACY_USER_AGENT_FILE)
+            self._write({section: dict(parser[section]) for section in parser.sections()})
+        except (OSError, ConfigError):
+            return None
+        return self._stamp()
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Gets the current configuration, re-reading the file only if it changed."""
+        stamp = self._stamp()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.stamp == stamp:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.stamp != stamp:
+                self._snapshot = self._read(stamp)
+            return self._snapshot
+
+    def update(self, section: str, **values) -> ConfigSnapshot:
+        """Sets one or more values in a section and writes the file.
+
+        Only values that differ from the defaults are written out.
+        """
+        with self._lock:
+            current = self._read(self._stamp())
+            sections = {name: dict(current[name]) for name in current.sections()}
+            sections.setdefault(section, {}).update({key: str(value) for key, value in values.items()})
+            self._write(sections)
+            self._snapshot = self._read(self._stamp())
+            return self._snapshot
+
+    def reset(self, section: str) -> ConfigSnapshot:
+        """Resets a section back to its defaults."""
+        with self._lock:
+            current = self._read(self._stamp())
+            sections = {name: dict(current[name]) for name in current.sections()}
+            sections[section] = dict(DEFAULTS.get(section, {}))
+            self._write(sections)
+            self._snapshot = self._read(self._stamp())
+            return self._snapshot
+
+    def _write(self, sections: dict) -> None:
+        parser = ConfigParser(interpolation = None)
+        for section, values in sections.items():
+            changed = {key: value for key, value in values.items() if DEFAULTS.get(section, {}).get(key) != value}
+            # The user agent is always written so that the file says what's being sent.
+            if section == 'UserAgent':
+                changed = dict(values)
+            if changed:
+                parser[section] = changed
+
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok = True)
+        fd, tmp = tempfile.mkstemp(dir = directory, prefix = '.config-', suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                parser.write(f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+# One store for the whole process.
+store = ConfigStore()
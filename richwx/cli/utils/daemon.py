@@ -0,0 +1,292 @@
+"""A resident richwx process (`richwx serve`) and the client that forwards commands to it.
+
+Every `richwx` invocation starts an interpreter, imports click, rich and nwsapy, opens a new
+connection to the API and starts with cold in-memory state. `richwx serve` does all of that
+once and then listens on a Unix socket. While it's running, `richwx alerts ...` and
+`richwx auth ...` send their arguments to it and print what comes back, so a call costs a
+socket round trip plus the command itself.
+
+The protocol is one JSON object per line. The client sends the request:
+
+    {"args": [...], "cwd": "...", "width": 120, "terminal": true, "color_system": "truecolor", "stdin": "...",
+     "env": {"RICHWX_CONFIG": "..."}}
+
+and the server answers with any number of `{"out": "..."}` / `{"err": "..."}` lines, written
+as the command produces them, followed by `{"exit": 0}`.
+
+The `RICHWX_*` variables (the API's URL, the config file, ...) are read once, when richwx
+is imported, so the server can't take the client's for a single command. When they differ
+from the server's it answers `{"local": "RICHWX_CONFIG"}` instead, and the client runs the
+command itself.
+
+The client side is imported on every invocation, so it only uses the standard library.
+"""
+import json
+import os
+import shutil
+import socket
+import sys
+
+import click
+
+# Set RICHWX_SOCKET to use a different socket (i.e. to run more than one server).
+SOCKET_PATH = os.environ.get('RICHWX_SOCKET', os.path.join(click.get_app_dir('richwx'), 'richwx.sock'))
+
+# Commands that are forwarded to the server when it's running.
+FORWARDED_COMMANDS = ('alerts', 'auth')
+
+# Except these, which run for as long as you let them and would hold up every other command.
+LOCAL_COMMANDS = (('alerts', 'watch'),)
+
+# And anything with these options, which read keys from the terminal the command was typed in.
+LOCAL_OPTIONS = ('--pager', '--interactive')
+
+# Set in the server process, so that it runs commands itself instead of forwarding them.
+serving = False
+
+
+def _color_system(terminal: bool):
+    # The same decision rich makes for a terminal, without having to import rich here.
+    if not terminal or 'NO_COLOR' in os.environ:
+        return None
+    if os.environ.get('COLORTERM', '').lower() in ('truecolor', '24bit'):
+        return 'truecolor'
+    term = os.environ.get('TERM', '').lower()
+    if term in ('dumb', 'unknown'):
+        return None
+    return '256' if '256color' in term else 'standard'
+
+
+def _environment() -> dict:
+    # The settings the server would otherwise quietly use its own of.
+    return {name: value for name, value in os.environ.items() if name.startswith('RICHWX_') and name != 'RICHWX_SOCKET'}
+
+
+def _send(sock, message: dict) -> None:
+    sock.sendall(json.dumps(message).encode() + b'\n')
+
+
+def _messages(sock):
+    with sock.makefile('r', encoding = 'utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def forwards(args: list) -> bool:
+    """Whether the command (the arguments after `richwx`) is one that goes to the server."""
+    return (bool(args) and args[0] in FORWARDED_COMMANDS and tuple(args[:2]) not in LOCAL_COMMANDS
+            and not any(arg in LOCAL_OPTIONS for arg in args))
+
+
+def forward(args: list, path: str = None):
+    """Runs a command in the server, if there is one, writing its output here as it arrives.
+
+    Returns:
+        int: The command's exit code, or None if there's no server to forward to, or it
+            runs with other `RICHWX_*` variables (the command should then run in this process).
+    """
+    path = path or SOCKET_PATH
+    if serving or not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError: # a socket left behind by a server that's gone.
+        sock.close()
+        return None
+
+    terminal = sys.stdout.isatty()
+    stdin = ''
+    if '-' in args and not sys.stdin.isatty(): # i.e. `richwx alerts id -`
+        stdin = sys.stdin.read()
+
+    with sock:
+        _send(sock, {'args': list(args), 'cwd': os.getcwd(), 'width': shutil.get_terminal_size().columns,
+                     'terminal': terminal, 'color_system': _color_system(terminal), 'stdin': stdin,
+                     'env': _environment()})
+        for message in _messages(sock):
+            if 'local' in message:
+                click.echo(f"richwx: running here rather than in the server, which has a different {message['local']}.",
+                           err = True)
+                return None
+            if 'out' in message:
+                sys.stdout.write(message['out'])
+                sys.stdout.flush()
+            elif 'err' in message:
+                sys.stderr.write(message['err'])
+                sys.stderr.flush()
+            elif 'exit' in message:
+                return message['exit']
+
+    click.echo("richwx: the server went away before the command finished.", err = True)
+    return 1
+
+
+def is_running(path: str = None) -> bool:
+    """Whether a server is listening on the socket."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or SOCKET_PATH)
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def stop(path: str = None) -> bool:
+    """Asks the server to shut down. Returns False if there wasn't one running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or SOCKET_PATH)
+    except OSError:
+        return False
+    with sock:
+        _send(sock, {'stop': True})
+        for _ in _messages(sock):
+            pass
+    return True
+
+
+class _Stream:
+    """A text stream that sends whatever is written to it to the client, as `kind` messages."""
+
+    def __init__(self, sock, kind: str, lock):
+        self.sock = sock
+        self.kind = kind
+        self.lock = lock
+
+    errors = 'strict'
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str): # so click sees this is a text stream.
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            with self.lock:
+                _send(self.sock, {self.kind: text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+    @property
+    def encoding(self):
+        return 'utf-8'
+
+
+def serve(command: click.Command, path: str = None, on_ready = None) -> None:
+    """Runs the server until it's asked to stop (or interrupted).
+
+    Commands run one at a time: they share this process's stdout, stdin and working
+    directory, which are swapped for each one. Requests to the API made by a command still
+    go out concurrently.
+
+    Args:
+        command (click.Command): What to run the requests' arguments with (the `richwx` group).
+        path (str, optional): Where to put the socket. Defaults to SOCKET_PATH.
+        on_ready (callable, optional): Called once the socket is listening.
+    """
+    import contextlib
+    import io
+    import socketserver
+    import threading
+    import traceback
+
+    from rich.console import Console
+
+    from cli.utils.lazy import LazyObj
+
+    global serving
+    serving = True
+    path = path or SOCKET_PATH
+    run_lock = threading.Lock()
+    user_agent = [] # built once, on first use.
+    client = [] # the same, and kept for every command: its caches are what make them fast.
+
+    def get_user_agent():
+        if not user_agent:
+            from cli.utils.handlers import UserAgentHandler
+            user_agent.append(UserAgentHandler())
+        return user_agent[0]
+
+    def get_client():
+        if not client:
+            from cli.utils.client import AlertsClient
+            client.append(AlertsClient(on_warning = lambda message: click.echo(f"richwx: {message}", err = True)))
+        return client[0]
+
+    def run(request: dict, out: _Stream, err: _Stream) -> int:
+        console = Console(file = out, width = request.get('width') or 80, force_terminal = request.get('terminal'),
+                          color_system = request.get('color_system'), legacy_windows = False)
+        obj = LazyObj({'console': lambda: console, 'user_agent': get_user_agent, 'client': get_client})
+
+        with run_lock, contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            stdin, cwd = sys.stdin, os.getcwd()
+            sys.stdin = io.StringIO(request.get('stdin') or '')
+            try:
+                os.chdir(request.get('cwd') or cwd)
+                command.main(request['args'], prog_name = 'richwx', obj = obj, standalone_mode = True)
+            except SystemExit as exit:
+                return exit.code if isinstance(exit.code, int) else (0 if exit.code is None else 1)
+            except Exception:
+                err.write(traceback.format_exc())
+                return 1
+            finally:
+                sys.stdin = stdin
+                os.chdir(cwd)
+        return 0
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            if request.get('stop'):
+                _send(self.connection, {'exit': 0})
+                threading.Thread(target = server.shutdown).start()
+                return
+
+            # Only commands that would run the same here as in the client.
+            environment = _environment()
+            different = sorted(name for name in set(environment) | set(request.get('env') or {})
+                               if environment.get(name) != (request.get('env') or {}).get(name))
+            if different:
+                _send(self.connection, {'local': ', '.join(different)})
+                return
+
+            lock = threading.Lock()
+            try:
+                code = run(request, _Stream(self.connection, 'out', lock), _Stream(self.connection, 'err', lock))
+                _send(self.connection, {'exit': code})
+            except OSError: # the client went away.
+                pass
+
+    if os.path.exists(path):
+        if is_running(path):
+            raise RuntimeError(f"A server is already running on {path}.")
+        os.remove(path) # left behind by one that's gone.
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+    # Whoever can connect can run commands as this user, so the socket is created 0600
+    # rather than opened up by the umask until a chmod gets to it.
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    finally:
+        os.umask(umask)
+    server.daemon_threads = True
+    try:
+        if on_ready is not None:
+            on_ready()
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
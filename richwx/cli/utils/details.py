@@ -0,0 +1,146 @@
+"""What `richwx alerts id` shows for each alert, kept from the lists that were already fetched.
+
+The features in `/alerts/active` carry everything the detail table shows (headline,
+description, instruction, sender, severity), so when a list command gets them there's no
+need to ask for each alert again by ID. `DetailCache.put` keeps those fields, keyed by
+the alert's ID, until the alert expires; `alerts id` looks there first and only goes to
+the API for the ones it can't find. The lists only keep the text it needs
+(`DETAIL_FIELDS`), not the zones, geocodes or geometry, and `details = no` under `[Cache]`
+turns it off.
+
+It's a small SQLite database rather than a file per alert: a nationwide list is about
+10,000 alerts, and the ones already stored are found with one indexed lookup per few
+hundred IDs and skipped.
+"""
+import os
+import sqlite3
+import time
+
+from cli.utils.records import DETAIL_FIELDS, AlertRecord
+
+SCHEMA_VERSION = 1
+
+# How long an alert that doesn't say when it expires is kept for, in seconds.
+DEFAULT_TTL = 60 * 60
+
+# The columns kept for each alert, and the property of the feature each one holds.
+COLUMNS = (('event', 'event'), ('sender_name', 'senderName'), ('area_desc', 'areaDesc'), ('severity', 'severity'),
+           ('urgency', 'urgency'), ('certainty', 'certainty'), ('status', 'status'),
+           ('message_type', 'messageType'), ('sent', 'sent'), ('effective', 'effective'), ('onset', 'onset'),
+           ('ends', 'ends'), ('expires', 'expires'), ('headline', 'headline'), ('description', 'description'),
+           ('instruction', 'instruction'))
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS details (
+    id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    {', '.join(f'{name} TEXT' for name, _ in COLUMNS)}
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS details_expires_at ON details (expires_at);
+"""
+
+# Most parameters SQLite takes in one statement is 999 on older builds.
+_BATCH = 500
+
+
+def _value(record: AlertRecord, name: str):
+    if name in DETAIL_FIELDS:
+        return record._heavy_field(name)
+    if name in ('sent', 'effective', 'onset', 'ends', 'expires'):
+        return getattr(record, '_' + name)
+    return getattr(record, name)
+
+
+class DetailCache:
+    """The alert details database.
+
+    Args:
+        path (str): Where the database lives. It's created (with its directory) if need be.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+        self.connection = sqlite3.connect(path, timeout = 10, isolation_level = None) # transactions are explicit.
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.connection.executescript('DROP TABLE IF EXISTS details;' + _SCHEMA) # it's only a cache.
+            self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM details').fetchone()[0]
+
+    def _stored(self, ids: list, now: float) -> set:
+        stored = set()
+        for start in range(0, len(ids), _BATCH):
+            chunk = ids[start:start + _BATCH]
+            stored.update(id for id, in self.connection.execute(
+                f"SELECT id FROM details WHERE expires_at > ? AND id IN ({','.join('?' * len(chunk))})", [now] + chunk))
+        return stored
+
+    def put(self, records, now: float = None) -> int:
+        """Keeps the details of alerts that have them (`has_details`; the others are skipped), and
+        drops the ones that have expired.
+
+        Returns:
+            int: How many alerts were stored that weren't already.
+        """
+        now = time.time() if now is None else now
+        records = {record.id: record for record in records if record.has_details}
+        stored = self._stored(list(records), now)
+        rows = []
+        for id, record in records.items():
+            if id in stored: # an alert's message never changes once it's sent.
+                continue
+            expires = record.expires
+            expires_at = expires.timestamp() if expires is not None else now + DEFAULT_TTL
+            if expires_at <= now:
+                continue
+            rows.append((id, expires_at, *(_value(record, name) for name, _ in COLUMNS)))
+
+        if not rows:
+            return 0
+
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.execute('DELETE FROM details WHERE expires_at <= ?', (now,))
+            before = self.connection.total_changes
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO details (id, expires_at, {', '.join(name for name, _ in COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))})", rows)
+            return self.connection.total_changes - before
+
+    def get(self, ids, now: float = None) -> dict:
+        """Looks up alerts by ID, leaving out the ones that aren't stored or have expired.
+
+        Returns:
+            dict: Maps each ID found to an `AlertRecord` with the fields `alerts id` shows.
+                Its other heavy fields (zones, geocode, geometry, ...) are None.
+        """
+        now = time.time() if now is None else now
+        ids = list(ids)
+        found = {}
+        for start in range(0, len(ids), _BATCH):
+            chunk = ids[start:start + _BATCH]
+            rows = self.connection.execute(
+                f"SELECT id, {', '.join(name for name, _ in COLUMNS)} FROM details "
+                f"WHERE expires_at > ? AND id IN ({','.join('?' * len(chunk))})", [now] + chunk)
+            for row in rows:
+                properties = {'id': row[0]}
+                properties.update((key, value) for (_, key), value in zip(COLUMNS, row[1:]))
+                found[row[0]] = AlertRecord.from_feature(properties)
+        return found
+
+    def clear(self) -> None:
+        self.connection.execute('DELETE FROM details')
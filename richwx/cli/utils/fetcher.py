@@ -0,0 +1,230 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cli.utils import nws
+from cli.utils.records import AlertRecord
+
+# Named groups of areas that can be passed in place of a list of states (i.e. `--region gulf-coast`).
+REGIONS = {
+    'gulf-coast': ['TX', 'LA', 'MS', 'AL', 'FL'],
+    'southeast': ['FL', 'GA', 'SC', 'NC', 'AL', 'MS', 'TN'],
+    'northeast': ['ME', 'NH', 'VT', 'MA', 'RI', 'CT', 'NY', 'NJ', 'PA'],
+    'mid-atlantic': ['NY', 'NJ', 'PA', 'DE', 'MD', 'DC', 'VA', 'WV'],
+    'midwest': ['OH', 'IN', 'IL', 'MI', 'WI', 'MN', 'IA', 'MO'],
+    'plains': ['ND', 'SD', 'NE', 'KS', 'OK', 'TX'],
+    'southwest': ['AZ', 'NM', 'NV', 'UT', 'CO'],
+    'west-coast': ['CA', 'OR', 'WA'],
+    'northwest': ['WA', 'OR', 'ID', 'MT', 'WY'],
+}
+
+# The NWS API doesn't publish a hard limit, but asks that clients keep it "reasonable".
+# A handful of requests per second keeps us well clear of being throttled.
+DEFAULT_REQUESTS_PER_SECOND = 5
+DEFAULT_MAX_WORKERS = 4
+
+
+class RateLimiter:
+    """Spaces out requests so that no more than `rate` of them start per second.
+
+    A single instance is meant to be shared by every worker thread, so the limit
+    applies to the process as a whole and not to each thread.
+    """
+
+    def __init__(self, rate: float = DEFAULT_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Blocks until the caller is allowed to make its request."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Shared by every fetch in this process.
+rate_limiter = RateLimiter()
+
+
+def expand_region(region: str) -> list:
+    """Gets the list of areas for a named region.
+
+    Args:
+        region (str): The name of the region (i.e. gulf-coast).
+
+    Raises:
+        KeyError: If the region isn't one of `REGIONS`.
+
+    Returns:
+        list: The 2 letter abbreviations of the areas in the region.
+    """
+    return list(REGIONS[region.lower()])
+
+
+def _fetch_area(area: str, limiter: RateLimiter, cache, max_age, heavy) -> list:
+    return nws.get_active_alerts(area = area, cache = cache, max_age = max_age, limiter = limiter, heavy = heavy)
+
+
+def fetch_active_alerts(areas: list, max_workers: int = DEFAULT_MAX_WORKERS, limiter: RateLimiter = None,
+                        on_complete = None, cache = None, max_age: float = None, heavy: bool = False) -> dict:
+    """Fetches the active alerts for every area concurrently.
+
+    Args:
+        areas (list): The 2 letter abbreviations of the areas to fetch.
+        max_workers (int, optional): Upper bound on the number of requests in flight.
+        limiter (RateLimiter, optional): Rate limiter to use. Defaults to the shared one.
+        on_complete (callable, optional): Called as `on_complete(area, alerts, error)` from
+            the calling thread as each area finishes, in completion order.
+        cache (ResponseCache, optional): Response cache to go through. None skips caching.
+        max_age (float, optional): Overrides how long cached responses are reused for.
+        heavy (bool, optional): Keep the heavy fields (zones, geocodes, ...) on each record.
+
+    Returns:
+        dict: Maps each area to its list of `AlertRecord`s (or to None if the request failed),
+            in the same order as `areas`.
+    """
+    limiter = limiter or rate_limiter
+    results = {area: None for area in areas}
+
+    with ThreadPoolExecutor(max_workers = max(1, min(max_workers, len(areas) or 1))) as pool:
+        futures = {pool.submit(_fetch_area, area, limiter, cache, max_age, heavy): area for area in areas}
+        for future in as_completed(futures):
+            area = futures[future]
+            try:
+                alerts, error = future.result(), None
+            except Exception as err:
+                alerts, error = None, err
+
+            results[area] = alerts
+            if on_complete is not None:
+                on_complete(area, alerts, error)
+
+    return results
+
+
+def _fetch_id(id: str, limiter: RateLimiter, cache, max_age) -> AlertRecord:
+    return nws.get_alert_by_id(id, cache = cache, max_age = max_age, limiter = limiter)
+
+
+def fetch_alerts_by_id(ids: list, max_workers: int = DEFAULT_MAX_WORKERS, limiter: RateLimiter = None,
+                       on_complete = None, cache = None, max_age: float = None) -> dict:
+    """Fetches many alerts by ID concurrently, over the shared keep-alive session.
+
+    Takes the same arguments as `fetch_active_alerts`, with alert IDs in place of areas.
+    `on_complete` is called as `on_complete(id, alert, error)`.
+
+    Returns:
+        dict: Maps each ID to its `AlertRecord`, or to the exception if it couldn't be
+            fetched, in the same order as `ids`.
+    """
+    limiter = limiter or rate_limiter
+    results = {id: None for id in ids}
+
+    with ThreadPoolExecutor(max_workers = max(1, min(max_workers, len(results) or 1))) as pool:
+        futures = {pool.submit(_fetch_id, id, limiter, cache, max_age): id for id in results}
+        for future in as_completed(futures):
+            id = futures[future]
+            try:
+                alert, error = future.result(), None
+            except Exception as err:
+                alert, error = None, err
+
+            results[id] = alert if error is None else error
+            if on_complete is not None:
+                on_complete(id, alert, error)
+
+    return results
+
+
+def merge_alerts(results: dict) -> list:
+    """Merges the alerts from each area into one list, de-duplicated by alert ID.
+
+    An alert that spans more than one area (i.e. a watch covering parts of AL and MS)
+    comes back in each of those responses, but should only be shown once.
+    """
+    seen = set()
+    merged = []
+    for alerts in results.values():
+        for alert in alerts or []:
+            if alert.id in seen:
+                continue
+            seen.add(alert.id)
+            merged.append(alert)
+
+    return merged
+
+
+class _Stopped(Exception):
+    pass
+
+
+def stream_alerts(areas: list, max_workers: int = DEFAULT_MAX_WORKERS, limiter: RateLimiter = None,
+                  on_complete = None, cache = None, max_age: float = None, heavy: bool = False):
+    """Streams the alerts for every area as they are decoded, de-duplicated by alert ID.
+
+    Works like `fetch_active_alerts`, except that each alert is yielded as soon as any of
+    the workers has decoded it, instead of after every area has finished. At most a few
+    hundred alerts are held in between. `on_complete` gets the number of alerts for the
+    area instead of the alerts themselves.
+
+    Yields:
+        tuple: The area and an `AlertRecord` (light, unless `heavy` is True).
+    """
+    limiter = limiter or rate_limiter
+    rows = queue.Queue(maxsize = 256)
+    stop = threading.Event()
+
+    def put(item):
+        while True:
+            if stop.is_set():
+                raise _Stopped()
+            try:
+                rows.put(item, timeout = 0.1)
+                return
+            except queue.Full:
+                continue
+
+    def work(area):
+        count, error = 0, None
+        try:
+            for feature in nws.stream_active_alerts(area = area, cache = cache, max_age = max_age, limiter = limiter):
+                put(('row', area, AlertRecord.from_feature(feature, heavy = heavy)))
+                count += 1
+        except _Stopped:
+            return
+        except Exception as err:
+            error = err
+        try:
+            put(('done', area, count, error))
+        except _Stopped:
+            pass
+
+    seen = set()
+    remaining = len(areas)
+    pool = ThreadPoolExecutor(max_workers = max(1, min(max_workers, len(areas) or 1)))
+    try:
+        for area in areas:
+            pool.submit(work, area)
+
+        while remaining:
+            item = rows.get()
+            if item[0] == 'done':
+                remaining -= 1
+                if on_complete is not None:
+                    on_complete(*item[1:])
+                continue
+
+            _, area, record = item
+            if record.id in seen:
+                continue
+            seen.add(record.id)
+            yield area, record
+    finally:
+        stop.set()
+        pool.shutdown(wait = True)
@@ -1,33 +1,30 @@
-import os
-from configparser import ConfigParser
+from cli.utils.config import DEFAULTS, store
 
 class UserAgentHandler:
-    
-    """Class to handle user agent data and provide an interface for 
+
+    """Class to handle user agent data and provide an interface for
     functionality to see what's currently set.
+
+    The values live in the richwx configuration file (see `cli.utils.config`), which is
+    only re-read when it changes on disk.
     """
-    
-    info = ConfigParser()
-    PATH_TO_FILE = os.path.join(os.path.abspath("."), 'useragent.ini')
-    default_values = {'applicationname' : 'RichWxTerminal', 'contactinfo' : 'NoneSet'}
-    
-    def __init__(self):
-        # If the file doesn't exist, then create a new one.
-        if not self._file_exists():
-            self.set_default_values()
-        
-        # Security concern: don't keep these values internal to the class. Just call the
-        # _read method every time. Makes things easier :^)
-    
+
+    default_values = DEFAULTS['UserAgent']
+
+    def __init__(self, config_store = None):
+        self.store = config_store or store
+
+        # Security concern: don't keep these values internal to the class. They're read from
+        # the config snapshot on every access, which is cheap now that it's cached.
+
+    @property
+    def PATH_TO_FILE(self) -> str:
+        return self.store.path
+
     def _read(self) -> tuple:
-        self.info.read(self.PATH_TO_FILE)
-        return (self.info['UserAgent']['applicationname'], self.info['UserAgent']['contactinfo'])
-    
-    def _file_exists(self) -> bool:
-        if os.path.isfile(self.PATH_TO_FILE):
-            return True
-        return False
-    
+        section = self.store.snapshot()['UserAgent']
+        return (section['applicationname'], section['contactinfo'])
+
     @property
     def contact(self) -> str:
         return self._read()[1]
@@ -35,34 +32,26 @@ class UserAgentHandler:
     @property
     def app_name(self) -> str:
         return self._read()[0]
-    
+
     @property
     def error_message(self) -> str:
         return "\n=> [red bold]Attention[/]: you have not set the contact information for this application. "\
 "The contact information can be set using [reverse]richwx auth set[/], and will [underline bold]only[/] "\
 "be seen by the API maintainers. This can be an email or a website. See https://www.weather.gov/documentation/services-web-api for "\
 "more information.\n"
-    
+
     @property
     def contact_is_set(self) -> bool:
         if self.contact == 'NoneSet':
             return False
         return True
-    
+
     def set_contact(self, contact: str) -> None:
         if not isinstance(contact, str):
             print("When setting this information, you must pass in a string. Not setting.")
             return
-        
-        # Reset it to the default values. This handles the odd boundary case where the
-        # file does exist, but there's no information.
-        self.set_default_values()
-        
-        with open(self.PATH_TO_FILE, 'w') as configfile:
-            self.info['UserAgent']['contactinfo'] = contact
-            self.info.write(configfile)
-    
+
+        self.store.update('UserAgent', contactinfo = contact)
+
     def set_default_values(self) -> None:
-        with open(self.PATH_TO_FILE, 'w') as configfile:
-            self.info['UserAgent'] = self.default_values
-            self.info.write(configfile)
\ No newline at end of file
+        self.store.reset('UserAgent')
@@ -0,0 +1,197 @@
+"""A local history of every alert richwx has fetched, kept in SQLite.
+
+Turned on with `enabled = yes` under [History] in the config. Every command that fetches
+alerts then hands them to `AlertStore.sync`, which upserts them by ID. Only the ones that
+are new or whose fingerprint (see `changes.fingerprint`) changed are written; an alert
+message doesn't change once it's sent, so after the first sync most of a response is
+skipped before it's even serialized.
+
+Alongside the full alert (as JSON), the store keeps indexed columns for what `richwx
+alerts query` filters on: the event, severity, when it was sent, took effect and expires,
+and a row per UGC zone (with its state) in `alert_zones`. The database is in WAL mode, so
+`alerts watch` can keep writing while queries read.
+"""
+import json
+import os
+import sqlite3
+import time
+
+from cli.utils.changes import fingerprint
+from cli.utils.records import AlertRecord
+
+SCHEMA_VERSION = 1
+
+# Most parameters SQLite takes in one statement is 999 on older builds.
+_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    event TEXT COLLATE NOCASE,
+    severity TEXT COLLATE NOCASE,
+    urgency TEXT COLLATE NOCASE,
+    message_type TEXT,
+    sent REAL,
+    effective REAL,
+    starts REAL, -- effective, or sent if it doesn't say.
+    expires REAL,
+    fetched_at REAL NOT NULL,
+    feature TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_event ON alerts (event);
+CREATE INDEX IF NOT EXISTS alerts_severity ON alerts (severity);
+CREATE INDEX IF NOT EXISTS alerts_sent ON alerts (sent);
+CREATE INDEX IF NOT EXISTS alerts_effective ON alerts (effective);
+CREATE INDEX IF NOT EXISTS alerts_starts ON alerts (starts);
+CREATE INDEX IF NOT EXISTS alerts_expires ON alerts (expires);
+
+CREATE TABLE IF NOT EXISTS alert_zones (
+    ugc TEXT NOT NULL COLLATE NOCASE,
+    state TEXT NOT NULL COLLATE NOCASE,
+    alert_id TEXT NOT NULL REFERENCES alerts (id) ON DELETE CASCADE,
+    PRIMARY KEY (ugc, alert_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS alert_zones_state ON alert_zones (state, alert_id);
+CREATE INDEX IF NOT EXISTS alert_zones_alert ON alert_zones (alert_id);
+"""
+
+
+def _epoch(value):
+    return value.timestamp() if value is not None else None
+
+
+def _chunks(items: list, size: int = _BATCH):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class AlertStore:
+    """The alert history database.
+
+    Args:
+        path (str): Where the database lives. It's created (with its directory) if need be.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+        self.connection = sqlite3.connect(path, timeout = 10, isolation_level = None) # transactions are explicit.
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL') # safe with WAL; only the last commit can be lost.
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM alerts').fetchone()[0]
+
+    def _stored(self, ids: list) -> dict:
+        stored = {}
+        for chunk in _chunks(ids):
+            marks = ','.join('?' * len(chunk))
+            stored.update(self.connection.execute(f'SELECT id, fingerprint FROM alerts WHERE id IN ({marks})', chunk))
+        return stored
+
+    def sync(self, records, fetched_at: float = None) -> int:
+        """Upserts alerts that are new or changed. Records should be heavy, for their zones.
+
+        Returns:
+            int: How many alerts were written.
+        """
+        records = {record.id: record for record in records}
+        if not records:
+            return 0
+        fetched_at = time.time() if fetched_at is None else fetched_at
+
+        stored = self._stored(list(records))
+        changed = []
+        for id, record in records.items():
+            digest = fingerprint(record)
+            if stored.get(id) != digest:
+                changed.append((record, digest))
+        if not changed:
+            return 0
+
+        rows = []
+        zones = []
+        for record, digest in changed:
+            sent, effective = _epoch(record.sent), _epoch(record.effective)
+            rows.append((record.id, digest, record.event, record.severity, record.urgency, record.message_type,
+                         sent, effective, effective if effective is not None else sent, _epoch(record.expires), fetched_at,
+                         json.dumps(record.to_feature(), separators = (',', ':'))))
+            zones.extend((ugc, ugc[:2], record.id) for ugc in dict.fromkeys(record.ugc))
+
+        with self.connection: # one transaction for the lot.
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'INSERT INTO alerts (id, fingerprint, event, severity, urgency, message_type, sent, effective, starts, '
+                'expires, fetched_at, feature) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET fingerprint = excluded.fingerprint, event = excluded.event, '
+                'severity = excluded.severity, urgency = excluded.urgency, message_type = excluded.message_type, '
+                'sent = excluded.sent, effective = excluded.effective, starts = excluded.starts, expires = excluded.expires, '
+                'fetched_at = excluded.fetched_at, feature = excluded.feature', rows)
+            # An update can drop zones, so the ones an alert had before are replaced, not added to.
+            self.connection.executemany('DELETE FROM alert_zones WHERE alert_id = ?',
+                                        [(record.id,) for record, _ in changed if record.id in stored])
+            self.connection.executemany('INSERT OR IGNORE INTO alert_zones (ugc, state, alert_id) VALUES (?, ?, ?)', zones)
+        return len(changed)
+
+    def query(self, since: float = None, until: float = None, states = (), zones = (), events = (), severities = (),
+              urgencies = (), limit: int = None) -> list:
+        """Gets the stored alerts that were in effect at some point between `since` and `until`
+        (unix times, either end open if None) and match every filter given, newest first.
+
+        An alert is in effect from when it takes effect (or was sent, if it doesn't say) until
+        it expires. Pass the same time as `since` and `until` for what was active at that moment.
+
+        Returns:
+            list: The matching `AlertRecord`s, heavy.
+        """
+        where = []
+        params = []
+        if until is not None:
+            where.append('starts <= ?')
+            params.append(until)
+        if since is not None:
+            where.append('expires >= ?')
+            params.append(since)
+
+        def any_of(column, values):
+            values = list(values)
+            if values:
+                where.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+
+        any_of('event', events)
+        any_of('severity', severities)
+        any_of('urgency', urgencies)
+        if states:
+            where.append(f"id IN (SELECT alert_id FROM alert_zones WHERE state IN ({','.join('?' * len(states))}))")
+            params.extend(states)
+        if zones:
+            where.append(f"id IN (SELECT alert_id FROM alert_zones WHERE ugc IN ({','.join('?' * len(zones))}))")
+            params.extend(zones)
+
+        sql = 'SELECT feature FROM alerts'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY sent DESC'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        return [AlertRecord.from_feature(json.loads(feature)) for feature, in self.connection.execute(sql, params)]
+
+    def span(self) -> tuple:
+        """The earliest and latest `fetched_at` in the store (None, None if it's empty)."""
+        return self.connection.execute('SELECT MIN(fetched_at), MAX(fetched_at) FROM alerts').fetchone()
@@ -0,0 +1,62 @@
+import importlib
+
+import click
+
+
+class LazyGroup(click.Group):
+    """A click group whose subcommands are only imported when they're invoked.
+
+    Subcommands are registered as `name -> (import path, short help)`, where the import
+    path is `module:attribute`. The short help is kept here so that `--help` can list
+    the commands without importing any of them.
+    """
+
+    def __init__(self, *args, lazy_commands: dict = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def add_lazy_command(self, name: str, import_path: str, short_help: str = '') -> None:
+        self.lazy_commands[name] = (import_path, short_help)
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, name):
+        if name in self.lazy_commands and name not in self.commands:
+            import_path = self.lazy_commands[name][0]
+            module_name, _, attribute = import_path.partition(':')
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, name)
+        return super().get_command(ctx, name)
+
+    def format_commands(self, ctx, formatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str(formatter.width)))
+            else:
+                rows.append((name, self.lazy_commands[name][1]))
+
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+class LazyObj(dict):
+    """The context object handed to every command, with its values built on first use.
+
+    Commands keep using `obj['console']` as before, but nothing is constructed until a
+    command actually asks for it.
+    """
+
+    def __init__(self, factories: dict):
+        super().__init__()
+        self.factories = factories
+
+    def __missing__(self, key):
+        value = self.factories[key]()
+        self[key] = value
+        return value
@@ -0,0 +1,541 @@
+"""Thin request layer over nwsapy for the endpoints richwx uses.
+
+nwsapy validates the parameters and builds the URL, but always goes to the network
+through `requests.get` and turns every alert into a heavy object. The functions here make
+the request themselves, so that responses can be cached and revalidated, and turn the
+JSON into `AlertRecord`s instead.
+
+Every request has a deadline, is hedged when it's slower than usual and goes through a
+circuit breaker (see `resilience`). When the API can't be reached, a cached response is
+served instead, however stale, and noted in `stale`.
+"""
+import hashlib
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from nwsapy import api_connector
+from nwsapy.services.validation import DataValidationChecker
+from nwsapy.services.url_constructor import construct_alert_url
+
+from cli.utils.records import AlertRecord
+from cli.utils.resilience import CircuitBreaker, Deadline, DeadlineExceeded, LatencyTracker, StaleLog, backoff
+from cli.utils.streaming import iter_features
+from cli.utils.timings import timings
+
+# Where the API lives. nwsapy always builds its URLs against the real one; set
+# RICHWX_API_URL to send richwx's requests somewhere else (i.e. the benchmark server).
+NWS_API_URL = 'https://api.weather.gov'
+API_URL = os.environ.get('RICHWX_API_URL', NWS_API_URL).rstrip('/')
+
+# Size of the chunks the body is read in when streaming.
+CHUNK_SIZE = 64 * 1024
+
+# Connections kept open to the API, shared by every worker thread.
+POOL_SIZE = 16
+
+# Responses worth trying again: throttled, or the API having a bad moment.
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+MAX_RETRIES = 3
+BACKOFF = 0.5 # seconds, the most the first retry waits; doubled after each one.
+MAX_BACKOFF = 8
+MAX_RETRY_AFTER = 30
+
+# How long a request may take, retries and hedges included, and each attempt's timeouts.
+DEADLINE = 20.0
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 15.0
+
+# Send a second copy of a request that's slower than 95% of the recent ones to the same endpoint.
+HEDGE = True
+
+# How old a cached response can be and still be served when the API can't be reached.
+STALE_IF_ERROR = 24 * 60 * 60
+
+# The warning a response served stale carries (RFC 7234).
+STALE_WARNING = '110 - "Response is Stale"'
+
+latencies = LatencyTracker()
+breaker = CircuitBreaker()
+stale = StaleLog()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure(deadline: float = None, hedge: bool = None, breaker_path: str = None) -> None:
+    """Changes the request policy for this process.
+
+    Args:
+        deadline (float, optional): Seconds a request may take in total.
+        hedge (bool, optional): Whether to hedge slow requests.
+        breaker_path (str, optional): File to keep the circuit breaker's state in, shared
+            between processes. The breaker (and what it knows) is kept if it's the same file.
+    """
+    global DEADLINE, HEDGE, breaker
+    if deadline is not None:
+        DEADLINE = deadline
+    if hedge is not None:
+        HEDGE = hedge
+    if breaker_path is not None and breaker.path != breaker_path:
+        breaker = CircuitBreaker(breaker.threshold, breaker.cooldown, breaker_path)
+
+
+def session() -> requests.Session:
+    """The keep-alive session every request goes through, so connections (and their TLS
+    handshakes) are reused between requests and threads."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                new = requests.Session()
+                adapter = HTTPAdapter(pool_connections = POOL_SIZE, pool_maxsize = POOL_SIZE)
+                new.mount('https://', adapter)
+                new.mount('http://', adapter)
+                _session = new
+    return _session
+
+
+def _headers() -> dict:
+    # Set by `api_connector.set_user_agent`, which every command calls before fetching.
+    return dict(api_connector._user_agent_to_d)
+
+
+def _retry_delay(response, attempt: int) -> float:
+    # The API sends Retry-After (in seconds) with a 429; otherwise back off exponentially, with jitter.
+    try:
+        return min(float(response.headers['Retry-After']), MAX_RETRY_AFTER)
+    except (KeyError, TypeError, ValueError):
+        return backoff(attempt, BACKOFF, MAX_BACKOFF)
+
+
+def _endpoint(url: str) -> str:
+    # What latencies are tracked by: the path, with alert IDs taken out, and whether there's a query.
+    parts = urlsplit(url)
+    path = parts.path
+    if path.startswith('/alerts/') and path.rstrip('/') != '/alerts/active':
+        path = '/alerts/{id}'
+    return path + ('?' if parts.query else '')
+
+
+def _send(url: str, headers: dict, stream: bool, deadline: Deadline) -> requests.Response:
+    # A single attempt, timed for the latency tracker.
+    start = time.monotonic()
+    with timings.phase('http'):
+        response = session().get(url, headers = headers, stream = stream,
+                                 timeout = deadline.timeout(CONNECT_TIMEOUT, READ_TIMEOUT))
+    latencies.observe(_endpoint(url), time.monotonic() - start)
+    return response
+
+
+class _Race:
+    """Copies of the same request, run on their own threads. The first response wins and the
+    others are closed when they come in."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._outcomes = []
+        self._pending = 0
+        self._done = False
+
+    def start(self, *args) -> None:
+        with self._cond:
+            self._pending += 1
+        threading.Thread(target = self._run, args = args, daemon = True).start()
+
+    def _run(self, *args) -> None:
+        try:
+            outcome = (_send(*args), None)
+        except Exception as err:
+            outcome = (None, err)
+        with self._cond:
+            self._pending -= 1
+            if self._done: # lost.
+                if outcome[0] is not None:
+                    outcome[0].close()
+                return
+            self._outcomes.append(outcome)
+            self._cond.notify_all()
+
+    def wait(self, timeout: float = None):
+        """The first response, or the last error once every copy failed. None if there's
+        neither within `timeout` seconds."""
+        end = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                for response, error in self._outcomes:
+                    if error is None:
+                        self._done = True
+                        return (response, None)
+                if self._outcomes and self._pending == 0:
+                    self._done = True
+                    return self._outcomes[-1]
+                remaining = end - time.monotonic() if end is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def abandon(self) -> None:
+        with self._cond:
+            self._done = True
+
+
+def _hedged(url: str, headers: dict, limiter, stream: bool, deadline: Deadline) -> requests.Response:
+    """One attempt at a request. If it's still waiting after the endpoint's usual latency, a
+    second copy is sent, and whichever answers first is used."""
+    delay = latencies.hedge_delay(_endpoint(url))
+    remaining = deadline.remaining()
+    if not HEDGE or (remaining is not None and delay >= remaining):
+        return _send(url, headers, stream, deadline)
+
+    race = _Race()
+    race.start(url, headers, stream, deadline)
+    outcome = race.wait(delay)
+    if outcome is None:
+        if limiter is not None:
+            limiter.wait()
+        timings.count('hedges')
+        race.start(url, headers, stream, deadline)
+        outcome = race.wait(deadline.remaining())
+        if outcome is None:
+            race.abandon()
+            raise DeadlineExceeded(f'no response within {DEADLINE:g}s')
+
+    response, error = outcome
+    if error is not None:
+        raise error
+    return response
+
+
+def _settle(response) -> None:
+    # Tells the circuit breaker how it went. Being throttled says nothing about the API's
+    # health, but it still ends the trial request, if this was it.
+    if response.status_code >= 500:
+        breaker.failure()
+    elif response.status_code == 429:
+        breaker.release()
+    else:
+        breaker.success()
+
+
+def _get(url: str, headers: dict, limiter = None, stream: bool = False) -> requests.Response:
+    """GETs a URL through the shared session, within DEADLINE seconds.
+
+    Throttled and 5xx responses, connection errors and timeouts are retried with jittered
+    backoff as long as there's time left. Slow attempts are hedged (see `_hedged`). The
+    limiter (if any) is waited on before every attempt, retries and hedges included.
+
+    Raises:
+        CircuitOpen: If the API has been failing and the circuit breaker is open.
+        Exception: If there was no response in the end.
+    """
+    breaker.check()
+    try:
+        return _attempts(url, headers, limiter, stream)
+    except BaseException:
+        breaker.release() # whatever went wrong, a trial request is over.
+        raise
+
+
+def _attempts(url: str, headers: dict, limiter, stream: bool) -> requests.Response:
+    # `_get`, past the circuit breaker.
+    deadline = Deadline(DEADLINE)
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter is not None:
+            limiter.wait()
+
+        try:
+            response, error = _hedged(url, headers, limiter, stream, deadline), None
+        except Exception as err:
+            response, error = None, err
+
+        if response is not None:
+            timings.count('requests')
+            if not stream:
+                timings.count('http_bytes', len(response.content))
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                _settle(response)
+                return response
+            delay = _retry_delay(response, attempt)
+        else:
+            delay = backoff(attempt, BACKOFF, MAX_BACKOFF)
+
+        remaining = deadline.remaining()
+        if attempt == MAX_RETRIES or (remaining is not None and delay >= remaining):
+            if response is not None: # no time to try again; it's the best there is.
+                _settle(response)
+                return response
+            breaker.failure()
+            raise Exception(f'Other error occurred: {error}')
+
+        timings.count('retries')
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+
+
+def _stale(url: str, entry, reason) -> CaseInsensitiveDict:
+    """Notes that `entry` is being served in place of a failed request, and gives the headers
+    to serve it with (marked stale). None if there's no entry, or it's too old to serve."""
+    if entry is None:
+        return None
+    age = time.time() - entry.stored_at
+    if age > STALE_IF_ERROR:
+        return None
+    stale.add(url, age, str(reason))
+    timings.count('stale_responses')
+    headers = CaseInsensitiveDict(entry.headers)
+    headers['Warning'] = STALE_WARNING
+    return headers
+
+
+def request(url: str, cache = None, max_age: float = None, limiter = None) -> tuple:
+    """Requests a URL from the API, going through the response cache when one is given.
+
+    A fresh cached response is returned without touching the network. A stale one is
+    revalidated with `If-None-Match`/`If-Modified-Since`, and reused if the server answers
+    304 Not Modified.
+
+    If the API can't be reached (or answers with a 5xx) the cached response is returned
+    anyway, up to STALE_IF_ERROR seconds old, with a `Warning: 110` header and a note in `stale`.
+
+    Args:
+        url (str): The URL to request.
+        cache (ResponseCache, optional): The cache to use. None skips caching altogether.
+        max_age (float, optional): Reuse cached responses up to this many seconds old,
+            regardless of what the server's headers say.
+        limiter (RateLimiter, optional): Waited on before going to the network (and before each retry).
+
+    Returns:
+        tuple: The JSON body and the response headers, the same as nwsapy's `request_from_api`.
+    """
+    with timings.phase('cache'):
+        entry = cache.get(url) if cache is not None else None
+        if entry is not None and entry.is_fresh(max_age):
+            timings.count('cache_hits')
+            return (entry.json(), entry.headers)
+
+    headers = _headers()
+    if entry is not None:
+        headers.update(entry.validators())
+
+    try:
+        response = _get(url, headers, limiter)
+    except Exception as err:
+        stale_headers = _stale(url, entry, err)
+        if stale_headers is None:
+            raise
+        with timings.phase('cache'):
+            return (entry.json(), stale_headers)
+
+    if response.status_code >= 500 and entry is not None:
+        stale_headers = _stale(url, entry, f'{response.status_code} from the API')
+        if stale_headers is not None:
+            response.close()
+            with timings.phase('cache'):
+                return (entry.json(), stale_headers)
+
+    if response.status_code == 304 and entry is not None:
+        with timings.phase('cache'):
+            entry = cache.refresh(entry, response.headers)
+            return (entry.json(), entry.headers)
+
+    # Errors come back with a JSON body describing them, which nwsapy knows how to handle.
+    # Don't keep them around though.
+    if cache is not None and response.ok:
+        with timings.phase('cache'):
+            cache.put(url, response.headers, response.content)
+
+    try:
+        with timings.phase('decode'):
+            values = response.json()
+    except ValueError:
+        # i.e. a 503 from a proxy in front of the API, with an HTML (or empty) body.
+        raise RuntimeError(f'{response.status_code} from the API.')
+    return (values, dict(response.headers))
+
+
+def _alerts_url(kwargs: dict) -> str:
+    # Without any parameters nwsapy leaves a dangling '?' on the end; that's every active
+    # alert in the country.
+    url = construct_alert_url(kwargs).rstrip('?')
+    return API_URL + url[len(NWS_API_URL):] if url.startswith(NWS_API_URL) else url
+
+
+def _raise_for_api_error(values: dict) -> None:
+    # The API describes errors in a JSON body with a correlationId (nwsapy checks the same).
+    if 'correlationId' in values:
+        raise RuntimeError(values.get('title') or 'Bad response from the API.')
+
+
+def get_active_alerts(cache = None, max_age: float = None, limiter = None, heavy: bool = False, **kwargs) -> list:
+    """Gets the active alerts as a list of `AlertRecord`s. See `request` for the caching.
+
+    Takes the same keyword arguments as `api_connector.get_active_alerts`, validated the same way.
+
+    Args:
+        heavy (bool, optional): Keep the heavy fields (description, zones, geometry, ...) on each record.
+
+    Raises:
+        RuntimeError: If the API answered with an error.
+    """
+    DataValidationChecker().check_active_alerts_dvt(kwargs)
+    url = _alerts_url(kwargs)
+    values, _ = request(url, cache, max_age, limiter)
+    _raise_for_api_error(values)
+    with timings.phase('decode'):
+        return [AlertRecord.from_feature(feature, heavy = heavy) for feature in values['features']]
+
+
+def get_active_alerts_if_changed(validators: dict = None, digest: str = None, limiter = None, heavy: bool = False,
+                                 **kwargs) -> tuple:
+    """Gets the active alerts, unless they're the same as the last time. Made for polling.
+
+    The request carries `validators` (see `cache.validators`) from the last response, so an
+    unchanged collection comes back as an empty 304 and nothing is decoded. If the server
+    answers with the whole body anyway, it's compared with `digest` before being decoded.
+    The response cache isn't used: the caller keeps the last response itself.
+
+    Raises:
+        RuntimeError: If the API answered with an error.
+
+    Returns:
+        tuple: The list of `AlertRecord`s (None if nothing changed), the response headers and
+            the body's digest (to pass back in next time).
+    """
+    DataValidationChecker().check_active_alerts_dvt(kwargs)
+    headers = _headers()
+    headers.update(validators or {})
+    response = _get(_alerts_url(kwargs), headers, limiter)
+
+    if response.status_code == 304:
+        return (None, response.headers, digest)
+
+    body = response.content
+    new_digest = hashlib.sha1(body).hexdigest()
+    if response.ok and new_digest == digest:
+        return (None, response.headers, digest)
+
+    try:
+        with timings.phase('decode'):
+            values = response.json()
+    except ValueError:
+        raise RuntimeError(f'{response.status_code} from the API.')
+    _raise_for_api_error(values)
+    with timings.phase('decode'):
+        records = [AlertRecord.from_feature(feature, heavy = heavy) for feature in values['features']]
+    return (records, response.headers, new_digest)
+
+
+def get_alert_by_id(id: str, cache = None, max_age: float = None, limiter = None) -> AlertRecord:
+    """Gets a single alert (with all of its fields) as an `AlertRecord`. See `request` for the caching.
+
+    Raises:
+        RuntimeError: If the API answered with an error (i.e. the ID doesn't exist).
+    """
+    url = f'{API_URL}/alerts/{id}'
+    values, _ = request(url, cache, max_age, limiter)
+    _raise_for_api_error(values)
+    return AlertRecord.from_feature(values)
+
+
+def _body(response):
+    # The body as it comes off the socket, timed as `http`.
+    for chunk in timings.iterate('http', response.iter_content(CHUNK_SIZE)):
+        timings.count('http_bytes', len(chunk))
+        yield chunk
+
+
+def _cached_body(entry):
+    return timings.iterate('cache', entry.iter_body(CHUNK_SIZE))
+
+
+def _decode(chunks):
+    # Time spent waiting on `chunks` is charged to their own phase, not to decoding.
+    return timings.iterate('decode', iter_features(chunks))
+
+
+def stream(url: str, cache = None, max_age: float = None, limiter = None):
+    """Requests a FeatureCollection and yields its features as they're decoded.
+
+    Works like `request` (stale responses included), but the body is never held in memory
+    as a whole: it's parsed straight off the socket (or the cache file), and written to the
+    cache as it arrives.
+
+    Raises:
+        RuntimeError: If the API answered with an error.
+    """
+    with timings.phase('cache'):
+        entry = cache.get(url) if cache is not None else None
+    if entry is not None and entry.is_fresh(max_age):
+        timings.count('cache_hits')
+        yield from _decode(_cached_body(entry))
+        return
+
+    headers = _headers()
+    if entry is not None:
+        headers.update(entry.validators())
+
+    try:
+        response = _get(url, headers, limiter, stream = True)
+    except Exception as err:
+        if _stale(url, entry, err) is None:
+            raise
+        yield from _decode(_cached_body(entry))
+        return
+
+    if response.status_code >= 500 and _stale(url, entry, f'{response.status_code} from the API') is not None:
+        response.close()
+        yield from _decode(_cached_body(entry))
+        return
+
+    with response:
+        if response.status_code == 304 and entry is not None:
+            with timings.phase('cache'):
+                entry = cache.refresh(entry, response.headers)
+            yield from _decode(_cached_body(entry))
+            return
+
+        if not response.ok:
+            try:
+                title = response.json().get('title')
+            except (ValueError, AttributeError):
+                title = None
+            raise RuntimeError(title or f'{response.status_code} from the API.')
+
+        if cache is None:
+            yield from _decode(_body(response))
+            return
+
+        writer = cache.writer(url, response.headers)
+
+        def tee():
+            for chunk in _body(response):
+                writer.write(chunk)
+                yield chunk
+
+        body = tee()
+        try:
+            yield from _decode(body)
+            # Anything after the features (i.e. the closing brace) still needs to be stored.
+            for _ in body:
+                pass
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+
+
+def stream_active_alerts(cache = None, max_age: float = None, limiter = None, **kwargs):
+    """Streaming version of `get_active_alerts`. Yields the raw GeoJSON features as they're decoded.
+
+    Without any keyword arguments, this is every active alert in the country.
+    """
+    DataValidationChecker().check_active_alerts_dvt(kwargs)
+    url = _alerts_url(kwargs)
+    yield from stream(url, cache, max_age, limiter)
@@ -0,0 +1,78 @@
+"""Machine-readable output for the alert list.
+
+Piping a Rich table into a script means laying it out for a terminal only for the script to
+scrape the box drawing back off. These writers skip Rich altogether (no Table, markup or
+emoji processing) and write each alert as soon as they're given it, so they can sit at the
+end of a stream of records.
+"""
+import csv
+import json
+
+FORMATS = ('json', 'ndjson', 'csv', 'tsv')
+
+# The columns of the alert list, plus the full ID, named as the API names them.
+FIELDS = ('id', 'event', 'areaDesc', 'sent', 'expires', 'senderName', 'severity', 'urgency')
+
+# The same for a list of changes (see `changes.Change`), with what changed in front.
+CHANGE_FIELDS = ('change', 'eventId', 'previousId') + FIELDS
+
+_encode = json.JSONEncoder(ensure_ascii = False, separators = (',', ':')).encode
+
+
+def _row(record) -> tuple:
+    # The ISO strings as the API sent them; no need to parse them just to print them again.
+    return (record.id, record.event, record.area_desc, record._sent, record._expires, record.sender_name,
+            record.severity, record.urgency)
+
+
+def _change_row(change) -> tuple:
+    record = change.record
+    if record is None: # it ended, so only what was remembered about it is left.
+        return (change.kind, change.event_id, change.previous_id, change.previous_id, change.event, change.area_desc,
+                None, None, None, None, None)
+    return (change.kind, change.event_id, change.previous_id) + _row(record)
+
+
+def write_records(records, format: str, out, fields: tuple = FIELDS, row = _row) -> int:
+    """Writes alerts to a text stream as they're produced.
+
+    Args:
+        records (iterable): The `AlertRecord`s to write. Light records are enough.
+        format (str): One of `FORMATS`. `json` is a single array, `ndjson` one object per
+            line, and `csv`/`tsv` have a header row.
+        out (file): Where to write them, i.e. stdout.
+        fields (tuple, optional): The names of the values `row` gives back.
+        row (callable, optional): Turns each record into a tuple of values.
+
+    Returns:
+        int: The number of alerts written.
+    """
+    count = 0
+    if format in ('csv', 'tsv'):
+        writer = csv.writer(out, delimiter = ',' if format == 'csv' else '\t', lineterminator = '\n')
+        writer.writerow(fields)
+        for record in records:
+            writer.writerow(row(record))
+            count += 1
+    elif format == 'ndjson':
+        write = out.write
+        for record in records:
+            write(_encode(dict(zip(fields, row(record)))) + '\n')
+            count += 1
+    elif format == 'json':
+        write = out.write
+        write('[')
+        for record in records:
+            write((',\n' if count else '\n') + _encode(dict(zip(fields, row(record)))))
+            count += 1
+        write('\n]\n' if count else ']\n')
+    else:
+        raise ValueError(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}.")
+
+    out.flush()
+    return count
+
+
+def write_changes(changes, format: str, out) -> int:
+    """Writes `Change`s the same way `write_records` writes alerts, with `CHANGE_FIELDS` as the columns."""
+    return write_records(changes, format, out, CHANGE_FIELDS, _change_row)
@@ -0,0 +1,341 @@
+"""A compact, binary snapshot of alerts that's read through `mmap` (`richwx alerts export`).
+
+The JSON snapshot has to be parsed from end to end, and every alert built, before a single
+row can be shown. This format is laid out so that nothing is read until it's asked for:
+
+    header         magic, version, byte order, number of alerts, when they were fetched
+    section table  name, offset and length of each section (each one 8 byte aligned)
+    strings        a string table (offsets + UTF-8) shared by events, senders, severities,
+                   urgencies, certainties, statuses, message types and UGC zones
+    code columns   one uint32 per alert, indexing the string table (NONE for no value)
+    expires.at     one float64 (unix time) per alert, for filtering by expiry
+    zones          each alert's zones as string table codes, with an offsets column
+    text columns   one UTF-8 blob per field (IDs, areas, times, description, instruction,
+                   geometry as JSON, ...), with a uint64 offsets column to find each value
+
+Opening a file maps it and reads the section table, which takes microseconds whatever its
+size. Filters run over the code and expiry columns without decoding any text, and a record
+only decodes the fields it's built with (`heavy = True` for the long ones). The pages that
+are never touched are never read from disk, so resident memory stays small.
+
+Columns are written in the machine's byte order, which the header records; a file from a
+machine with the other byte order is refused rather than misread.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime
+
+from cli.utils.records import AlertRecord
+from cli.utils.timings import timings
+
+MAGIC = b'RWXALRT1'
+FORMAT_VERSION = 1
+
+# magic, version, byte order (0 little, 1 big), number of alerts, fetched at, number of sections.
+_HEADER = struct.Struct('<8sHHIdI')
+# name, offset, length.
+_SECTION = struct.Struct('<16sQQ')
+
+# Code for "no value" in the code columns.
+NONE = 0xFFFFFFFF
+
+# AlertRecord attribute -> code column.
+CODE_COLUMNS = ('event', 'sender_name', 'severity', 'urgency', 'certainty', 'status', 'message_type')
+
+# Text columns: the light ones are decoded for every record, the heavy ones (and the JSON
+# ones) only with `heavy = True`.
+LIGHT_TEXT = ('id', 'area_desc', 'sent', 'expires', 'effective', 'onset', 'ends', 'references.ids')
+HEAVY_TEXT = ('headline', 'description', 'instruction')
+HEAVY_JSON = ('affectedZones', 'geocode', 'references', 'parameters', 'geometry')
+
+_LITTLE = sys.byteorder == 'little'
+
+
+def _timestamp(value):
+    return datetime.fromisoformat(value).timestamp() if value else float('nan')
+
+
+class _Strings:
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value) -> int:
+        if value is None:
+            return NONE
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _Text:
+    # One text column while it's being written.
+    def __init__(self):
+        self.offsets = array('Q', [0])
+        self.blob = bytearray()
+
+    def add(self, value) -> None:
+        if value:
+            self.blob += value.encode('utf-8')
+        self.offsets.append(len(self.blob))
+
+
+def _columns(records) -> tuple:
+    strings = _Strings()
+    codes = {name: array('I') for name in CODE_COLUMNS}
+    texts = {name: _Text() for name in LIGHT_TEXT + HEAVY_TEXT + HEAVY_JSON}
+    expires = array('d')
+    zone_offsets = array('I', [0])
+    zones = array('I')
+    dumps = json.JSONEncoder(ensure_ascii = False, separators = (',', ':')).encode
+
+    count = 0
+    for record in records:
+        count += 1
+        for name in CODE_COLUMNS:
+            codes[name].append(strings.code(getattr(record, name)))
+        for name in ('id', 'area_desc'):
+            texts[name].add(getattr(record, name))
+        for name in ('sent', 'expires', 'effective', 'onset', 'ends'):
+            texts[name].add(getattr(record, '_' + name))
+        texts['references.ids'].add('\n'.join(record.reference_ids))
+        expires.append(_timestamp(record._expires))
+
+        for name in HEAVY_TEXT:
+            texts[name].add(record._heavy_field(name))
+        for name in HEAVY_JSON:
+            value = record._geometry if name == 'geometry' else record._heavy_field(name)
+            texts[name].add(dumps(value) if value is not None else None)
+
+        zones.extend(strings.code(code) for code in dict.fromkeys(record.ugc))
+        zone_offsets.append(len(zones))
+
+    table = _Text()
+    for value in strings.values:
+        table.add(value)
+
+    sections = [('strings.o', table.offsets), ('strings', table.blob), ('expires.at', expires),
+                ('zones.o', zone_offsets), ('zones', zones)]
+    sections += [(name, column) for name, column in codes.items()]
+    for name, text in texts.items():
+        sections += [(name + '.o', text.offsets), (name, text.blob)]
+    return count, sections
+
+
+def write(records, path: str, fetched_at: float) -> int:
+    """Writes alerts (heavy `AlertRecord`s, for their zones and text) to `path`, atomically.
+
+    Returns:
+        int: The number of alerts written.
+    """
+    with timings.phase('snapshot'):
+        count, sections = _columns(records)
+
+        offset = _HEADER.size + _SECTION.size * len(sections)
+        table = []
+        blobs = []
+        for name, data in sections:
+            data = data.tobytes() if isinstance(data, array) else bytes(data)
+            offset += -offset % 8
+            table.append(_SECTION.pack(name.encode('ascii'), offset, len(data)))
+            blobs.append((offset, data))
+            offset += len(data)
+
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok = True)
+        fd, tmp = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0 if _LITTLE else 1, count, fetched_at, len(sections)))
+                f.write(b''.join(table))
+                for offset, data in blobs:
+                    f.write(b'\0' * (offset - f.tell()))
+                    f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    return count
+
+
+class PackedSnapshot:
+    """A snapshot written by `write`, mapped into memory.
+
+    Use it as a context manager (or call `close`) so the file is unmapped when you're done.
+    Records handed out stay usable after that; they don't point into the file.
+
+    Raises:
+        ValueError: If the file isn't a snapshot, is from another version, or has the other byte order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._views = []
+        with timings.phase('snapshot'):
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            try:
+                self._open()
+            except Exception:
+                self.close()
+                raise
+
+    def _open(self) -> None:
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{self.path} is not an alert snapshot.")
+        magic, version, order, self.count, self.fetched_at, n_sections = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not an alert snapshot.")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is a version {version} snapshot; this richwx reads version {FORMAT_VERSION}.")
+        if order != (0 if _LITTLE else 1):
+            raise ValueError(f"{self.path} was written on a machine with a different byte order.")
+
+        self._view = memoryview(self._map)
+        self._views.append(self._view)
+        self._sections = {}
+        for index in range(n_sections):
+            name, offset, length = _SECTION.unpack_from(self._map, _HEADER.size + index * _SECTION.size)
+            self._sections[name.rstrip(b'\0').decode('ascii')] = (offset, length)
+            if offset + length > len(self._map):
+                raise ValueError(f"{self.path} is cut short.")
+
+        self._string_offsets = self._array('strings.o', 'Q')
+        self._string_blob = self._bytes('strings')
+        self._strings = {} # code -> str, decoded as they're asked for.
+        self._codes = {name: self._array(name, 'I') for name in CODE_COLUMNS}
+        self._expires = self._array('expires.at', 'd')
+        self._zone_offsets = self._array('zones.o', 'I')
+        self._zones = self._array('zones', 'I')
+        self._zone_code_set = None
+        self._text = {name: (self._array(name + '.o', 'Q'), self._bytes(name))
+                      for name in LIGHT_TEXT + HEAVY_TEXT + HEAVY_JSON}
+
+    def _bytes(self, name: str) -> memoryview:
+        if name not in self._sections:
+            raise ValueError(f"{self.path} is missing its {name} section.")
+        offset, length = self._sections[name]
+        view = self._view[offset:offset + length]
+        self._views.append(view)
+        return view
+
+    def _array(self, name: str, typecode: str) -> memoryview:
+        view = self._bytes(name).cast(typecode)
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        if self._map.closed:
+            return
+        for view in reversed(self._views): # the map can't close while anything still points into it.
+            view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def string(self, code: int):
+        if code == NONE:
+            return None
+        value = self._strings.get(code)
+        if value is None:
+            offsets = self._string_offsets
+            value = self._strings[code] = str(self._string_blob[offsets[code]:offsets[code + 1]], 'utf-8')
+        return value
+
+    def _value(self, name: str, position: int):
+        offsets, blob = self._text[name]
+        start, end = offsets[position], offsets[position + 1]
+        return str(blob[start:end], 'utf-8') if end > start else None
+
+    def _json(self, name: str, position: int):
+        value = self._value(name, position)
+        return json.loads(value) if value is not None else None
+
+    def zones(self, position: int) -> list:
+        """The UGC zones of one alert, without decoding anything else."""
+        zones = self._zones
+        return [self.string(zones[index]) for index in range(self._zone_offsets[position], self._zone_offsets[position + 1])]
+
+    def columns(self) -> dict:
+        """The code columns, `expires.at`, `zones` and `zones.o` as they are in the file (memoryviews),
+        for passes over every alert at once (see `summary`). Their values are codes for `string`."""
+        columns = dict(self._codes)
+        columns.update({'expires.at': self._expires, 'zones': self._zones, 'zones.o': self._zone_offsets})
+        return columns
+
+    def record(self, position: int, heavy: bool = False) -> AlertRecord:
+        """Builds the alert at `position`. Only the light fields are decoded unless `heavy`."""
+        strings = {name: self.string(self._codes[name][position]) for name in CODE_COLUMNS}
+        value = self._value
+        references = value('references.ids', position)
+        record = AlertRecord(id = value('id', position), area_desc = value('area_desc', position),
+                             sent = value('sent', position), expires = value('expires', position),
+                             effective = value('effective', position), onset = value('onset', position),
+                             ends = value('ends', position), reference_ids = tuple(references.split('\n')) if references else (),
+                             **strings)
+        if heavy:
+            record._heavy = {name: value(name, position) for name in HEAVY_TEXT}
+            record._heavy.update({name: self._json(name, position) for name in HEAVY_JSON if name != 'geometry'})
+            record._geometry = self._json('geometry', position)
+        return record
+
+    def records(self, positions = None, heavy: bool = False) -> list:
+        """Builds the alerts at `positions` (every one by default), in that order."""
+        positions = range(self.count) if positions is None else positions
+        with timings.phase('snapshot'):
+            return [self.record(position, heavy) for position in positions]
+
+    def _codes_where(self, codes, test) -> set:
+        # The codes whose strings pass the test.
+        return {code for code in codes if test(self.string(code))}
+
+    def _zone_codes(self) -> set:
+        if self._zone_code_set is None:
+            self._zone_code_set = set(self._zones)
+        return self._zone_code_set
+
+    def query(self, filters) -> list:
+        """The positions of the alerts matching an `AlertFilter`, worked out from the code,
+        zone and expiry columns without decoding any text.
+
+        Returns:
+            list: The positions, in the order the alerts were written.
+        """
+        with timings.phase('snapshot'):
+            positions = range(self.count)
+            for field, values in filters.values.items():
+                if field in ('event', 'severity', 'urgency'):
+                    codes = self._codes_where(range(len(self._string_offsets) - 1),
+                                              lambda string: string.lower() in values)
+                    column = self._codes[field]
+                    positions = [position for position in positions if column[position] in codes]
+                else:
+                    length = 2 if field == 'state' else None
+                    codes = self._codes_where(self._zone_codes(), lambda string: string[:length].upper() in values)
+                    zones, offsets = self._zones, self._zone_offsets
+                    positions = [position for position in positions
+                                 if any(zones[index] in codes for index in range(offsets[position], offsets[position + 1]))]
+
+            after, before = filters.expires_after, filters.expires_before
+            if after is not None or before is not None:
+                low = after.timestamp() if after is not None else float('-inf')
+                high = before.timestamp() if before is not None else float('inf')
+                expires = self._expires
+                positions = [position for position in positions if low <= expires[position] <= high]
+            return list(positions)
@@ -0,0 +1,208 @@
+"""Compact in-memory model for alerts.
+
+nwsapy turns every alert into an object holding about 35 attributes, a dictionary copy
+of them and a pandas Series, most of which the alert list never looks at. `AlertRecord`
+keeps the handful of fields the commands use in `__slots__`, with the event and sender
+strings interned (there are only a few hundred distinct ones nationwide). The heavy
+properties (`HEAVY_FIELDS`: the text, zones, references, ...) are either kept as they came
+in the feature, for the commands that show them, or dropped. What's derived from the fields
+(datetimes, zone IDs, polygons) is worked out on first access and kept.
+
+To keep a whole collection column by column, see `packed`.
+"""
+import sys
+from datetime import datetime
+
+# Properties that are kept (as-is) only when a record is built with `heavy = True`.
+HEAVY_FIELDS = ('headline', 'description', 'instruction', 'affectedZones', 'geocode', 'references', 'parameters')
+
+# The heavy ones `richwx alerts id` shows (the rest of what it shows is light).
+DETAIL_FIELDS = ('headline', 'description', 'instruction')
+
+_intern = sys.intern
+
+
+def _intern_or_none(value):
+    return _intern(value) if isinstance(value, str) else value
+
+
+def _reference_ids(references) -> tuple:
+    # Each reference is {'@id': URL, 'identifier': ID, 'sender': ..., 'sent': ...}.
+    if not references:
+        return ()
+    return tuple(ref.get('identifier') or ref.get('@id', '').rsplit('/', 1)[-1] for ref in references)
+
+
+def _to_datetime(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+# What every NWS alert ID starts with. The alert list leaves it off.
+ID_PREFIX = 'urn:oid:2.49.0.1.840.0.'
+
+
+def format_id(id: str) -> str:
+    """An alert's ID as the alert list shows it, without `ID_PREFIX`."""
+    return id.replace(ID_PREFIX, '')
+
+
+def full_id(id: str) -> str:
+    """Turns what the alert list shows (or a full ID, or the alert's URL) into the full ID."""
+    id = id.strip().rsplit('/', 1)[-1]
+    return id if id.startswith('urn:oid:') else f'{ID_PREFIX}{id}'
+
+
+class AlertRecord:
+    """A single alert.
+
+    The light fields (including the IDs of the messages it references) are always there. The heavy ones (`headline`, `description`,
+    `instruction`, zones, geocodes, references, parameters and the geometry) are only
+    kept if the record was built with `heavy = True` (or, for some of them, with their
+    names), and are None otherwise.
+
+    Times are kept as the ISO strings the API sends, and turned into datetimes the first
+    time they're asked for.
+    """
+
+    __slots__ = ('id', 'event', 'sender_name', 'area_desc', 'severity', 'urgency', 'certainty', 'status',
+                 'message_type', 'reference_ids', '_sent', '_expires', '_effective', '_onset', '_ends', '_heavy',
+                 '_geometry', '_cache')
+
+    def __init__(self, id: str, event: str, sender_name: str, area_desc: str, sent: str = None, expires: str = None,
+                 severity: str = None, urgency: str = None, certainty: str = None, status: str = None,
+                 message_type: str = None, effective: str = None, onset: str = None, ends: str = None,
+                 heavy: dict = None, geometry: dict = None, reference_ids: tuple = ()):
+        self.id = id
+        self.event = _intern_or_none(event)
+        self.sender_name = _intern_or_none(sender_name)
+        self.area_desc = area_desc
+        self.severity = _intern_or_none(severity)
+        self.urgency = _intern_or_none(urgency)
+        self.certainty = _intern_or_none(certainty)
+        self.status = _intern_or_none(status)
+        self.message_type = _intern_or_none(message_type)
+        self.reference_ids = reference_ids
+        self._sent = sent
+        self._expires = expires
+        self._effective = effective
+        self._onset = onset
+        self._ends = ends
+        self._heavy = heavy
+        self._geometry = geometry
+        self._cache = None
+
+    @classmethod
+    def from_feature(cls, feature: dict, heavy: bool = True) -> 'AlertRecord':
+        """Builds a record from a GeoJSON feature (or a bare alert, as `/alerts/{id}` returns).
+
+        Args:
+            feature (dict): The feature, as decoded from the API.
+            heavy (bool or tuple, optional): Keep the heavy fields. The alert list doesn't need
+                them. A tuple of names (i.e. `DETAIL_FIELDS`) keeps just those, without the geometry.
+        """
+        properties = feature.get('properties', feature)
+        fields = HEAVY_FIELDS if heavy is True else (heavy or ())
+        return cls(
+            id = properties['id'],
+            event = properties.get('event'),
+            sender_name = properties.get('senderName'),
+            area_desc = properties.get('areaDesc'),
+            sent = properties.get('sent'),
+            expires = properties.get('expires'),
+            severity = properties.get('severity'),
+            urgency = properties.get('urgency'),
+            certainty = properties.get('certainty'),
+            status = properties.get('status'),
+            message_type = properties.get('messageType'),
+            effective = properties.get('effective'),
+            onset = properties.get('onset'),
+            ends = properties.get('ends'),
+            heavy = {field: properties.get(field) for field in fields} if fields else None,
+            geometry = feature.get('geometry') if heavy is True else None,
+            reference_ids = _reference_ids(properties.get('references')),
+        )
+
+    def to_feature(self) -> dict:
+        """Turns the record back into a (trimmed down) GeoJSON feature. `from_feature` reverses it."""
+        properties = {
+            'id': self.id, 'event': self.event, 'senderName': self.sender_name, 'areaDesc': self.area_desc,
+            'sent': self._sent, 'expires': self._expires, 'effective': self._effective, 'onset': self._onset,
+            'ends': self._ends, 'severity': self.severity, 'urgency': self.urgency, 'certainty': self.certainty,
+            'status': self.status, 'messageType': self.message_type,
+        }
+        if self._heavy is not None:
+            properties.update(self._heavy)
+        else:
+            properties['references'] = [{'identifier': id} for id in self.reference_ids]
+        return {'properties': properties, 'geometry': self._geometry}
+
+    def _cached(self, key, build):
+        if self._cache is None:
+            self._cache = {}
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def _time(self, name):
+        return self._cached(name, lambda: _to_datetime(getattr(self, '_' + name)))
+
+    sent = property(lambda self: self._time('sent'), doc = "When the alert was sent.")
+    expires = property(lambda self: self._time('expires'), doc = "When the alert expires.")
+    effective = property(lambda self: self._time('effective'), doc = "When the alert takes effect.")
+    onset = property(lambda self: self._time('onset'), doc = "When the hazard is expected to begin.")
+    ends = property(lambda self: self._time('ends'), doc = "When the hazard is expected to end.")
+
+    def _heavy_field(self, name):
+        return self._heavy.get(name) if self._heavy is not None else None
+
+    headline = property(lambda self: self._heavy_field('headline'))
+    description = property(lambda self: self._heavy_field('description'))
+    instruction = property(lambda self: self._heavy_field('instruction'))
+    geocode = property(lambda self: self._heavy_field('geocode'))
+    references = property(lambda self: self._heavy_field('references'))
+    parameters = property(lambda self: self._heavy_field('parameters'))
+
+    @property
+    def affected_zones(self) -> list:
+        """The IDs of the affected zones (i.e. TXZ103), without the URL in front."""
+        return self._cached('affected_zones',
+                            lambda: [zone.rsplit('/', 1)[-1] for zone in (self._heavy_field('affectedZones') or [])])
+
+    @property
+    def ugc(self) -> list:
+        """The UGC codes from the geocode, falling back to the affected zones."""
+        return self._cached('ugc', lambda: list((self.geocode or {}).get('UGC') or self.affected_zones))
+
+    @property
+    def polygons(self) -> list:
+        """The outer ring of each polygon in the alert's geometry, as lists of (lon, lat)."""
+        def build():
+            geometry = self._geometry
+            if not geometry:
+                return []
+            if geometry['type'] == 'Polygon':
+                return [[tuple(point) for point in geometry['coordinates'][0]]]
+            if geometry['type'] == 'MultiPolygon':
+                return [[tuple(point) for point in polygon[0]] for polygon in geometry['coordinates']]
+            return []
+        return self._cached('polygons', build)
+
+    @property
+    def has_heavy_fields(self) -> bool:
+        """Whether it was built with every heavy field."""
+        return self._heavy is not None and len(self._heavy) >= len(HEAVY_FIELDS)
+
+    @property
+    def has_details(self) -> bool:
+        """Whether it has what `richwx alerts id` shows (`DETAIL_FIELDS`)."""
+        return self._heavy is not None and all(field in self._heavy for field in DETAIL_FIELDS)
+
+    def __repr__(self):
+        return f"AlertRecord({self.id!r}, {self.event!r}, {self.sender_name!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, AlertRecord) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
@@ -0,0 +1,227 @@
+"""Draws alerts with Rich, the way the `richwx alerts` commands do.
+
+Each function either builds the renderable (a `Table`) or prints to the `Console` it's
+handed, so a program using `AlertsClient` can draw the same lists and detail tables to a
+terminal, a file or a string (`Console(file = io.StringIO())`). Cells go through the
+render cache (see `render_cache`), so drawing the same alerts again is cheap.
+"""
+from datetime import datetime
+
+from rich.table import Table
+from rich.text import Text
+
+from cli.utils.alert_rich_strings import get_alert_style
+from cli.utils.records import format_id
+from cli.utils.render_cache import Cached
+from cli.utils.timings import timings
+
+# Relative widths for the streamed list. Rows are printed one at a time, so the columns
+# can't be sized from the data like they are in the table; they're split by ratio instead.
+STREAM_RATIOS = {'Alert ID': 5, 'Alert Type': 3, 'Location': 5, 'Issued': 2, 'Expires': 2, 'Sender': 3}
+
+
+def column_names(show_id: bool = False) -> list:
+    return (["Alert ID"] if show_id else []) + ["Alert Type", "Location", "Issued", "Expires", "Sender"]
+
+
+def alert_cells(element, show_id: bool = False) -> list:
+    """The cells of an alert's (an AlertRecord) row in the alert list."""
+    counties = (element.area_desc or '').replace(';', ',')
+
+    start_time = f"[magenta]{str(element.sent)}".replace(" ", "\n")
+    end_time = f"[yellow]{str(element.expires)}".replace(" ", "\n")
+    sender = element.sender_name
+
+    style = get_alert_style(element.event, newline = True) # precompiled, shared between rows.
+
+    # Cached keeps what each cell lays out to, so an unchanged alert is cheap to draw again.
+    cells = [Cached(style.text, key = ('event', element.event)), Cached(counties), Cached(start_time),
+             Cached(end_time), Cached(sender)]
+    if show_id:
+        cells.insert(0, Cached(format_id(element.id)))
+    return cells
+
+
+def empty_alert_table(title: str = None, show_id: bool = False, **kwargs) -> Table:
+    """The alert list's table, without any rows. `kwargs` go to `Table` (i.e. `caption`)."""
+    table = Table(title = title, show_lines = True, **kwargs)
+    if show_id:
+        table.add_column("Alert ID", justify = 'center', min_width = 46)
+    table.add_column("Alert Type", justify="center")
+    table.add_column("Location", justify = 'center', max_width = 80)
+    table.add_column("Issued", justify="center")
+    table.add_column("Expires", justify = 'center')
+    table.add_column("Sender", justify = 'center')
+    return table
+
+
+def alert_table(records, title: str = None, show_id: bool = False, **kwargs) -> Table:
+    """Builds the alert list (AlertRecords) as a table."""
+    with timings.phase('rows'):
+        table = empty_alert_table(title, show_id, **kwargs)
+
+        # populate the table.
+        for element in records:
+            table.add_row(*alert_cells(element, show_id))
+
+        return table
+
+
+def print_table(console, table: Table, label: str) -> None:
+    """Prints an alert list (from `alert_table`), with how many alerts there are for `label`."""
+    # need 2 additional print statements here because the bar inteferes with it.
+    if table.row_count == 0:
+        console.print(f"\n=> There are [underline green]0[/] alerts for {label}.\n")
+    else:
+        console.print()
+        with timings.phase('render'):
+            console.print(table)
+        console.print(f"\n=> There are [underline green]{table.row_count}[/] alerts for {label}.\n")
+
+
+def print_alerts(console, records, label: str, show_id: bool = False, title: str = None) -> None:
+    """Prints alerts as the alert list, i.e. `print_alerts(console, result.records, "TX, LA")`.
+
+    The title defaults to `Alerts for {label}` with the time.
+    """
+    if title is None:
+        title = f"Alerts for {label}, requested: {str(datetime.utcnow())} UTC"
+    print_table(console, alert_table(records, title, show_id), label)
+
+
+def stream_row(console, cells: list, show_id: bool = False, header: bool = False) -> None:
+    """Prints one row of the streamed list (the cells from `alert_cells`, or `column_names`
+    as the header), sized to the console rather than to the other rows."""
+    with timings.phase('rows'):
+        grid = Table(box = None, show_header = False, padding = (0, 1), expand = True)
+        for name in column_names(show_id):
+            grid.add_column(justify = 'center', ratio = STREAM_RATIOS[name], style = "bold" if header else None)
+        grid.add_row(*cells)
+    with timings.phase('render'):
+        console.print(grid)
+        console.rule(style = "dim")
+
+
+def _zone_names(zones: list) -> str:
+    return ", ".join(f"{zone.name} ({zone.code})" for zone in zones)
+
+
+def detail_table(data, zones: list = None) -> Cached:
+    """Builds the table with the details of a single alert (an AlertRecord with its heavy fields).
+
+    Args:
+        zones (list, optional): The `Zone`s it covers (`AlertsClient.zones`), shown in a row of their own.
+    """
+    style = get_alert_style(data.event)
+
+    style_table = None
+    if data.severity == 'Extreme':
+        # Bolds the entire table.
+        from rich.style import Style
+        style_table = Style(bold = True)
+
+    table = Table(show_lines=True, title = style.event_with_emotes, padding = (0, 0), style = style.color, width = 130, border_style = style_table)
+    table.add_column("Information")
+    table.add_column("Details")
+
+    table.add_row("Headline", data.headline)
+    table.add_row("Details", data.description)
+    table.add_row("Location", data.area_desc)
+    if zones:
+        table.add_row("Zones", _zone_names(zones))
+    table.add_row("Instruction", data.instruction if data.instruction is not None else "N/A") # sometimes this is null.
+    table.add_row("Sender", data.sender_name)
+    table.add_row("Severity", data.severity)
+    table.add_row("Full ID", data.id)
+
+    # Everything the table shows; it's the same whenever these are.
+    key = ('detail', data.id, data.event, data.headline, data.description, data.area_desc, data.instruction,
+           data.sender_name, data.severity, tuple(zone.code for zone in zones or ()))
+    return Cached(table, key = key)
+
+
+def print_details(console, results: dict, zones = None) -> None:
+    """Prints the detail table of each alert in `results` (what `AlertsClient.alerts_by_id`
+    returns), or why it couldn't be fetched.
+
+    Args:
+        zones (callable, optional): Given an alert, returns the `Zone`s it covers (i.e. `AlertsClient.zones`).
+    """
+    for id, data in results.items():
+        console.print()
+        if isinstance(data, Exception):
+            console.print(f"=> [red bold]Attention:[/] could not get {format_id(id)} ({data}).")
+        else:
+            with timings.phase('rows'):
+                table = detail_table(data, zones(data) if zones is not None else None)
+            with timings.phase('render'):
+                console.print(table)
+    console.print()
+
+
+def _expiry(at) -> str:
+    return at.strftime('%Y-%m-%d %H:%M') if at is not None else "N/A"
+
+
+# How many of a group's states are named in the summary before the rest are only counted.
+SUMMARY_STATES = 8
+
+
+def _states(states: dict) -> str:
+    names = list(states)
+    more = f" +{len(names) - SUMMARY_STATES} more" if len(names) > SUMMARY_STATES else ""
+    return ", ".join(f"{name} {states[name]}" for name in names[:SUMMARY_STATES]) + more
+
+
+def _tally(counts: dict) -> str:
+    return ", ".join(f"{value or 'N/A'} [green]{count}[/]" for value, count in counts.items())
+
+
+def summary_table(summary, title: str = None, **kwargs) -> Table:
+    """Builds an `AlertSummary` as a table with a row per (event, severity). `kwargs` go to `Table`."""
+    with timings.phase('rows'):
+        table = Table(title = title, show_lines = True, **kwargs)
+        table.add_column("Alert Type", justify = 'center')
+        table.add_column("Severity", justify = 'center')
+        table.add_column("Alerts", justify = 'right')
+        table.add_column("States", justify = 'center', max_width = 60)
+        table.add_column("First Expires (UTC)", justify = 'center')
+        table.add_column("Last Expires (UTC)", justify = 'center')
+
+        for group in summary.groups:
+            style = get_alert_style(group.event)
+            # Events that aren't in ALERTS would all show up as "Not Found"; keep their names.
+            event = style.text if style.event == group.event else Text(group.event or "N/A")
+            table.add_row(event, group.severity or "N/A", str(group.count), _states(group.states),
+                          f"[yellow]{_expiry(group.earliest)}", f"[yellow]{_expiry(group.latest)}")
+        return table
+
+
+def summary_totals(summary) -> Table:
+    """The counts of an `AlertSummary` by severity, urgency and state, as a grid."""
+    totals = Table.grid(padding = (0, 2))
+    totals.add_column(justify = 'right', style = 'bold')
+    totals.add_column(max_width = 120)
+    totals.add_row("By severity", _tally(summary.by_severity))
+    totals.add_row("By urgency", _tally(summary.by_urgency))
+    totals.add_row("By state", _tally(summary.by_state))
+    return totals
+
+
+def print_summary(console, summary, label: str, title: str = None) -> None:
+    """Prints an `AlertSummary` (see `summary_table`), with how many alerts it covers for `label`."""
+    if summary.total == 0:
+        console.print(f"\n=> There are [underline green]0[/] alerts for {label}.\n")
+        return
+
+    if title is None:
+        title = f"Summary of the alerts for {label}, requested: {str(datetime.utcnow())} UTC"
+    table = summary_table(summary, title)
+    console.print()
+    with timings.phase('render'):
+        console.print(table)
+        console.print()
+        console.print(summary_totals(summary))
+    console.print(f"\n=> There are [underline green]{summary.total}[/] alerts for {label}, in "
+                  f"{len(summary.groups)} kinds, expiring between {_expiry(summary.earliest)} and "
+                  f"{_expiry(summary.latest)} UTC.\n")
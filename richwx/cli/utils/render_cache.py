@@ -0,0 +1,105 @@
+"""Reuses what alert cells (and detail tables) render to, for as long as they don't change.
+
+Most of the time Rich spends drawing the alert list goes into laying out each cell: measuring
+it to size the columns, then wrapping its text (a long `areaDesc`, a description) into
+lines. For the same content at the same width on the same console, that always comes out
+the same. Wrapping a cell in `Cached` keeps its measurement and its lines in `render_cache`,
+keyed by the content, the width it's given and what the console does with styles (color
+system, encoding, ...), so drawing an unchanged alert again only pays for the borders.
+
+The cache lives as long as the process, which is what makes it pay off: `alerts watch`
+redraws the same alerts every time something changes, and under `richwx serve` every
+command shares it.
+"""
+import threading
+from collections import OrderedDict
+
+from rich.measure import Measurement
+from rich.segment import Segment
+
+# Measurements and rendered cells kept, least recently used first out. A nationwide list
+# at one width is about 100,000 of them; a few states is a couple thousand.
+MAX_ENTRIES = 50000
+
+
+class RenderCache:
+    """A thread-safe LRU of rendered cells and their measurements."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last = False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# Shared by everything in this process.
+render_cache = RenderCache()
+
+
+def _console_key(console, options) -> tuple:
+    # Everything besides the width that changes what a cell renders to.
+    return (console.color_system, options.encoding, options.legacy_windows, options.markup, options.highlight)
+
+
+class Cached:
+    """A renderable whose measurement and lines are cached, under `key`.
+
+    Args:
+        renderable: What to render: markup (a str), a Text, a Table, ...
+        key (hashable, optional): Identifies the content. Defaults to the renderable itself,
+            which is right for a str. Pass one for anything else, i.e. `('detail', id, ...)`.
+        cache (RenderCache, optional): Defaults to the shared `render_cache`.
+    """
+
+    __slots__ = ('renderable', 'key', 'cache')
+
+    def __init__(self, renderable, key = None, cache: RenderCache = None):
+        self.renderable = renderable
+        self.key = renderable if key is None else key
+        self.cache = cache if cache is not None else render_cache
+
+    def __rich_measure__(self, console, options) -> Measurement:
+        key = ('measure', self.key, options.max_width, _console_key(console, options))
+        measurement = self.cache.get(key)
+        if measurement is None:
+            measurement = Measurement.get(console, options, self.renderable)
+            self.cache.put(key, measurement)
+        return measurement
+
+    def __rich_console__(self, console, options):
+        key = ('lines', self.key, options.max_width, options.justify, options.overflow, options.no_wrap,
+               options.height, _console_key(console, options))
+        lines = self.cache.get(key)
+        if lines is None:
+            lines = console.render_lines(self.renderable, options, pad = False)
+            self.cache.put(key, lines)
+        new_line = Segment.line()
+        for line in lines:
+            yield from line
+            yield new_line
@@ -0,0 +1,222 @@
+"""Keeps requests to the API bounded in time when it's slow or down.
+
+When the API is having a bad day, a request can hang for tens of seconds, and a command
+(or a scheduled job) with it. The pieces here sit under every request `nws` makes:
+
+    Deadline        how long a request may take in total, retries and all. Each attempt's
+                    connect/read timeouts are cut down to what's left of it.
+    backoff         the wait before a retry: exponential, with full jitter so a crowd of
+                    clients doesn't retry in lock step.
+    LatencyTracker  the recent latencies (time to the response headers) of each endpoint.
+                    A request that's still waiting at their 95th percentile is hedged: a
+                    second copy is sent and whichever answers first is used.
+    CircuitBreaker  after a run of failures, stops going to the API for a while. While it's
+                    open, `nws` serves what's in the response cache instead, marked as stale.
+                    Its state is kept in a small file, so the next command knows too.
+    StaleLog        the responses served stale during a command, so it can say so.
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpen(Exception):
+    """Raised instead of making a request while the circuit breaker is open."""
+
+    def __init__(self, retry_at: float):
+        self.retry_at = retry_at
+        super().__init__(f"the API has been failing; not trying again for {max(0, round(retry_at - time.time()))}s")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request (with its retries and hedges) runs out of time."""
+
+
+class Deadline:
+    """A point in time a request has to be done by.
+
+    Args:
+        seconds (float): How long from now. None for no deadline.
+    """
+
+    def __init__(self, seconds: float = None):
+        self.at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> float:
+        """Seconds left (never below 0), or None if there's no deadline."""
+        return max(0.0, self.at - time.monotonic()) if self.at is not None else None
+
+    @property
+    def expired(self) -> bool:
+        return self.at is not None and time.monotonic() >= self.at
+
+    def timeout(self, connect: float, read: float) -> tuple:
+        """The `(connect, read)` timeouts for an attempt, cut down to the time left."""
+        remaining = self.remaining()
+        if remaining is None:
+            return (connect, read)
+        remaining = max(remaining, 0.001) # 0 would mean "no timeout" to some versions of urllib3.
+        return (min(connect, remaining), min(read, remaining))
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """The wait before retry number `attempt` (from 0): anywhere up to `base * 2 ** attempt`, capped."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class LatencyTracker:
+    """The latest latencies of each endpoint, for working out when to hedge a request.
+
+    Args:
+        percentile (float): Hedge a request once it's been waiting longer than this
+            percentile of the endpoint's recent latencies.
+        window (int): How many latencies are kept per endpoint.
+        min_samples (int): Until an endpoint has this many, `initial` is used instead.
+        initial (float): The hedge delay (seconds) to use until then.
+        floor (float): Never hedge sooner than this, however fast the endpoint usually is.
+    """
+
+    def __init__(self, percentile: float = 95, window: int = 100, min_samples: int = 10, initial: float = 2.0,
+                 floor: float = 0.25):
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.initial = initial
+        self.floor = floor
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen = self.window)
+            samples.append(seconds)
+
+    def hedge_delay(self, endpoint: str) -> float:
+        """How long to wait on a request to `endpoint` before sending a second copy."""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return self.initial
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.floor, samples[index])
+
+
+class CircuitBreaker:
+    """Stops requests for a while after too many failures in a row.
+
+    Closed, requests go ahead and failures are counted; any success resets the count. After
+    `threshold` failures in a row it opens, and `allow` says no until `cooldown` seconds
+    have passed. Then a single request is let through to test the water: if it succeeds the
+    breaker closes, otherwise it opens for another cooldown. A trial that says nothing
+    either way (i.e. throttled, or cut short) hands the slot back with `release`.
+
+    Args:
+        threshold (int): Failures in a row that open the breaker.
+        cooldown (float): Seconds it stays open.
+        path (str, optional): File to keep the state in, so failures in one command count
+            towards opening it for the next.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30, path: str = None):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.path = path
+        self.failures = 0
+        self.open_until = 0.0
+        self._trial = False # whether the one request after a cooldown is out.
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self.open_until = float(state['open_until'])
+            self.failures = int(state['failures'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            if self.open_until == 0.0 and self.failures == 0:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok = True)
+            fd, tmp = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'open_until': self.open_until, 'failures': self.failures}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass # the next command just won't know.
+
+    @property
+    def is_open(self) -> bool:
+        return time.time() < self.open_until
+
+    def allow(self) -> bool:
+        """Whether a request may go ahead. Takes the trial slot once the cooldown is over."""
+        with self._lock:
+            if self.open_until == 0.0:
+                return True
+            if time.time() < self.open_until or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def check(self) -> None:
+        """Raises `CircuitOpen` if a request may not go ahead."""
+        if not self.allow():
+            raise CircuitOpen(self.open_until)
+
+    def success(self) -> None:
+        with self._lock:
+            changed = self.open_until != 0.0 or self.failures
+            self.failures = 0
+            self.open_until = 0.0
+            self._trial = False
+            if changed:
+                self._save()
+
+    def release(self) -> None:
+        """Ends the trial without counting it for or against the API, so the next request
+        can try instead."""
+        with self._lock:
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.threshold or self.open_until != 0.0:
+                self.open_until = time.time() + self.cooldown
+            self._save()
+
+
+class StaleLog:
+    """The responses served from the cache without being revalidated, because the API couldn't be reached."""
+
+    def __init__(self):
+        self._served = {}
+        self._lock = threading.Lock()
+
+    def add(self, url: str, age: float, reason: str) -> None:
+        with self._lock:
+            self._served[url] = (age, reason)
+
+    def drain(self) -> dict:
+        """Takes (and forgets) what was served stale: url -> (age in seconds, why)."""
+        with self._lock:
+            served, self._served = self._served, {}
+        return served
@@ -0,0 +1,135 @@
+"""Polls the active alerts for many areas, each on its own schedule (`richwx alerts watch`).
+
+Every poll is a conditional request (see `nws.get_active_alerts_if_changed`), so an area
+that hasn't changed costs a 304 with no body, and nothing is decoded or redrawn.
+"""
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cli.utils import nws
+from cli.utils.cache import freshness_lifetime, validators
+from cli.utils.fetcher import DEFAULT_MAX_WORKERS, rate_limiter
+
+# Polls that fail are retried after twice the wait each time, up to this many seconds.
+MAX_BACKOFF = 600
+
+
+class AreaState:
+    """What's known about one area: its alerts, the last response's validators, and how polling it is going."""
+
+    __slots__ = ('area', 'interval', 'records', 'validators', 'digest', 'wait', 'checked_at', 'changed_at', 'error',
+                 'failures', 'polls', 'unchanged')
+
+    def __init__(self, area: str, interval: float):
+        self.area = area
+        self.interval = interval
+        self.records = None # None until the first successful poll.
+        self.validators = {}
+        self.digest = None
+        self.wait = interval # until the next poll.
+        self.checked_at = None
+        self.changed_at = None
+        self.error = None
+        self.failures = 0
+        self.polls = 0
+        self.unchanged = 0
+
+
+class PollScheduler:
+    """Keeps the alerts for each area up to date by polling it on its own interval.
+
+    After a poll, an area is due again after its interval, or later if the server said the
+    response stays fresh for longer (`Cache-Control: max-age` or `Expires`): polling before
+    then would only get the same answer back. Failed polls back off, doubling each time up
+    to MAX_BACKOFF.
+
+    Args:
+        intervals (dict): Maps each area to the seconds between its polls.
+        limiter (RateLimiter, optional): Rate limiter to use. Defaults to the shared one.
+        heavy (bool, optional): Keep the heavy fields (zones, geocodes, ...) on each record.
+        clock (callable, optional): Returns the current time in seconds. Defaults to time.monotonic.
+    """
+
+    def __init__(self, intervals: dict, limiter = None, heavy: bool = False, clock = time.monotonic):
+        self.areas = {area: AreaState(area, interval) for area, interval in intervals.items()}
+        self.limiter = limiter or rate_limiter
+        self.heavy = heavy
+        self.clock = clock
+        self._order = itertools.count() # breaks ties in the queue, first come first served.
+        now = clock()
+        self._queue = [(now, next(self._order), area) for area in self.areas] # all of them, straight away.
+
+    def next_due(self) -> float:
+        """When (on the scheduler's clock) the next area is due."""
+        return self._queue[0][0]
+
+    def due(self) -> list:
+        """Takes every area that's due to be polled off the queue."""
+        now = self.clock()
+        areas = []
+        while self._queue and self._queue[0][0] <= now:
+            areas.append(heapq.heappop(self._queue)[2])
+        return areas
+
+    def poll(self, area: str) -> bool:
+        """Polls one area and schedules its next poll. Thread safe across different areas.
+
+        Returns:
+            bool: Whether anything shown for the area changed (its alerts, or whether it's failing).
+        """
+        state = self.areas[area]
+        state.polls += 1
+        try:
+            records, headers, digest = nws.get_active_alerts_if_changed(state.validators, state.digest, self.limiter,
+                                                                        self.heavy, area = area)
+        except Exception as err:
+            state.failures += 1
+            state.wait = min(state.interval * 2 ** state.failures, MAX_BACKOFF)
+            changed = str(err) != str(state.error)
+            state.error = err
+            return changed
+
+        state.checked_at = time.time()
+        state.wait = max(state.interval, freshness_lifetime(headers))
+        changed = state.error is not None
+        state.error = None
+        state.failures = 0
+
+        if records is None:
+            state.unchanged += 1
+            return changed
+
+        # A 304 doesn't always repeat the validators, so only replace them on a full response.
+        state.validators = validators(headers)
+        state.digest = digest
+        state.records = records
+        state.changed_at = state.checked_at
+        return True
+
+    def schedule(self, area: str) -> None:
+        state = self.areas[area]
+        heapq.heappush(self._queue, (self.clock() + state.wait, next(self._order), area))
+
+    def run(self, on_change, stop, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        """Polls each area whenever it's due until `stop` (a threading.Event) is set.
+
+        Args:
+            on_change (callable): Called from this thread as `on_change(areas)` with the
+                areas that changed after each round of polls, and not at all if none did.
+            stop (threading.Event): Set it to stop polling.
+            max_workers (int, optional): Upper bound on the number of requests in flight.
+        """
+        with ThreadPoolExecutor(max_workers = max(1, min(max_workers, len(self.areas) or 1))) as pool:
+            while not stop.is_set():
+                areas = self.due()
+                if not areas:
+                    stop.wait(max(0.0, self.next_due() - self.clock()))
+                    continue
+
+                changed = [area for area, did_change in zip(areas, pool.map(self.poll, areas)) if did_change]
+                for area in areas:
+                    self.schedule(area)
+                if changed:
+                    on_change(changed)
@@ -0,0 +1,243 @@
+"""A nationwide snapshot of the active alerts, indexed for client-side filtering.
+
+One request to `/alerts/active` gets every active alert in the country. The snapshot keeps
+them (with their heavy fields) along with indexes by state, UGC zone, event, severity,
+urgency and expiry time, so that questions like "flood warnings in TX and LA expiring in
+the next 6 hours" are answered from memory instead of with another request per area.
+
+The snapshot is written to disk after it's fetched, indexes and all, so that later
+commands can reuse it for as long as it's fresh.
+"""
+import json
+import os
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+from cli.utils import nws
+from cli.utils.records import AlertRecord
+from cli.utils.timings import timings
+
+# Bumped whenever the layout of the file changes; older files are ignored.
+FORMAT_VERSION = 1
+
+# The fields that are indexed, and how their keys are normalised for lookups.
+INDEXED_FIELDS = ('state', 'zone', 'event', 'severity', 'urgency')
+
+
+def _normalise(field: str, value: str) -> str:
+    # Zones and states are upper case codes; everything else is matched case-insensitively.
+    return value.upper() if field in ('state', 'zone') else value.lower()
+
+
+def _keys(record: AlertRecord, field: str) -> set:
+    if field == 'zone':
+        return {_normalise(field, code) for code in record.ugc}
+    if field == 'state':
+        # The first two letters of a UGC code are the state (or marine area), i.e. TXZ103.
+        return {_normalise(field, code[:2]) for code in record.ugc}
+    value = getattr(record, field)
+    return {_normalise(field, value)} if value else set()
+
+
+def _timestamp(value: str):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+class AlertFilter:
+    """A set of filters on the indexed fields, usable on a snapshot or on one record at a time.
+
+    Values of the same field are OR'd together and different fields are AND'd, so
+    `states = ['TX', 'LA'], events = ['Flood Warning']` is flood warnings in either state.
+    Matching is case-insensitive.
+
+    Args:
+        states, zones, events, severities, urgencies (iterable, optional): Values to match.
+        expires_after (datetime, optional): Only alerts expiring at or after this time.
+        expires_before (datetime, optional): Only alerts expiring at or before this time.
+    """
+
+    def __init__(self, states = (), zones = (), events = (), severities = (), urgencies = (),
+                 expires_after: datetime = None, expires_before: datetime = None):
+        self.values = {}
+        for field, values in zip(INDEXED_FIELDS, (states, zones, events, severities, urgencies)):
+            if values:
+                self.values[field] = {_normalise(field, value) for value in values}
+        self.expires_after = expires_after
+        self.expires_before = expires_before
+
+    def __bool__(self):
+        return bool(self.values) or self.expires_after is not None or self.expires_before is not None
+
+    @property
+    def needs_heavy(self) -> bool:
+        """Whether records need their heavy fields to be matched (zones and states come from the geocode)."""
+        return 'zone' in self.values or 'state' in self.values
+
+    def matches(self, record: AlertRecord) -> bool:
+        for field, values in self.values.items():
+            if not _keys(record, field) & values:
+                return False
+
+        if self.expires_after is not None or self.expires_before is not None:
+            expires = _timestamp(record._expires)
+            if expires is None:
+                return False
+            if self.expires_after is not None and expires < self.expires_after.timestamp():
+                return False
+            if self.expires_before is not None and expires > self.expires_before.timestamp():
+                return False
+
+        return True
+
+    def for_states(self, states) -> 'AlertFilter':
+        """The same filters, limited to these states instead (i.e. the areas a list asked for)."""
+        limited = AlertFilter(states = states, expires_after = self.expires_after, expires_before = self.expires_before)
+        limited.values.update((field, values) for field, values in self.values.items() if field != 'state')
+        return limited
+
+
+class AlertSnapshot:
+    """Every active alert at a point in time, with indexes for filtering.
+
+    Args:
+        records (list): The alerts, as `AlertRecord`s with their heavy fields (the zones and
+            states come from the geocode).
+        fetched_at (float, optional): When the alerts were fetched (a unix timestamp). Defaults to now.
+        indexes (dict, optional): Prebuilt indexes, as saved by `save`. Built from the records if not given.
+        expires (tuple, optional): Prebuilt expiry index (sorted timestamps and positions), as saved by `save`.
+    """
+
+    def __init__(self, records: list, fetched_at: float = None, indexes: dict = None, expires: tuple = None):
+        self.records = list(records)
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        with timings.phase('snapshot'):
+            self.indexes = indexes if indexes is not None else self._build_indexes()
+            self._expires_at, self._expires_pos = expires if expires is not None else self._build_expires()
+        self._spatial = None
+
+    def _build_indexes(self) -> dict:
+        indexes = {field: {} for field in INDEXED_FIELDS}
+        for position, record in enumerate(self.records):
+            for field in INDEXED_FIELDS:
+                for key in _keys(record, field):
+                    indexes[field].setdefault(key, []).append(position)
+        return indexes
+
+    def _build_expires(self) -> tuple:
+        # Sorted by expiry so a time range is two bisects. Alerts without one are left out.
+        pairs = sorted((_timestamp(record._expires), position) for position, record in enumerate(self.records)
+                       if record._expires)
+        return [at for at, _ in pairs], [position for _, position in pairs]
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def age(self) -> float:
+        """How many seconds ago the alerts were fetched."""
+        return time.time() - self.fetched_at
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self.age <= max_age
+
+    @property
+    def spatial(self):
+        """A `SpatialIndex` over the alerts' polygons, built the first time it's needed."""
+        if self._spatial is None:
+            # Imported here so that NumPy is only loaded for point and bounding box lookups.
+            from cli.utils.spatial import SpatialIndex
+            self._spatial = SpatialIndex(self.records)
+        return self._spatial
+
+    def at_points(self, lats, lons) -> list:
+        """The alerts whose polygons contain each point, as one list of `AlertRecord`s per point."""
+        return [[self.records[position] for position in found] for found in self.spatial.lookup(lats, lons)]
+
+    def in_bbox(self, south: float, west: float, north: float, east: float) -> list:
+        """The alerts whose polygons overlap the bounding box."""
+        return [self.records[position] for position in self.spatial.intersecting(south, west, north, east)]
+
+    def values(self, field: str) -> list:
+        """The distinct (normalised) values of an indexed field, i.e. every state with an alert."""
+        return sorted(self.indexes[field])
+
+    def query(self, filters: AlertFilter) -> list:
+        """Gets the alerts matching the filters, using the indexes.
+
+        Returns:
+            list: The matching `AlertRecord`s, in the order they were fetched.
+        """
+        matches = None
+        for field, values in filters.values.items():
+            index = self.indexes[field]
+            positions = set()
+            for value in values:
+                positions.update(index.get(value, ()))
+            matches = positions if matches is None else matches & positions
+
+        if filters.expires_after is not None or filters.expires_before is not None:
+            after, before = filters.expires_after, filters.expires_before
+            low = bisect_left(self._expires_at, after.timestamp()) if after is not None else 0
+            high = bisect_right(self._expires_at, before.timestamp()) if before is not None else len(self._expires_at)
+            positions = set(self._expires_pos[low:high])
+            matches = positions if matches is None else matches & positions
+
+        if matches is None:
+            return list(self.records)
+        return [self.records[position] for position in sorted(matches)]
+
+    def save(self, path: str) -> None:
+        """Writes the snapshot (alerts and indexes) to a file, atomically."""
+        data = {
+            'version': FORMAT_VERSION,
+            'fetched_at': self.fetched_at,
+            'features': [record.to_feature() for record in self.records],
+            'indexes': self.indexes,
+            'expires': [self._expires_at, self._expires_pos],
+        }
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok = True)
+        fd, tmp = tempfile.mkstemp(dir = directory, prefix = '.snapshot-', suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f, timings.phase('snapshot'):
+                json.dump(data, f, separators = (',', ':'))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str):
+        """Reads a snapshot written by `save`.
+
+        Returns:
+            AlertSnapshot: The snapshot, or None if there isn't one (or it's from an older version).
+        """
+        try:
+            with open(path) as f, timings.phase('snapshot'):
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != FORMAT_VERSION:
+            return None
+
+        with timings.phase('snapshot'):
+            records = [AlertRecord.from_feature(feature) for feature in data['features']]
+        return cls(records, data['fetched_at'], indexes = data['indexes'], expires = tuple(data['expires']))
+
+    def fetched_at_utc(self) -> datetime:
+        return datetime.fromtimestamp(self.fetched_at, timezone.utc)
+
+
+def fetch_snapshot(cache = None, max_age: float = None, limiter = None) -> AlertSnapshot:
+    """Fetches every active alert in the country (one request) into a new snapshot.
+
+    The response is decoded a feature at a time, so the raw JSON is never held in memory
+    alongside the records. See `nws.request` for `cache`, `max_age` and `limiter`.
+    """
+    fetched_at = time.time()
+    records = [AlertRecord.from_feature(feature) for feature in nws.stream_active_alerts(cache, max_age, limiter)]
+    return AlertSnapshot(records, fetched_at)
@@ -0,0 +1,171 @@
+"""Point and bounding box lookups against the polygons of a set of alerts.
+
+Storm-based alerts (tornado, severe thunderstorm and flash flood warnings, ...) come with a
+polygon; zone-based ones don't, and aren't part of the index. The polygons are kept in flat
+NumPy arrays and bucketed into a grid of `CELL_SIZE` degree cells, so a lookup only tests
+the polygons whose bounding box touches the point's cell. Points are tested in batches: all
+the points that fall in the same cell are checked against each candidate polygon at once.
+"""
+import math
+
+import numpy as np
+
+# Size of a grid cell, in degrees. Most warning polygons are a fraction of a degree across.
+CELL_SIZE = 1.0
+
+# Upper bound on the number of (point, edge) pairs tested at once, to keep memory in check.
+_BATCH_PAIRS = 1_000_000
+
+
+def _cell(value: float) -> int:
+    return math.floor(value / CELL_SIZE)
+
+
+def _points_in_ring(xs, ys, px, py):
+    """Crossing number test of many points against one ring. Returns a boolean array."""
+    x1, y1 = xs[:-1], ys[:-1]
+    x2, y2 = xs[1:], ys[1:]
+    inside = np.zeros(len(px), dtype = bool)
+
+    step = max(1, _BATCH_PAIRS // max(1, len(x1)))
+    for start in range(0, len(px), step):
+        x = px[start:start + step, None]
+        y = py[start:start + step, None]
+        straddles = (y1 > y) != (y2 > y)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            crossing = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside[start:start + step] = np.count_nonzero(straddles & (x < crossing), axis = 1) % 2 == 1
+    return inside
+
+
+def _segments_cross(ax, ay, bx, by, cx, cy, dx, dy):
+    """Whether segments a-b (arrays) cross segment c-d (scalars)."""
+    def orient(px, py, qx, qy, rx, ry):
+        return np.sign((qx - px) * (ry - py) - (qy - py) * (rx - px))
+
+    return ((orient(ax, ay, bx, by, cx, cy) != orient(ax, ay, bx, by, dx, dy))
+            & (orient(cx, cy, dx, dy, ax, ay) != orient(cx, cy, dx, dy, bx, by)))
+
+
+class SpatialIndex:
+    """A grid index over the polygons of a list of alerts.
+
+    Args:
+        records (list): The alerts, as `AlertRecord`s with their heavy fields (the geometry).
+            Lookups give back positions in this list.
+    """
+
+    def __init__(self, records: list):
+        xs, ys, offsets, owners, boxes = [], [], [0], [], []
+        for position, record in enumerate(records):
+            for ring in record.polygons:
+                if len(ring) < 3:
+                    continue
+                ring_x = [point[0] for point in ring]
+                ring_y = [point[1] for point in ring]
+                if ring[0] != ring[-1]: # close it, so that every edge is (i, i + 1).
+                    ring_x.append(ring_x[0])
+                    ring_y.append(ring_y[0])
+                xs.extend(ring_x)
+                ys.extend(ring_y)
+                offsets.append(len(xs))
+                owners.append(position)
+                boxes.append((min(ring_x), min(ring_y), max(ring_x), max(ring_y)))
+
+        self.xs = np.array(xs, dtype = np.float64)
+        self.ys = np.array(ys, dtype = np.float64)
+        self.offsets = np.array(offsets, dtype = np.int64)
+        self.owners = np.array(owners, dtype = np.int64)
+        self.boxes = np.array(boxes, dtype = np.float64).reshape(-1, 4)
+
+        # Every cell a polygon's bounding box touches points back at the polygon.
+        self.grid = {}
+        for polygon, (min_x, min_y, max_x, max_y) in enumerate(boxes):
+            for cell_x in range(_cell(min_x), _cell(max_x) + 1):
+                for cell_y in range(_cell(min_y), _cell(max_y) + 1):
+                    self.grid.setdefault((cell_x, cell_y), []).append(polygon)
+
+    def __len__(self):
+        """The number of polygons in the index."""
+        return len(self.owners)
+
+    def _ring(self, polygon: int) -> tuple:
+        start, end = self.offsets[polygon], self.offsets[polygon + 1]
+        return self.xs[start:end], self.ys[start:end]
+
+    def lookup(self, lats, lons) -> list:
+        """Finds the alerts whose polygons contain each point.
+
+        Args:
+            lats, lons (array-like): The coordinates of the points, in degrees.
+
+        Returns:
+            list: One sorted list of record positions per point.
+        """
+        lats = np.asarray(lats, dtype = np.float64)
+        lons = np.asarray(lons, dtype = np.float64)
+        matches = [set() for _ in range(len(lats))]
+        if len(lats) == 0 or len(self) == 0:
+            return [[] for _ in matches]
+
+        # Group the points by grid cell, so each candidate polygon is tested once per cell.
+        cells_x = np.floor(lons / CELL_SIZE).astype(np.int64)
+        cells_y = np.floor(lats / CELL_SIZE).astype(np.int64)
+        order = np.lexsort((cells_y, cells_x))
+        keys = np.stack((cells_x[order], cells_y[order]), axis = 1)
+        starts = np.flatnonzero(np.any(np.diff(keys, axis = 0) != 0, axis = 1)) + 1
+        for group in np.split(order, starts):
+            candidates = self.grid.get((int(cells_x[group[0]]), int(cells_y[group[0]])))
+            if not candidates:
+                continue
+
+            px, py = lons[group], lats[group]
+            for polygon in candidates:
+                min_x, min_y, max_x, max_y = self.boxes[polygon]
+                in_box = (px >= min_x) & (px <= max_x) & (py >= min_y) & (py <= max_y)
+                if not in_box.any():
+                    continue
+                inside = np.zeros(len(group), dtype = bool)
+                inside[in_box] = _points_in_ring(*self._ring(polygon), px[in_box], py[in_box])
+                owner = int(self.owners[polygon])
+                for point in group[inside]:
+                    matches[point].add(owner)
+
+        return [sorted(found) for found in matches]
+
+    def lookup_point(self, lat: float, lon: float) -> list:
+        """Finds the alerts whose polygons contain a single point."""
+        return self.lookup([lat], [lon])[0]
+
+    def intersecting(self, south: float, west: float, north: float, east: float) -> list:
+        """Finds the alerts whose polygons overlap a bounding box.
+
+        Returns:
+            list: The sorted positions of the records.
+        """
+        candidates = set()
+        for cell_x in range(_cell(west), _cell(east) + 1):
+            for cell_y in range(_cell(south), _cell(north) + 1):
+                candidates.update(self.grid.get((cell_x, cell_y), ()))
+
+        corners_x = np.array([west, east, east, west])
+        corners_y = np.array([south, south, north, north])
+        found = set()
+        for polygon in candidates:
+            owner = int(self.owners[polygon])
+            if owner in found:
+                continue
+            min_x, min_y, max_x, max_y = self.boxes[polygon]
+            if min_x > east or max_x < west or min_y > north or max_y < south:
+                continue
+
+            xs, ys = self._ring(polygon)
+            # A vertex inside the box, a corner of the box inside the polygon, or an edge
+            # crossing one of the box's sides.
+            if (np.any((xs >= west) & (xs <= east) & (ys >= south) & (ys <= north))
+                    or _points_in_ring(xs, ys, corners_x, corners_y).any()
+                    or any(_segments_cross(xs[:-1], ys[:-1], xs[1:], ys[1:], corners_x[i], corners_y[i],
+                                           corners_x[(i + 1) % 4], corners_y[(i + 1) % 4]).any() for i in range(4))):
+                found.add(owner)
+
+        return sorted(found)
@@ -0,0 +1,119 @@
+"""Incremental parsing of `/alerts/active` responses.
+
+A FeatureCollection for a busy state can run to several megabytes, most of it long
+`description` text and polygons. Rather than loading the whole thing at once,
+`iter_features` decodes one feature at a time from a stream of byte chunks (see
+`nws._decode`). The fetcher turns each one into an `AlertRecord` as it arrives, light
+unless the command needs the heavy fields, so the decoded JSON never piles up beyond a
+feature or so, and the first alert is available as soon as its bytes have arrived.
+"""
+import codecs
+import json
+
+# Drop what's already been consumed from the buffer once this much of it has piled up.
+_COMPACT_AT = 64 * 1024
+_WHITESPACE = ' \t\n\r'
+
+
+class StreamError(ValueError):
+    """Raised when the stream ends before the collection does, or isn't a collection at all."""
+
+
+class _Buffer:
+    """Text buffer that's refilled from an iterator of byte chunks as the parser needs more."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        """Reads another chunk. Returns False once there's nothing left."""
+        if self.exhausted:
+            return False
+        if self.pos > _COMPACT_AT:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.text += self.decoder.decode(b'', final = True)
+            self.exhausted = True
+            return False
+        self.text += self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character without consuming it ('' at the end)."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise StreamError(f"Expected {char!r} at offset {self.pos}, found {self.peek()!r}.")
+        self.pos += 1
+
+    def value(self, decoder = json.JSONDecoder()):
+        """Decodes the next complete JSON value, reading more chunks until there's enough."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise StreamError("The response ended in the middle of a value.")
+                continue
+
+            # A number right at the end of the buffer might still have digits to come.
+            if end == len(self.text) and not isinstance(value, (dict, list, str)) and self.fill():
+                continue
+
+            self.pos = end
+            return value
+
+
+def iter_features(chunks):
+    """Yields each feature of a GeoJSON FeatureCollection as soon as it has been decoded.
+
+    Args:
+        chunks (iterable): The response body, as chunks of bytes (or str).
+
+    Raises:
+        StreamError: If the body isn't a JSON object, or ends early.
+    """
+    buffer = _Buffer(chunks)
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        return
+
+    while True:
+        key = buffer.value()
+        buffer.expect(':')
+
+        if key == 'features':
+            buffer.expect('[')
+            if buffer.peek() == ']':
+                buffer.pos += 1
+            else:
+                while True:
+                    yield buffer.value()
+                    if buffer.peek() == ',':
+                        buffer.pos += 1
+                        continue
+                    buffer.expect(']')
+                    break
+        else:
+            buffer.value() # @context, title, updated, ... nothing the table needs.
+
+        if buffer.peek() == ',':
+            buffer.pos += 1
+            continue
+        buffer.expect('}')
+        return
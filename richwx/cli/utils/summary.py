@@ -0,0 +1,203 @@
+"""Counts of alerts, for an overview of a whole country's worth of them at a glance.
+
+During a big outbreak a list of every alert runs to thousands of lines. A summary groups
+them instead: how many there are by state, event, severity and urgency, and one row per
+(event, severity) with the states it covers and the earliest and latest expiry.
+
+The alerts are first turned into columns (codes into a string table, plus expiry times and
+(alert, state) pairs) in one pass, and everything is counted from those with NumPy. An
+exported snapshot already is columns, so `from_packed` doesn't build a single record.
+"""
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+from cli.utils.timings import timings
+
+# The order groups are shown in, most severe first. Anything else goes last.
+SEVERITIES = ('Extreme', 'Severe', 'Moderate', 'Minor', 'Unknown')
+URGENCIES = ('Immediate', 'Expected', 'Future', 'Past', 'Unknown')
+
+
+class SummaryGroup:
+    """The alerts of one event and severity.
+
+    Args:
+        event (str): The event, i.e. Flood Warning.
+        severity (str): The severity, i.e. Severe.
+        count (int): How many alerts there are.
+        states (dict): The states (and marine areas) they cover -> how many of the alerts are
+            in each, the state with the most first.
+        earliest (datetime): When the first of them expires (UTC), if any do.
+        latest (datetime): When the last of them expires (UTC), if any do.
+    """
+
+    __slots__ = ('event', 'severity', 'count', 'states', 'earliest', 'latest')
+
+    def __init__(self, event: str, severity: str, count: int, states: dict = None, earliest: datetime = None,
+                 latest: datetime = None):
+        self.event = event
+        self.severity = severity
+        self.count = count
+        self.states = states or {}
+        self.earliest = earliest
+        self.latest = latest
+
+    def __repr__(self):
+        return f"SummaryGroup({self.event!r}, {self.severity!r}, {self.count})"
+
+
+def _datetime(timestamp: float):
+    return None if np.isnan(timestamp) else datetime.fromtimestamp(float(timestamp), timezone.utc)
+
+
+def _severity_rank(severity) -> int:
+    return SEVERITIES.index(severity) if severity in SEVERITIES else len(SEVERITIES)
+
+
+def _counts(codes, strings: list, order: tuple = None) -> dict:
+    # value -> count, in `order` if there is one and by count otherwise.
+    counts = np.bincount(codes, minlength = len(strings))
+    pairs = [(strings[code], int(count)) for code, count in enumerate(counts) if count]
+    if order is not None:
+        pairs.sort(key = lambda pair: (order.index(pair[0]) if pair[0] in order else len(order), pair[0] or ''))
+    else:
+        pairs.sort(key = lambda pair: (-pair[1], pair[0] or ''))
+    return dict(pairs)
+
+
+def _dense(codes, string) -> tuple:
+    # Renumbers codes from any string table (i.e. a snapshot's, shared by every column) to
+    # 0..n-1, and gets the strings for just those.
+    unique, dense = np.unique(np.asarray(codes, dtype = np.int64), return_inverse = True)
+    return dense.reshape(-1), [string(int(code)) for code in unique]
+
+
+class AlertSummary:
+    """Counts of a set of alerts. Build one with `from_records` or `from_packed`.
+
+    Attributes:
+        total (int): How many alerts there are.
+        by_state, by_event, by_severity, by_urgency (dict): Value -> how many alerts. An
+            alert counts once for every state it covers. States and events are sorted by
+            count, severities and urgencies from the most to the least pressing.
+        groups (list): A `SummaryGroup` per (event, severity), most severe first, then by count.
+        earliest, latest (datetime): When the first and last of the alerts expire (UTC).
+    """
+
+    def __init__(self, events, severities, urgencies, expires, string, state_alerts, states, state_names: list):
+        with timings.phase('rows'):
+            self._aggregate(events, severities, urgencies, expires, string, state_alerts, states, state_names)
+
+    def _aggregate(self, events, severities, urgencies, expires, string, state_alerts, states, state_names):
+        # `events`, `severities` and `urgencies` are codes for `string`; `states` (one per
+        # (alert, state) pair, with the alert's position in `state_alerts`) index `state_names`.
+        events, event_names = _dense(events, string)
+        severities, severity_names = _dense(severities, string)
+        urgencies, urgency_names = _dense(urgencies, string)
+        expires = np.asarray(expires, dtype = np.float64)
+        states = np.asarray(states, dtype = np.int64)
+        state_alerts = np.asarray(state_alerts, dtype = np.int64)
+
+        self.total = len(expires)
+        self.by_event = _counts(events, event_names)
+        self.by_severity = _counts(severities, severity_names, SEVERITIES)
+        self.by_urgency = _counts(urgencies, urgency_names, URGENCIES)
+        self.by_state = _counts(states, state_names)
+        known = expires[~np.isnan(expires)]
+        self.earliest = _datetime(known.min()) if len(known) else None
+        self.latest = _datetime(known.max()) if len(known) else None
+
+        # Groups: one key per (event, severity), then counts and expiry bounds per key.
+        keys, group_of = np.unique(events * max(1, len(severity_names)) + severities, return_inverse = True)
+        group_of = group_of.reshape(-1)
+        counts = np.bincount(group_of, minlength = len(keys))
+        earliest = np.full(len(keys), np.nan)
+        latest = np.full(len(keys), np.nan)
+        np.fmin.at(earliest, group_of, expires) # fmin/fmax skip the alerts without an expiry.
+        np.fmax.at(latest, group_of, expires)
+
+        # How many alerts of each group are in each state, as (group, state) pairs sorted by
+        # group, then split into each group's states.
+        width = max(1, len(state_names))
+        pairs, in_state = np.unique(group_of[state_alerts] * width + states, return_counts = True)
+        bounds = np.searchsorted(pairs // width, np.arange(len(keys) + 1))
+
+        groups = []
+        for index, key in enumerate(keys):
+            event, severity = divmod(int(key), max(1, len(severity_names)))
+            start, end = bounds[index], bounds[index + 1]
+            covered = sorted(((state_names[state], int(count)) for state, count in
+                              zip(pairs[start:end] % width, in_state[start:end])), key = lambda pair: (-pair[1], pair[0]))
+            groups.append(SummaryGroup(event_names[event], severity_names[severity], int(counts[index]), dict(covered),
+                                       _datetime(earliest[index]), _datetime(latest[index])))
+        groups.sort(key = lambda group: (_severity_rank(group.severity), -group.count, group.event or ''))
+        self.groups = groups
+
+    @classmethod
+    def from_records(cls, records) -> 'AlertSummary':
+        """Summarises `AlertRecord`s. The states come from the zones, so they need their heavy fields."""
+        strings, codes = [], {}
+        state_names, state_codes = [], {}
+        parsed = {} # expiry string -> timestamp; plenty of alerts share one.
+
+        def code(value, strings = strings, codes = codes) -> int:
+            found = codes.get(value)
+            if found is None:
+                found = codes[value] = len(strings)
+                strings.append(value)
+            return found
+
+        events, severities, urgencies = array('I'), array('I'), array('I')
+        expires, state_alerts, states = array('d'), array('I'), array('I')
+        with timings.phase('rows'):
+            for position, record in enumerate(records):
+                events.append(code(record.event))
+                severities.append(code(record.severity))
+                urgencies.append(code(record.urgency))
+                at = parsed.get(record._expires)
+                if at is None:
+                    at = parsed[record._expires] = (datetime.fromisoformat(record._expires).timestamp()
+                                                    if record._expires else float('nan'))
+                expires.append(at)
+                for state in {zone[:2].upper() for zone in record.ugc}:
+                    state_alerts.append(position)
+                    states.append(code(state, state_names, state_codes))
+        return cls(events, severities, urgencies, expires, strings.__getitem__, state_alerts, states, state_names)
+
+    @classmethod
+    def from_packed(cls, snapshot, positions = None) -> 'AlertSummary':
+        """Summarises the alerts at `positions` (every one by default) of a `PackedSnapshot`,
+        straight from its columns."""
+        columns = snapshot.columns()
+        with timings.phase('rows'):
+            positions = np.arange(len(snapshot)) if positions is None else np.asarray(positions, dtype = np.int64)
+            events, severities, urgencies = (np.frombuffer(columns[name], dtype = np.uint32)[positions]
+                                             for name in ('event', 'severity', 'urgency'))
+            expires = np.frombuffer(columns['expires.at'], dtype = np.float64)[positions]
+
+            # Every zone of every alert asked for, as (alert, zone code) pairs.
+            offsets = np.frombuffer(columns['zones.o'], dtype = np.uint32).astype(np.int64)
+            zones = np.frombuffer(columns['zones'], dtype = np.uint32)
+            starts, lengths = offsets[positions], offsets[positions + 1] - offsets[positions]
+            zone_alerts = np.repeat(np.arange(len(positions)), lengths)
+            within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            zone_codes = zones[np.repeat(starts, lengths) + within]
+
+            # A zone's state is its first two letters; work it out once per distinct zone.
+            distinct, zone_of = np.unique(zone_codes, return_inverse = True)
+            state_names, state_codes = [], {}
+            state_of = np.empty(len(distinct), dtype = np.int64)
+            for index, zone in enumerate(distinct):
+                state = snapshot.string(int(zone))[:2].upper()
+                if state not in state_codes:
+                    state_codes[state] = len(state_names)
+                    state_names.append(state)
+                state_of[index] = state_codes[state]
+
+            # An alert with several zones in a state counts once for it.
+            width = max(1, len(state_names))
+            pairs = np.unique(zone_alerts * width + state_of[zone_of.reshape(-1)])
+            state_alerts, states = np.divmod(pairs, width)
+        return cls(events, severities, urgencies, expires, snapshot.string, state_alerts, states, state_names)
@@ -0,0 +1,126 @@
+"""Per-phase timings for a single invocation (`richwx --timings ...`).
+
+Code marks what it's doing with `timings.phase('http')` (or `timings.iterate` for the
+pieces of a generator). Phases nest: time spent in an inner phase is charged to it and not
+to the one around it, so the phases add up to (at most) the time they cover. Time in worker
+threads is added up across the threads, so with concurrent requests `http` can be larger
+than the wall clock.
+
+Nothing is recorded unless `timings.enable()` has been called, and a disabled phase costs
+one attribute check.
+"""
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# The order the phases are reported in. Anything else goes at the end.
+PHASES = ('import', 'config', 'validation', 'cache', 'http', 'decode', 'snapshot', 'history', 'rows', 'render')
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class Timings:
+    """Accumulates the seconds spent in each phase, and counters such as bytes downloaded."""
+
+    def __init__(self):
+        self.enabled = False
+        self.seconds = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, started: float = None) -> None:
+        """Starts recording (from scratch). `started` is when the invocation began, for the total."""
+        self.enabled = True
+        self.seconds = {}
+        self.counters = {}
+        self.started = started if started is not None else time.perf_counter()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def phase(self, name: str):
+        """Context manager that charges the time spent inside it to `name`."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name: str):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        now = time.perf_counter()
+        if stack: # pause the phase around this one.
+            outer = stack[-1]
+            self.add(outer[0], now - outer[1])
+        stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.add(name, now - stack.pop()[1])
+            if stack:
+                stack[-1][1] = now
+
+    def iterate(self, name: str, iterable):
+        """Yields from `iterable`, charging the time spent producing each item to `name`."""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self._phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self) -> dict:
+        """The phases (in milliseconds), counters and total wall time, as a dictionary."""
+        order = list(PHASES) + sorted(set(self.seconds) - set(PHASES))
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'phases_ms': {name: round(self.seconds[name] * 1000, 2) for name in order if name in self.seconds},
+            'counters': dict(self.counters),
+        }
+
+    def write(self, format: str = 'text', out = None) -> None:
+        """Writes the report to stderr: a small table, or a single JSON line."""
+        out = out or sys.stderr
+        report = self.report()
+        if format == 'json':
+            out.write(json.dumps(report, separators = (',', ':')) + '\n')
+            return
+
+        out.write("\nTimings (ms, summed across threads):\n")
+        for name, ms in report['phases_ms'].items():
+            out.write(f"  {name:<12}{ms:>10.2f}\n")
+        for name, value in report['counters'].items():
+            out.write(f"  {name:<12}{value:>10,}\n")
+        out.write(f"  {'total':<12}{report['total_ms']:>10.2f}\n")
+
+
+# One per process.
+timings = Timings()
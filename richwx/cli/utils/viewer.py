@@ -0,0 +1,335 @@
+"""An interactive, paged view of the alert list (`--pager`).
+
+Printing the alert list as one table means Rich measures and lays out every row before the
+first line appears, which for a big state (or the whole country) is thousands of rows. The
+viewer only ever lays out the rows that are on the screen:
+
+- The column widths are worked out once, from an evenly spaced sample of the alerts
+  (`SAMPLE_ROWS` of them, however long the list is), instead of from every row.
+- A page is filled one row at a time, each row laid out at those widths until the screen is
+  full, so drawing a page costs the same for 50 alerts as for 50,000.
+
+It takes over the terminal (the alternate screen, like `less`), and is driven by single key
+presses: arrows or j/k to move, space/b or PgDn/PgUp for a page, g/G for the top and the end,
+`/` to search and n/N for the next and previous match, Enter for the selected alert's
+details and q to quit.
+"""
+import click
+from rich.cells import cell_len
+from rich.console import Group
+from rich.segment import Segment
+from rich.table import Table
+from rich.text import Text
+
+from cli.utils import render
+from cli.utils.alert_rich_strings import get_alert_style
+from cli.utils.records import format_id
+
+# How many alerts the column widths are measured from.
+SAMPLE_ROWS = 200
+
+# The narrowest the location column gets before the others are squeezed as well.
+MIN_LOCATION_WIDTH = 20
+
+_HELP = "↑/↓ move  PgUp/PgDn page  g/G top/end  / search  n/N next/prev  Enter details  q quit"
+
+# What the keys come in as (from `click.getchar`) -> what they do.
+_KEYS = {
+    'j': 'down', '\x1b[B': 'down', '\x1bOB': 'down',
+    'k': 'up', '\x1b[A': 'up', '\x1bOA': 'up',
+    ' ': 'page_down', 'f': 'page_down', '\x1b[6~': 'page_down',
+    'b': 'page_up', '\x1b[5~': 'page_up',
+    'g': 'top', '\x1b[H': 'top', '\x1b[1~': 'top',
+    'G': 'end', '\x1b[F': 'end', '\x1b[4~': 'end',
+    '/': 'search', 'n': 'next', 'N': 'previous',
+    '\r': 'details', '\n': 'details', 'd': 'details',
+    'q': 'quit', 'Q': 'quit', '\x1b': 'quit', '\x03': 'quit',
+}
+
+
+def _sample(records: list) -> list:
+    if len(records) <= SAMPLE_ROWS:
+        return records
+    step = len(records) / SAMPLE_ROWS
+    return [records[int(index * step)] for index in range(SAMPLE_ROWS)]
+
+
+def _longest_line(text: str) -> int:
+    return max((cell_len(line) for line in text.split('\n')), default = 0)
+
+
+def _natural_widths(records: list, show_id: bool) -> list:
+    # The width each column would like, from the sample: what `alert_cells` puts in them.
+    widths = {name: cell_len(name) for name in render.column_names(show_id)}
+    for record in _sample(records):
+        measured = {
+            'Alert ID': cell_len(format_id(record.id)),
+            'Alert Type': _longest_line(get_alert_style(record.event, newline = True).text.plain),
+            'Location': min(80, cell_len((record.area_desc or '').replace(';', ','))), # the table's max_width.
+            'Issued': _longest_line(str(record.sent).replace(' ', '\n')),
+            'Expires': _longest_line(str(record.expires).replace(' ', '\n')),
+            'Sender': cell_len(record.sender_name or ''),
+        }
+        for name in widths:
+            widths[name] = max(widths[name], measured[name])
+    return list(widths.values())
+
+
+def column_widths(records: list, show_id: bool, width: int) -> list:
+    """The width of each column of the alert list on a console `width` wide, from a sample of the alerts."""
+    widths = _natural_widths(records, show_id)
+    names = render.column_names(show_id)
+    available = width - (len(widths) + 1) - 2 * len(widths) # borders, and a space either side of each cell.
+
+    # Too wide: the location (which wraps best) gives way first, then every column in proportion.
+    location = names.index('Location')
+    over = sum(widths) - available
+    if over > 0:
+        widths[location] = max(MIN_LOCATION_WIDTH, widths[location] - over)
+    over = sum(widths) - available
+    if over > 0:
+        total = sum(widths)
+        widths = [max(4, column - (over * column + total - 1) // total) for column in widths]
+    return widths
+
+
+class _Lines:
+    # Lines that have already been rendered, as a renderable.
+    def __init__(self, lines: list):
+        self.lines = lines
+
+    def __rich_console__(self, console, options):
+        new_line = Segment.line()
+        for line in self.lines:
+            yield from line
+            yield new_line
+
+
+class AlertViewer:
+    """Pages through a list of alerts in the terminal.
+
+    Args:
+        console (Console): Where to draw. It should be a terminal.
+        records (list): The `AlertRecord`s, in the order they're listed.
+        title (str): Shown above the list.
+        show_id (bool, optional): Show the alert IDs as well.
+        detail (callable, optional): Given an `AlertRecord`, returns what to show as its details
+            (i.e. `render.detail_table`). Enter does nothing without it.
+        read_key (callable, optional): Reads one key press. Defaults to `click.getchar`.
+    """
+
+    def __init__(self, console, records: list, title: str, show_id: bool = False, detail = None,
+                 read_key = click.getchar):
+        self.console = console
+        self.records = records
+        self.title = title
+        self.show_id = show_id
+        self.detail = detail
+        self.read_key = read_key
+
+        self.top = 0 # the first row on the screen.
+        self.cursor = 0 # the selected row.
+        self.message = None
+        self.query = None
+        self.matches = []
+        self._size = None
+        self._heights = {}
+        self._resize()
+
+    def _resize(self) -> None:
+        size = (self.console.width, self.console.height)
+        if size != self._size:
+            self._size = size
+            self.widths = column_widths(self.records, self.show_id, size[0])
+            self._heights = {} # rows wrap differently at other widths.
+
+    def _cells(self, index: int) -> list:
+        return render.alert_cells(self.records[index], self.show_id)
+
+    def _height(self, index: int) -> int:
+        """How many lines a row takes (the tallest of its cells), laying out only that row."""
+        height = self._heights.get(index)
+        if height is None:
+            options = self.console.options.update(justify = 'center', height = None)
+            height = max(len(self.console.render_lines(cell, options.update_width(width), pad = False))
+                         for cell, width in zip(self._cells(index), self.widths))
+            self._heights[index] = height
+        return height
+
+    @property
+    def _room(self) -> int:
+        # Lines for rows: the screen, less the title, the header (with its borders), the
+        # bottom border and the two status lines. Each row also takes a line to separate it.
+        return self.console.height - 7
+
+    def _fits(self, rows: int, index: int, used: int) -> bool:
+        return rows == 0 or used + self._height(index) + 1 <= self._room
+
+    def _page_from(self, top: int) -> int:
+        """The row after the last one that fits on a page starting at `top`."""
+        index, used = top, 0
+        while index < len(self.records) and self._fits(index - top, index, used):
+            used += self._height(index) + 1
+            index += 1
+        return index
+
+    def _page_ending(self, last: int) -> int:
+        """The first row of a page whose last row is `last`."""
+        index, used = last, 0
+        while index >= 0 and self._fits(last - index, index, used):
+            used += self._height(index) + 1
+            index -= 1
+        return index + 1
+
+    def _table(self, bottom: int) -> Table:
+        table = Table(show_lines = True)
+        for name, width in zip(render.column_names(self.show_id), self.widths):
+            table.add_column(name, justify = 'center', width = width)
+        for index in range(self.top, bottom):
+            table.add_row(*self._cells(index), style = 'reverse' if index == self.cursor else None)
+        return table
+
+    def screen(self):
+        """What's on the screen now: the title, the visible rows and the status lines."""
+        self._resize()
+        bottom = self._page_from(self.top)
+        width = self.console.width
+        title = Text(self.title, style = 'bold', justify = 'center', no_wrap = True, overflow = 'ellipsis')
+        if not self.records:
+            return Group(title, Text("\nThere are no alerts to show.\n"), Text(_HELP, style = 'dim'))
+
+        position = f" {self.cursor + 1}/{len(self.records)} (rows {self.top + 1}-{bottom})"
+        if self.query is not None:
+            position += f"  /{self.query}: {len(self.matches)} found"
+        status = Text(position + (f"  {self.message}" if self.message else ""), no_wrap = True, overflow = 'ellipsis')
+        status.stylize('bold')
+        return Group(title, self._table(bottom), status,
+                     Text(_HELP[:width], style = 'dim', no_wrap = True, overflow = 'ellipsis'))
+
+    def _move(self, cursor: int) -> None:
+        self.cursor = max(0, min(cursor, len(self.records) - 1))
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self._page_from(self.top):
+            self.top = self._page_ending(self.cursor)
+
+    def _page_down(self) -> None:
+        bottom = self._page_from(self.top)
+        if bottom >= len(self.records):
+            self._move(len(self.records) - 1)
+            return
+        self.top = self.cursor = bottom
+
+    def _page_up(self) -> None:
+        if self.top == 0:
+            self._move(0)
+            return
+        self.top = self.cursor = self._page_ending(self.top - 1)
+
+    def search(self, query: str) -> None:
+        """Finds the alerts whose event, location, sender or ID contain `query` (any case),
+        and moves to the first one at or after the selected row."""
+        self.query = query
+        needle = query.lower()
+        self.matches = [index for index, record in enumerate(self.records)
+                        if any(needle in (value or '').lower()
+                               for value in (record.event, record.area_desc, record.sender_name, record.id))]
+        self.message = None if self.matches else "no matches"
+        self._jump(1, inclusive = True)
+
+    def _jump(self, direction: int, inclusive: bool = False) -> None:
+        # To the next (or previous) match, wrapping around.
+        if not self.matches:
+            return
+        if direction > 0:
+            later = [index for index in self.matches if index > self.cursor or (inclusive and index == self.cursor)]
+            self._move(later[0] if later else self.matches[0])
+        else:
+            earlier = [index for index in self.matches if index < self.cursor]
+            self._move(earlier[-1] if earlier else self.matches[-1])
+
+    def _read_query(self, screen) -> str:
+        # Reads a search term a key at a time, showing it in the status line.
+        query = ''
+        while True:
+            self.message = f"search: {query}_"
+            screen.update(self.screen())
+            key = self.read_key()
+            if key in ('\r', '\n'):
+                self.message = None
+                return query
+            if key in ('\x1b', '\x03'):
+                self.message = None
+                return None
+            if key in ('\x7f', '\x08'):
+                query = query[:-1]
+            elif key.isprintable():
+                query += key
+
+    def _show_detail(self, screen) -> None:
+        if self.detail is None or not self.records:
+            return
+        record = self.records[self.cursor]
+        self.message = f"getting the details of {format_id(record.id)}..."
+        screen.update(self.screen())
+        self.message = None
+        try:
+            renderable = self.detail(record)
+        except Exception as err:
+            self.message = f"could not get the details ({err})"
+            return
+
+        lines = self.console.render_lines(renderable, self.console.options.update(height = None), pad = False)
+        top = 0
+        while True:
+            room = self.console.height - 1
+            status = Text(f" lines {top + 1}-{min(top + room, len(lines))} of {len(lines)}  ↑/↓ scroll  "
+                          f"q back", style = 'dim', no_wrap = True, overflow = 'ellipsis')
+            screen.update(Group(_Lines(lines[top:top + room]), status))
+            action = _KEYS.get(self.read_key())
+            if action == 'down':
+                top = min(top + 1, max(0, len(lines) - room))
+            elif action == 'up':
+                top = max(0, top - 1)
+            elif action == 'page_down':
+                top = min(top + room, max(0, len(lines) - room))
+            elif action == 'page_up':
+                top = max(0, top - room)
+            elif action in ('quit', 'details'):
+                return
+
+    def handle(self, action: str, screen = None) -> bool:
+        """Does what a key asks for. Returns False once it's time to quit."""
+        if action == 'down':
+            self._move(self.cursor + 1)
+        elif action == 'up':
+            self._move(self.cursor - 1)
+        elif action == 'page_down':
+            self._page_down()
+        elif action == 'page_up':
+            self._page_up()
+        elif action == 'top':
+            self.top = self.cursor = 0
+        elif action == 'end':
+            self._move(len(self.records) - 1)
+        elif action == 'search' and screen is not None:
+            query = self._read_query(screen)
+            if query:
+                self.search(query)
+        elif action == 'next':
+            self._jump(1)
+        elif action == 'previous':
+            self._jump(-1)
+        elif action == 'details' and screen is not None:
+            self._show_detail(screen)
+        elif action == 'quit':
+            return False
+        return True
+
+    def run(self) -> None:
+        """Shows the alerts until q is pressed."""
+        with self.console.screen() as screen:
+            while True:
+                screen.update(self.screen())
+                if not self.handle(_KEYS.get(self.read_key()), screen):
+                    return
@@ -0,0 +1,477 @@
+"""A local index of NWS zones (forecast, fire, county and marine), read through `mmap`.
+
+Alerts name the areas they cover by UGC code (`TXZ103`, `TXC085`, `GMZ250`) in their
+geocode and `affectedZones`. Turning those into names, states, centroids or bounding boxes
+would otherwise take a request to `/zones/...` per zone. The index answers it locally:
+
+    header     magic, format version, number of zones, number of hash slots, when it was
+               built and a label for the data it was built from (i.e. the shapefiles' date)
+    zones      one fixed size record per zone: code, kind, state, where its name is, and
+               its centroid and bounding box as float32s
+    slots      an open addressing hash table (uint32 per slot, at most half full) from the
+               zone code to its record
+    names      the zones' names, UTF-8
+
+Everything is little-endian whatever the machine. Opening a file maps it and reads the
+header; a lookup hashes the code, reads a slot or two and decodes that one record, so
+resolving the zones of a whole nationwide collection takes microseconds per alert and never
+goes near the network.
+
+The index is built (`richwx zones build`) from the NWS's zone shapefiles (see
+https://www.weather.gov/gis/) or from a JSON dump of `/zones`. richwx doesn't come with
+one: until it's been built, there are no zones to look up.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+
+from cli.utils.timings import timings
+
+MAGIC = b'RWXZONE1'
+FORMAT_VERSION = 1
+
+# What kind of zone a record is, as stored.
+KINDS = ('forecast', 'fire', 'county', 'marine')
+
+# Where `/zones` and the shapefiles' names for the kinds go.
+_KIND_NAMES = {'public': 'forecast', 'forecast': 'forecast', 'fire': 'fire', 'county': 'county', 'coastal': 'marine',
+               'offshore': 'marine', 'marine': 'marine'}
+
+# Events that are issued for fire weather zones rather than forecast zones (the codes overlap).
+FIRE_EVENTS = frozenset(('Red Flag Warning', 'Fire Weather Watch', 'Extreme Fire Danger'))
+
+# magic, version, number of zones, number of slots, built at, label.
+_HEADER = struct.Struct('<8sHxxIId32s')
+# code, kind, state, name offset, name length, lat, lon, south, west, north, east.
+_RECORD = struct.Struct('<6sBx2sIH6f')
+_SLOT = struct.Struct('<I')
+
+_MISSING = float('nan')
+
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+def _key(code: str) -> bytes:
+    return code.strip().upper().encode('ascii', 'replace')
+
+
+def _hash(key: bytes, bits: int) -> int:
+    return ((int.from_bytes(key, 'little') * _GOLDEN) & _MASK) >> (64 - bits)
+
+
+class Zone:
+    """One zone.
+
+    Args:
+        code (str): The UGC code, i.e. TXZ103.
+        kind (str): One of `KINDS`.
+        name (str): Its name, i.e. Dallas.
+        state (str): Its state (2 letters), or None for the marine zones that don't have one.
+        lat, lon (float): Its centroid, or None when what it was built from didn't say.
+        bbox (tuple): Its bounding box, as (south, west, north, east). Defaults to the
+            centroid, and is None without one.
+    """
+
+    __slots__ = ('code', 'kind', 'name', 'state', 'lat', 'lon', 'bbox')
+
+    def __init__(self, code: str, kind: str, name: str, state: str = None, lat: float = None, lon: float = None,
+                 bbox: tuple = None):
+        self.code = code
+        self.kind = kind
+        self.name = name
+        self.state = state
+        self.lat = lat
+        self.lon = lon
+        self.bbox = bbox if bbox is not None or lat is None else (lat, lon, lat, lon)
+
+    def __repr__(self):
+        return f"Zone({self.code!r}, {self.kind!r}, {self.name!r}, {self.state!r})"
+
+
+# Writing.
+
+def write(zones, path: str, label: str = '') -> int:
+    """Writes zones to an index file, atomically. A later zone with the same code and kind
+    replaces an earlier one.
+
+    Args:
+        zones (iterable): The `Zone`s. Codes that aren't 6 characters (SSZNNN, SSCNNN) are skipped.
+        path (str): Where to write it.
+        label (str, optional): What the zones came from, i.e. "z_05mr24". Kept in the header.
+
+    Returns:
+        int: How many zones were written.
+
+    Raises:
+        ValueError: If there are no zones to write (the file is left as it was).
+    """
+    unique = {}
+    for zone in zones:
+        key = _key(zone.code)
+        if len(key) == 6 and zone.kind in KINDS:
+            unique[(key, zone.kind)] = zone
+    zones = list(unique.items())
+    if not zones:
+        raise ValueError("there are no zones to write.")
+
+    bits = max(4, (2 * len(zones) - 1).bit_length())
+    slots = [0] * (1 << bits)
+    mask = len(slots) - 1
+    records, names = bytearray(), bytearray()
+    for index, ((key, kind), zone) in enumerate(zones):
+        name = (zone.name or '').encode('utf-8')[:0xFFFF]
+        # Coordinates nobody gave are stored as NaN.
+        south, west, north, east = zone.bbox if zone.bbox is not None else (_MISSING,) * 4
+        lat = zone.lat if zone.lat is not None else (south + north) / 2
+        lon = zone.lon if zone.lon is not None else (west + east) / 2
+        records += _RECORD.pack(key, KINDS.index(kind), (zone.state or '').upper().encode('ascii', 'replace')[:2],
+                                len(names), len(name), lat, lon, south, west, north, east)
+        names += name
+
+        slot = _hash(key, bits)
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok = True)
+    fd, tmp = tempfile.mkstemp(dir = directory, prefix = '.zones-', suffix = '.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(zones), len(slots), time.time(),
+                                 label.encode('utf-8')[:32]))
+            f.write(records)
+            f.write(struct.pack(f'<{len(slots)}I', *slots))
+            f.write(names)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return len(zones)
+
+
+# Reading.
+
+class ZoneIndex:
+    """A zone index written by `write`, mapped into memory.
+
+    Zones handed out stay usable after it's closed.
+
+    Raises:
+        ValueError: If the file isn't a zone index, or is from another version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        try:
+            self._open()
+        except Exception:
+            self._map.close()
+            raise
+        self._zones = {} # record -> Zone, decoded as they're asked for.
+        self._found = {} # (code, kind) -> what `get` returned; alerts name the same zones over and over.
+
+    def _open(self) -> None:
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a zone index.")
+        magic, version, self.count, slots, self.built_at, label = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a zone index.")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is a version {version} zone index; this richwx reads version {FORMAT_VERSION}.")
+        self.label = label.rstrip(b'\0').decode('utf-8', 'replace')
+
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._records = _HEADER.size
+        self._slots = self._records + self.count * _RECORD.size
+        self._names = self._slots + slots * _SLOT.size
+        if slots & self._mask or self._names > len(self._map):
+            raise ValueError(f"{self.path} is cut short.")
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def _zone(self, record: int) -> Zone:
+        zone = self._zones.get(record)
+        if zone is None:
+            code, kind, state, offset, length, lat, lon, south, west, north, east = _RECORD.unpack_from(
+                self._map, self._records + record * _RECORD.size)
+            start = self._names + offset
+            located = lat == lat # NaN when there were no coordinates.
+            zone = self._zones[record] = Zone(code.decode('ascii'), KINDS[kind], str(self._map[start:start + length], 'utf-8'),
+                                              state.rstrip(b'\0').decode('ascii') or None, lat if located else None,
+                                              lon if located else None,
+                                              (south, west, north, east) if south == south else None)
+        return zone
+
+    def _records_for(self, key: bytes):
+        # The records with this code: follow the probe sequence until an empty slot.
+        data, slot = self._map, _hash(key, self._bits)
+        while True:
+            record = _SLOT.unpack_from(data, self._slots + slot * _SLOT.size)[0]
+            if not record:
+                return
+            start = self._records + (record - 1) * _RECORD.size
+            if data[start:start + 6] == key:
+                yield record - 1
+            slot = (slot + 1) & self._mask
+
+    def lookup(self, code: str) -> list:
+        """Every zone with this code (a forecast zone and a fire zone can share one)."""
+        return [self._zone(record) for record in self._records_for(_key(code))]
+
+    def get(self, code: str, kind: str = None):
+        """The zone with this code, preferring `kind` (and then forecast, county, marine and
+        fire zones) when more than one has it. None if there's none."""
+        found = self._found.get((code, kind), self)
+        if found is self:
+            zones = self.lookup(code)
+            if len(zones) > 1:
+                order = ('forecast', 'county', 'marine', 'fire')
+                zones.sort(key = lambda zone: (zone.kind != kind, order.index(zone.kind)))
+            found = self._found[(code, kind)] = zones[0] if zones else None
+        return found
+
+    def __contains__(self, code: str) -> bool:
+        return next(self._records_for(_key(code)), None) is not None
+
+    def resolve(self, record) -> list:
+        """The zones an alert (an `AlertRecord` with its heavy fields) covers, in the order
+        its UGC codes are listed. Codes that aren't in the index are left out."""
+        kind = 'fire' if record.event in FIRE_EVENTS else None
+        zones = (self.get(code, kind) for code in record.ugc)
+        return [zone for zone in zones if zone is not None]
+
+    def kinds(self) -> dict:
+        """How many zones of each kind there are."""
+        counts = dict.fromkeys(KINDS, 0)
+        for record in range(self.count):
+            counts[KINDS[self._map[self._records + record * _RECORD.size + 6]]] += 1
+        return counts
+
+
+# path -> ((mtime, size), index). Each index is opened once per process (again if it's rebuilt).
+_opened = {}
+_opened_lock = threading.Lock()
+
+
+def open_index(path: str):
+    """Opens the zone index at `path`, and keeps it open for the process.
+
+    Returns:
+        ZoneIndex: The index, or None if it hasn't been built (or can't be read).
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _opened_lock:
+        opened = _opened.get(path)
+        if opened is not None and opened[0] == stamp:
+            return opened[1]
+        try:
+            with timings.phase('config'):
+                index = ZoneIndex(path)
+        except (OSError, ValueError):
+            return None
+        _opened[path] = (stamp, index)
+        return index
+
+
+# Sources to build an index from.
+
+def _kind(value, default: str = None) -> str:
+    kind = _KIND_NAMES.get((value or '').lower(), default)
+    if kind is None:
+        raise ValueError(f"don't know what kind of zone {value!r} is; pass one of {', '.join(KINDS)}.")
+    return kind
+
+
+def _bounds(geometry) -> tuple:
+    # The bounding box and (area weighted) centroid of a GeoJSON polygon or multipolygon.
+    if not geometry or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+        return None, None
+    polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+    lons = [point[0] for polygon in polygons for point in polygon[0]]
+    lats = [point[1] for polygon in polygons for point in polygon[0]]
+    if not lons:
+        return None, None
+
+    area = cx = cy = 0.0
+    for polygon in polygons:
+        ring = polygon[0]
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            cross = x1 * y2 - x2 * y1
+            area += cross
+            cx += (x1 + x2) * cross
+            cy += (y1 + y2) * cross
+    bbox = (min(lats), min(lons), max(lats), max(lons))
+    if abs(area) < 1e-12:
+        return bbox, ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+    return bbox, (cy / (3 * area), cx / (3 * area))
+
+
+def read_json(path: str, kind: str = None) -> list:
+    """Reads zones from a JSON dump: the GeoJSON `/zones` returns (with or without geometry),
+    or a list of `{"code", "kind", "name", "state", "lat", "lon", "bbox": [s, w, n, e]}`.
+    Zones without geometry or coordinates are kept, without a centroid or bounding box.
+
+    Args:
+        kind (str, optional): The kind of every zone in it, when the dump doesn't say.
+    """
+    with open(path, encoding = 'utf-8') as f:
+        data = json.load(f)
+    items = data.get('features', []) if isinstance(data, dict) else data
+
+    zones = []
+    for item in items:
+        properties = item.get('properties', item)
+        code = properties.get('code') or properties.get('id') or (properties.get('@id') or '').rsplit('/', 1)[-1]
+        bbox, centroid = _bounds(item.get('geometry'))
+        if properties.get('bbox'):
+            bbox = tuple(properties['bbox'])
+        if properties.get('lat') is not None and properties.get('lon') is not None:
+            centroid = (properties['lat'], properties['lon'])
+        lat, lon = centroid if centroid is not None else (None, None)
+        zones.append(Zone(code, _kind(properties.get('kind') or properties.get('type'), kind) if kind is None else kind,
+                          properties.get('name'), properties.get('state'), lat, lon, bbox))
+    return zones
+
+
+def _dbf(data: bytes) -> list:
+    # The records of a dBase III table, as dicts of stripped strings. Deleted ones are None,
+    # so the rest still line up with their shapes.
+    count, header, length = struct.unpack_from('<IHH', data, 4)
+    fields, offset = [], 32
+    while data[offset] != 0x0D:
+        name = data[offset:offset + 11].split(b'\0', 1)[0].decode('ascii').upper()
+        fields.append((name, data[offset + 16]))
+        offset += 32
+
+    rows = []
+    for index in range(count):
+        start = header + index * length
+        if data[start:start + 1] == b'*': # deleted.
+            rows.append(None)
+            continue
+        row, position = {}, start + 1
+        for name, size in fields:
+            row[name] = data[position:position + size].decode('latin-1').strip()
+            position += size
+        rows.append(row)
+    return rows
+
+
+def _shp_boxes(data: bytes) -> list:
+    # The bounding box (south, west, north, east) of each shape in a .shp, None for null shapes.
+    boxes, offset = [], 100
+    while offset + 8 <= len(data):
+        length = struct.unpack_from('>i', data, offset + 4)[0] * 2
+        shape = struct.unpack_from('<i', data, offset + 8)[0] if length >= 4 else 0
+        if shape in (1, 11, 21): # points.
+            x, y = struct.unpack_from('<2d', data, offset + 12)
+            boxes.append((y, x, y, x))
+        elif shape:
+            xmin, ymin, xmax, ymax = struct.unpack_from('<4d', data, offset + 12)
+            boxes.append((ymin, xmin, ymax, xmax))
+        else:
+            boxes.append(None)
+        offset += 8 + length
+    return boxes
+
+
+def _shapefile_parts(path: str) -> tuple:
+    # The .dbf (and .shp, if there is one) of a shapefile, given the .shp, the .dbf or a .zip of them.
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            names = {name.lower(): name for name in archive.namelist()}
+            dbf = next((name for lower, name in names.items() if lower.endswith('.dbf')), None)
+            if dbf is None:
+                raise ValueError(f"{path} doesn't have a .dbf in it.")
+            shp = names.get(dbf[:-4].lower() + '.shp')
+            return dbf, archive.read(dbf), archive.read(shp) if shp else None
+
+    base = os.path.splitext(path)[0]
+    with open(base + '.dbf', 'rb') as f:
+        dbf = f.read()
+    shp = None
+    if os.path.exists(base + '.shp'):
+        with open(base + '.shp', 'rb') as f:
+            shp = f.read()
+    return base + '.dbf', dbf, shp
+
+
+def read_shapefile(path: str, kind: str = None) -> list:
+    """Reads zones from one of the NWS's zone shapefiles (https://www.weather.gov/gis/): the
+    public forecast zones (`z_*`), fire zones (`fz_*`), counties (`c_*`), or the marine zones
+    (`mz_*`, `oz_*`, ...). Takes the .shp, the .dbf or the .zip they come in.
+
+    The centroid comes from the LAT/LON columns (or the middle of the shape), the bounding
+    box from the shapes.
+
+    Args:
+        kind (str, optional): The kind of zone it holds. Worked out from the columns (and the
+            file name, for fire zones) if not given.
+    """
+    name, dbf, shp = _shapefile_parts(path)
+    rows = _dbf(dbf)
+    boxes = _shp_boxes(shp) if shp else []
+    columns = next((row for row in rows if row is not None), None)
+    if kind is None and columns is not None:
+        if 'FIPS' in columns:
+            kind = 'county'
+        elif 'ZONE' in columns:
+            kind = 'fire' if os.path.basename(name).lower().startswith('fz') else 'forecast'
+        elif 'ID' in columns:
+            kind = 'marine'
+        else:
+            raise ValueError(f"can't tell what kind of zones are in {path}; pass one of {', '.join(KINDS)}.")
+
+    zones = []
+    for index, row in enumerate(rows):
+        if row is None:
+            continue
+        if kind == 'county':
+            code, zone_name = f"{row.get('STATE', '')}C{row.get('FIPS', '')[-3:]}", row.get('COUNTYNAME')
+        elif 'ZONE' in row:
+            code, zone_name = f"{row.get('STATE', '')}Z{row['ZONE'][-3:]}", row.get('NAME')
+        else:
+            code, zone_name = row.get('ID', ''), row.get('NAME')
+
+        bbox = boxes[index] if index < len(boxes) else None
+        try:
+            lat, lon = float(row['LAT']), float(row['LON'])
+        except (KeyError, ValueError):
+            lat, lon = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2) if bbox is not None else (None, None)
+        zones.append(Zone(code, kind, zone_name, row.get('STATE') or None, lat, lon, bbox))
+    return zones
+
+
+def read_source(path: str, kind: str = None) -> list:
+    """Reads zones from a shapefile (.shp, .dbf or .zip) or a JSON dump, by the file's extension."""
+    if kind is not None:
+        kind = _kind(kind)
+    if os.path.splitext(path)[1].lower() in ('.json', '.geojson'):
+        return read_json(path, kind)
+    return read_shapefile(path, kind)
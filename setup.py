@@ -20,7 +20,8 @@ setup(
         install_requires = [
                 'Click',
                 'rich',
-                'nwsapy'
+                'nwsapy',
+                'numpy'
         ],
         url = 'https://github.com/WxBDM/richwx', 
         download_url = f'https://github.com/WxBDM/richwx/archive/refs/tags/v{version}.tar.gz', 